@@ -0,0 +1,214 @@
+"""
+# The benchmarks of pyeumonia.
+
+Every query path of `Covid19` is measured with the data generated by `pyeumonia.standin` at 1×, 10× and 100× the
+real size, without internet connection. The throughput, the latency percentiles and the peak memory of every case are
+reported, and compared with the stored baseline.
+Usage:
+```bash
+# Run the benchmarks and compare with benchmarks/baseline.json
+python -m benchmarks.bench
+# Run the 1× and 10× benchmarks only, and save the result as the new baseline
+python -m benchmarks.bench --scales 1 10 --save benchmarks/baseline.json
+```
+"""
+import argparse  # Import argparse module, which is used to parse the command-line arguments
+import json  # Import json module, which is used to save the results
+import os  # Import os module, which is used to find the baseline
+import platform  # Import platform module, which is used to record the machine of the results
+import sys  # Import sys module, which is used to print the results
+import time  # Import time module, which is used to measure the latency
+import tracemalloc  # Import tracemalloc module, which is used to measure the peak memory
+
+from pyeumonia import Covid19
+from pyeumonia.standin import StandinServer, StandinTransport, generate_snapshot
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+# The real size of the data of DXY, every count is multiplied by the scale.
+REAL_SIZE = {
+    'provinces': 34,
+    'countries': 200,
+    'days': 1000,
+}
+# The count of cities and danger areas in every province, the total counts grow with the provinces.
+CITIES = 16
+DANGER_AREAS = 4
+
+
+def scaled_standin(scale, seed=0):
+    """
+    # Generate the data at ** times the real size, and serve it by a stand-in.
+
+    :param scale: The scale, such as 1, 10 or 100.
+    :param seed: The random seed, default is 0.
+    :return: A `StandinServer`, it's not started, use `StandinTransport` to get the responses.
+    """
+    snapshot = generate_snapshot(provinces=REAL_SIZE['provinces'] * scale, cities=CITIES,
+                                 countries=REAL_SIZE['countries'] * scale, danger_areas=DANGER_AREAS, seed=seed)
+    return StandinServer(snapshot, days=REAL_SIZE['days'] * scale, seed=seed)
+
+
+def cold(covid, function):
+    """Call a function without the memoized results, as if the data was just refreshed."""
+    def call():
+        covid.version += 1
+        return function()
+    return call
+
+
+def cases(covid, transport):
+    """
+    # Get the benchmark cases of a `Covid19` instance.
+
+    :param covid: The `Covid19` instance.
+    :param transport: The transport of the instance.
+    :return: A dict of the case name and the function to measure, the cold cases don't use the memoized results.
+    """
+    last_province = covid.c_data[-1]
+    last_city = last_province['cities'][-1]['cityName'] if last_province['cities'] else '杨浦区'
+    last_country = covid.w_data[-1]['provinceName' if covid.language == 'zh_CN' else 'countryFullName']
+    date_ids = [day['dateId'] for day in covid.fetch_timeline(last_province['statisticsData'])]
+    start, end = date_ids[len(date_ids) // 4], date_ids[len(date_ids) * 3 // 4]
+    return {
+        'constructor': lambda: Covid19(language=covid.language, check_upgradable=False, transport=transport),
+        'cn_covid_data(include_cities=True)': lambda: covid.cn_covid_data(include_cities=True),
+        'cn_covid_data(include_cities=True) cold': cold(covid, lambda: covid.cn_covid_data(include_cities=True)),
+        'danger_areas_data': lambda: covid.danger_areas_data(),
+        'danger_areas_data cold': cold(covid, lambda: covid.danger_areas_data()),
+        'city_covid_data': lambda: covid.city_covid_data(last_city, show_danger_areas=True),
+        'get_region': lambda: covid.get_region(),
+        'world_covid_data': lambda: covid.world_covid_data(),
+        'world_covid_data cold': cold(covid, lambda: covid.world_covid_data()),
+        'province_covid_data(show_timeline=30)': lambda: covid.province_covid_data(
+            last_province['provinceShortName'], show_timeline=30),
+        'province_covid_data(show_timeline=30) cold': cold(covid, lambda: covid.province_covid_data(
+            last_province['provinceShortName'], show_timeline=30)),
+        'country_covid_data(show_timeline=30)': lambda: covid.country_covid_data(last_country, show_timeline=30),
+        'province_covid_data(start, end, step=week)': lambda: covid.province_covid_data(
+            last_province['provinceShortName'], start=start, end=end, step='week'),
+        'country_covid_data(columnar=True)': lambda: covid.country_covid_data(
+            last_country, show_timeline=True, columnar=True),
+    }
+
+
+def measure(function, min_time=1.0, min_runs=5):
+    """
+    # Measure a function.
+
+    The function is called until it runs for `min_time` seconds and at least `min_runs` times, then it's called once
+    more with tracemalloc to get the peak memory, so tracemalloc doesn't slow down the latency.
+    :param function: The function.
+    :param min_time: The minimum time in seconds, default is 1.0.
+    :param min_runs: The minimum count of runs, default is 5.
+    :return: A dict of the runs, the throughput, the latency percentiles in milliseconds and the peak memory in bytes.
+    """
+    function()  # Warm up the caches and the imports.
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < min_runs or time.perf_counter() - started < min_time:
+        begin = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - begin)
+    total = time.perf_counter() - started
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    return {
+        'runs': len(latencies),
+        'ops_per_sec': len(latencies) / total,
+        'p50_ms': percentile(50),
+        'p90_ms': percentile(90),
+        'p99_ms': percentile(99),
+        'max_ms': latencies[-1] * 1000,
+        'peak_memory': peak,
+    }
+
+
+def run(scales=(1, 10, 100), language='zh_CN', min_time=1.0, only=None, output=sys.stdout):
+    """
+    # Run the benchmarks.
+
+    :param scales: The scales of the data, default is (1, 10, 100).
+    :param language: The language of the `Covid19` instance, default is 'zh_CN'.
+    :param min_time: Every case runs for ** seconds at least, default is 1.0.
+    :param only: The names of the cases to run, default is None, run all of them.
+    :param output: Where to print the progress, default is stdout.
+    :return: The results, keyed by '<scale>x' and the case name.
+    """
+    results = {}
+    for scale in scales:
+        transport = StandinTransport(scaled_standin(scale))
+        covid = Covid19(language=language, check_upgradable=False, transport=transport)
+        for name, function in cases(covid, transport).items():
+            if only and name not in only:
+                continue
+            result = measure(function, min_time)
+            results.setdefault(f'{scale}x', {})[name] = result
+            print(f'{scale:>4}x {name:<45} {result["ops_per_sec"]:>10.1f}/s  p50 {result["p50_ms"]:>9.3f}ms  '
+                  f'p99 {result["p99_ms"]:>9.3f}ms  peak {result["peak_memory"] / 1024:>10.1f}KiB', file=output)
+        transport.standin.shutdown()
+    return results
+
+
+def compare(results, baseline, threshold=1.2):
+    """
+    # Compare the results with the baseline.
+
+    :param results: The results returned by `run()`.
+    :param baseline: The baseline, the results saved by the previous run.
+    :param threshold: A case is regressed if it's ** times slower, or uses ** times more memory, default is 1.2.
+    :return: A list of (scale, case name, p50 ratio, peak memory ratio, regressed).
+    """
+    rows = []
+    for scale, scale_results in results.items():
+        for name, result in scale_results.items():
+            old = baseline.get('results', {}).get(scale, {}).get(name)
+            if old is None:
+                continue
+            time_ratio = result['p50_ms'] / old['p50_ms'] if old['p50_ms'] else 1.0
+            memory_ratio = result['peak_memory'] / old['peak_memory'] if old['peak_memory'] else 1.0
+            rows.append((scale, name, time_ratio, memory_ratio, time_ratio > threshold or memory_ratio > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.bench', description='Run the benchmarks of pyeumonia.')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--language', default='zh_CN')
+    parser.add_argument('--min-time', type=float, default=1.0, help='every case runs for ** seconds at least')
+    parser.add_argument('--case', action='append', dest='only', help='the name of a case to run, can be repeated')
+    parser.add_argument('--baseline', default=BASELINE, help='the baseline to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2, help='the ratio which is regarded as regression')
+    parser.add_argument('--save', default=None, help='save the results, such as benchmarks/baseline.json')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with 1 if any case is regressed')
+    args = parser.parse_args(argv)
+    results = run(args.scales, args.language, args.min_time, args.only)
+    regressed = False
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f'\nCompared with {args.baseline} ({baseline.get("machine", "unknown machine")}):')
+        for scale, name, time_ratio, memory_ratio, is_regressed in compare(results, baseline, args.threshold):
+            regressed = regressed or is_regressed
+            print(f'{scale:>5} {name:<45} p50 {time_ratio:>6.2f}x  peak {memory_ratio:>6.2f}x'
+                  f'{"  REGRESSED" if is_regressed else ""}')
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'machine': f'{platform.python_implementation()} {platform.python_version()} on {platform.platform()}',
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,17 +1,83 @@
-import requests  # Import requests module, which is used to send HTTP requests
 import json  # Import json module, which is used to parse JSON data
-# Import beautifulsoup4 module, which is used to parse HTML data
-from bs4 import BeautifulSoup
 import platform  # Import platform module, which is used to get OS type
 import locale  # Import locale module, which is used to get system language
 import time  # Import time module, which is used to get current time.
 import os  # Import os module, which is used to check pypi upgradable
-# Import pypinyin module, get your place name in Chinese
-from pypinyin import lazy_pinyin
-# Import iso3166 module, get your place name in English
-from iso3166 import countries
-# Import webbrowser module, it will open a browser to show the result.
-import webbrowser
+import bisect  # Import bisect module, which is used to find the days in the timeline
+import datetime  # Import datetime module, which is used to resample the timeline by week or month
+import threading  # Import threading module, which is used to protect the memoized results
+import functools  # Import functools module, which is used to bind the language of a view to the query methods
+from collections import OrderedDict  # Import collections module, which is used to drop the least recently used results
+# The HTTP requests are sent by `pyeumonia.transport`.
+# requests, beautifulsoup4, pypinyin, iso3166, webbrowser and concurrent.futures are imported in the functions
+# which use them, so `import pyeumonia` and the command-line interface start fast.
+
+from .instrument import Phase, timed
+from .memo import memoized
+
+# The fields of every day in the timeline of a province or a country.
+TIMELINE_FIELDS = ['dateId', 'confirmedCount', 'curedCount', 'deadCount', 'currentConfirmedCount']
+# If user language is not Chinese, the continents will be translated to English.
+CONTINENTS_TRANS = {
+    '亚洲': 'Asia',
+    '欧洲': 'Europe',
+    '非洲': 'Africa',
+    '北美洲': 'North America',
+    '南美洲': 'South America',
+    '大洋洲': 'Oceania',
+    '南极洲': 'Antarctica',
+    '其他': 'Other'
+}
+# The languages of the data, the names of the countries are translated into both of them once for every snapshot.
+LANGUAGES = ['zh_CN', 'en_US']
+# The methods which accept a `language` argument, they are bound to the language of a `CovidView`.
+LANGUAGE_METHODS = ['world_covid_data', 'country_covid_data', 'get_region', 'fetch_timeline', 'country_matrix',
+                    'to_arrow', 'to_pandas', 'to_parquet']
+# These cities are not real cities, they will be ignored in the data of cities.
+IGNORE_CITIES = ['待明确地区', '境外输入', '外地来沪', '境外来沪',
+                 '境外输入人员', '外地来津', '外地来京', '省十里丰监狱', '省级（湖北输入）']
+
+
+class _DateIds:
+    """The dateIds of a timeline, without copying them, so that bisect can search in it."""
+
+    def __init__(self, timeline):
+        self.timeline = timeline
+
+    def __len__(self):
+        return len(self.timeline)
+
+    def __getitem__(self, index):
+        return self.timeline[index]['dateId']
+
+
+def _slice_timeline(timeline, start=None, end=None):
+    """Get the days between start and end from a timeline sorted by dateId, with binary search."""
+    date_ids = _DateIds(timeline)
+    first = 0 if start is None else bisect.bisect_left(date_ids, start)
+    last = len(timeline) if end is None else bisect.bisect_right(date_ids, end)
+    return timeline[first:last]
+
+
+def _resample_timeline(timeline, step):
+    """Keep the last day of every `step` days, or of every 'week' or 'month'."""
+    if isinstance(step, int):
+        if step <= 0:
+            raise CovidException(f"The step {step} must be a positive integer, 'week' or 'month'.")
+        return timeline[(len(timeline) - 1) % step::step]
+    if step not in ['week', 'month']:
+        raise CovidException(f'The step {step} is not supported.')
+    data = []
+    period = None
+    for day in timeline:
+        date = datetime.date(day['dateId'] // 10000, day['dateId'] // 100 % 100, day['dateId'] % 100)
+        day_period = date.isocalendar()[:2] if step == 'week' else (date.year, date.month)
+        if day_period == period:
+            data[-1] = day
+        else:
+            data.append(day)
+        period = day_period
+    return data
 
 
 class CovidException(Exception):
@@ -29,10 +95,24 @@ class Covid19:
     :param language: The language of the data, default is 'auto', check your language automatically.
     :param check_upgradable: While running the program it will check upgradable version, default is True.
     :param auto_update: If you want to update the program automatically, set it to True.
+    :param store: A `pyeumonia.store.SnapshotStore`, if it is given, every fetched snapshot will be recorded into it.
+    :param transport: A `pyeumonia.transport.Transport` which sends all the HTTP requests, default is None,
+    use requests with the timeouts, retries and circuit breakers of `pyeumonia.resilience.ResilientTransport`, and
+    the limits of `pyeumonia.ratelimit.DEFAULT_LIMITS` shared by all the processes.
+    :param hooks: A list of functions which are called with a `pyeumonia.instrument.Span` after every phase, such as
+    'check_upgrade', 'fetch', 'parse', 'decode', 'geolocation', 'timeline.fetch', 'timeline.decode' and
+    'query.<method>', the durations of the latest phases are also saved in `covid.timings`.
+    :param sources: A `pyeumonia.sources.SourcePool` or a list of sources, the page is downloaded from the fastest
+    healthy one, default is None, only use the DXY page.
     Chinese data is also supported, if you want to show Chinese, please initialize the class `covid = Covid('zh_CN')`.
+    Both languages can be served from the same data, by the `language` argument of the query methods, or by the views
+    returned by `covid.view('en_US')`, the data is downloaded and parsed only once.
+    The results of the query methods are memoized until the data is refreshed, `memo_size` results are kept at most.
     """
+    memo_size = 256
 
-    def __init__(self, language='auto', check_upgradable=True, auto_update=False):
+    def __init__(self, language='auto', check_upgradable=True, auto_update=False, store=None, transport=None,
+                 hooks=None, sources=None):
         """
         # generate language from system language, only support Chinese and English.
 
@@ -43,10 +123,228 @@ class Covid19:
         if language != 'zh_CN':
             language = 'en_US'
         self.language = language
+        if transport is None:
+            transport = self._default_transport()
+        self.transport = transport
+        self.sources = self._source_pool(sources)
+        self.hooks = list(hooks or [])
+        self.timings = {}
+        self.bytes_received = 0
+        self.version = 0
+        self._init_memo()
+        self._init_fetch_state()
         if check_upgradable:
             self.auto_update = auto_update
             self.check_upgrade()
-        url = 'https://ncov.dxy.cn/ncovh5/view/pneumonia'  # Get data from this url
+        self.store = store
+        self.refresh()
+
+    @classmethod
+    def from_snapshot(cls, snapshot, language='auto', transport=None, hooks=None, sources=None):
+        """
+        # Initialize the class from a snapshot, no internet connection is required.
+
+        :param snapshot: The snapshot returned by `Covid19.snapshot()` or `SnapshotStore.snapshot_as_of()`.
+        :param language: The language of the data, default is 'auto'.
+        :param transport: The transport used by the timelines and `refresh()`, default is None, use requests.
+        :param hooks: The functions which are called after every phase, default is None.
+        :param sources: The sources used by `refresh()`, default is None, only use the DXY page.
+        :return: A `Covid19` instance which uses the data of the snapshot.
+        """
+        covid = cls.__new__(cls)
+        covid.language = covid.get_language(language)
+        if transport is None:
+            transport = covid._default_transport()
+        covid.transport = transport
+        covid.sources = covid._source_pool(sources)
+        covid.hooks = list(hooks or [])
+        covid.timings = {}
+        covid.bytes_received = 0
+        covid.version = 1
+        covid._init_memo()
+        covid._init_fetch_state()
+        covid.store = None
+        covid.c_data = snapshot['c_data']
+        covid.w_data = snapshot['w_data']
+        covid.n_data = snapshot['n_data']
+        covid.fetch_time = snapshot['fetch_time']
+        return covid
+
+    @staticmethod
+    def _default_transport():
+        """Send the requests by requests, with the retries and the rate limits shared by the processes."""
+        from .ratelimit import RateLimitedTransport
+        from .resilience import ResilientTransport
+        return ResilientTransport(RateLimitedTransport())
+
+    def _rate_limiter(self):
+        """Find the `RateLimiter` of the transport, or None if the requests are not rate limited."""
+        transport = self.transport
+        while transport is not None:
+            if getattr(transport, 'limiter', None) is not None:
+                return transport.limiter
+            transport = getattr(transport, 'transport', None)
+        return None
+
+    @staticmethod
+    def _source_pool(sources):
+        """Get the `SourcePool` of the sources, the DXY page is the only source by default."""
+        from .sources import DXY_URL, SourcePool
+        if sources is None:
+            return SourcePool([DXY_URL])
+        if isinstance(sources, SourcePool):
+            return sources
+        return SourcePool(sources)
+
+    def _init_memo(self):
+        """Initialize the memoized results, see `pyeumonia.memo.memoized`."""
+        self._memo = OrderedDict()
+        self._memo_version = self.version
+        self._memo_lock = threading.Lock()
+        self.memo_stats = {'hits': 0, 'misses': 0}
+        self._translations = (None, None)
+        self._resolver = (None, None)
+
+    def _init_fetch_state(self):
+        """
+        # Initialize the state of the conditional fetches.
+
+        `fetch_stats` counts the fetches, the 304 responses, the fetches which change nothing, and the scripts of the
+        page which are decoded or reused. `stale` is True if the latest fetch failed and the old data is kept.
+        """
+        self.stale = False
+        self._validators = {}
+        self._fingerprints = {}
+        self.fetch_stats = {'fetches': 0, 'not_modified': 0, 'unchanged': 0, 'sections_decoded': 0,
+                            'sections_reused': 0}
+
+    def view(self, language):
+        """
+        # Get a view of the data in another language, the data, the memoized results and the hooks are shared.
+
+        Usage:
+        ```python
+        from pyeumonia import Covid19
+        covid = Covid19('zh_CN', check_upgradable=False)
+        english = covid.view('en_US')
+        # The same data in both languages, it's downloaded only once.
+        covid.world_covid_data()
+        english.world_covid_data()
+        ```
+        :param language: The language of the view, 'zh_CN' or 'en_US'.
+        :return: A `CovidView`, it's refreshed with this instance.
+        """
+        return CovidView(self, language)
+
+    def _language(self, language):
+        """Get the language of a query, None means the program language."""
+        return self.language if language is None else self.get_language(language)
+
+    def translations(self, language=None):
+        """
+        # Get the translated names and continents of the countries.
+
+        The translations of both languages are computed only once for every snapshot, and shared by all the queries
+        and the views.
+        :param language: 'zh_CN' or 'en_US', default is None, use the program language.
+        :return: A dict with 'countryName' and 'continents', the lists in the order of `w_data`, and 'index', a dict
+        of the country name and its position in `w_data`.
+        """
+        version, translations = self._translations
+        if version != self.version:
+            version = self.version
+            translations = {}
+            for language_name in LANGUAGES:
+                if language_name == 'zh_CN':
+                    names = [country['provinceName'] for country in self.w_data]
+                    continents = [country['continents'] for country in self.w_data]
+                else:
+                    names = [country['countryFullName'] for country in self.w_data]
+                    continents = [CONTINENTS_TRANS[country['continents']] for country in self.w_data]
+                index = {}
+                for position, name in enumerate(names):
+                    index.setdefault(name, position)  # The first country is used if the names are the same.
+                translations[language_name] = {'countryName': names, 'continents': continents, 'index': index}
+            self._translations = (version, translations)
+        return translations[self._language(language)]
+
+    def resolver(self):
+        """
+        # Get the resolver of the region names, which is built only once for every snapshot, pypinyin is required.
+
+        Usage:
+        ```python
+        from pyeumonia import Covid19
+        covid = Covid19(check_upgradable=False)
+        covid.resolver().complete('shang')
+        covid.country_covid_data('usa')  # The same as 'United States of America'
+        ```
+        :return: A `pyeumonia.resolver.RegionResolver`.
+        """
+        version, resolver = self._resolver
+        if version != self.version:
+            from .resolver import RegionResolver
+            resolver = RegionResolver(self.c_data, self.w_data)
+            self._resolver = (self.version, resolver)
+        return resolver
+
+    def _resolve_name(self, name, kind, language):
+        """Get the name used by DXY of a region which is not found exactly, raise CovidException if it's not found."""
+        resolver = self.resolver()
+        region = resolver.resolve(name, kind)
+        if region is not None:
+            return region.name_in(language)
+        suggestions = ', '.join(region.name_in(language) for region in resolver.suggest(name, kind))
+        if language == 'zh_CN':
+            hint = f'你是不是要找：{suggestions}？' if suggestions else ''
+            raise CovidException(f'找不到地区：{name}。{hint}')
+        hint = f' Did you mean {suggestions}?' if suggestions else ''
+        raise CovidException(f'The region {name} is not found.{hint}')
+
+    def add_hook(self, hook):
+        """
+        # Call a function after every phase, such as forwarding the spans to a tracing system.
+
+        Usage:
+        ```python
+        from pyeumonia import Covid19
+        covid = Covid19(hooks=[lambda span: print(span.name, span.duration, span.attributes)])
+        # The durations of the latest phases
+        print(covid.timings)
+        ```
+        :param hook: A function which accepts a `pyeumonia.instrument.Span`.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """Stop calling a function after every phase."""
+        if hook in self.hooks:
+            self.hooks.remove(hook)
+
+    def snapshot(self):
+        """
+        # Get the raw data which is fetched from DXY.
+
+        :return: A dict with the raw data and the time it was fetched.
+        """
+        return {
+            'fetch_time': self.fetch_time,
+            'c_data': self.c_data,
+            'w_data': self.w_data,
+            'n_data': self.n_data,
+        }
+
+    def refresh(self):
+        """
+        # Download the latest data from DXY.
+
+        If a store is given while initializing the class, the new snapshot will be recorded into it.
+        The page is downloaded from the fastest healthy source of `sources`, the others are tried if it fails.
+        The page is requested with If-None-Match and If-Modified-Since, and only the changed scripts are decoded, if
+        nothing is changed, the data and `version` are kept, see `fetch_stats`.
+        If the fetch fails, `stale` is set to True, and if the circuit breaker of the transport is open, the last good
+        data is kept without waiting for DXY, otherwise the error is raised.
+        """
         headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
                           "Chrome/80.0.3987.149 Safari/537.36 "
@@ -61,33 +359,104 @@ class Covid19:
                 "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_5) AppleWebKit/537.36 (KHTML, like Gecko) "
                               "Chrome/80.0.3987.149 Safari/537.36 "
             }
-        response = requests.get(url, headers=headers)
-        response.encoding = 'utf-8'
-        status_code = response.status_code
+        # Import beautifulsoup4 module, which is used to parse HTML data
+        from bs4 import BeautifulSoup
+        import hashlib  # Import hashlib module, which is used to find the unchanged page and scripts
+        from .resilience import CircuitOpenError
+        has_data = getattr(self, 'c_data', None) is not None
+        try:
+            with Phase(self, 'fetch') as phase:
+                # The source which returned the current data is asked to return 304 if the page is not modified.
+                source, response = self.sources.fetch(self.transport, headers, self._validators)
+                phase.attributes['source'] = source.name
+                phase.attributes['url'] = getattr(source, 'url', source.name)
+                response.encoding = 'utf-8'
+                status_code = response.status_code
+                phase.attributes['status_code'] = status_code
+                phase.attributes['bytes'] = len(response.content)
+        except CircuitOpenError:
+            if not has_data:
+                raise
+            self.stale = True  # Serve the last good data, DXY is not requested until the breaker is half-open.
+            return
+        except Exception:
+            self.stale = has_data
+            raise
+        self.bytes_received += len(response.content)
+        self.fetch_stats['fetches'] += 1
+        if status_code == 304:
+            self.fetch_stats['not_modified'] += 1
+            self.fetch_time = int(time.time())
+            self.stale = False
+            return
         if status_code != 200:
+            self.stale = has_data
             raise CovidException(
                 f'The website is not available, error code: {status_code}.')
-        # Initialize beautifulsoup4
-        soup = BeautifulSoup(response.text, 'html.parser')
-        # Get the covid-19 data from China.
-        c_soup = soup.find('script', id='getAreaStat')
-        self.c_data = json.loads(str(c_soup)
-                                 .strip('<script id="getAreaStat">try { window.getAreaStat = ')
-                                 .strip('}catch(e){}</script>')
-                                 )
-        # Get the covid-19 data from the world.
-        w_soup = soup.find('script', id='getListByCountryTypeService2true')
-        self.w_data = json.loads(str(w_soup)
-                                 .strip(
-            '<script id="getListByCountryTypeService2true">try { window.getListByCountryTypeService2true = ')
-            .strip('}catch(e){}</script>')
-        )
-        # Get the news about covid-19 from China.
-        n_soup = soup.find('script', id='getTimelineService1')
-        self.n_data = json.loads(str(n_soup)
-                                 .strip('<script id="getTimelineService1">try { window.getTimelineService1 = ')
-                                 .strip('}catch(e){}</script>')
-                                 )
+        self.stale = False
+        response_headers = {key.lower(): value for key, value in response.headers.items()}
+        self._validators = {source.name: {key: response_headers[key] for key in ['etag', 'last-modified']
+                                          if key in response_headers}}
+        fingerprint = hashlib.sha1(response.content).digest()
+        if fingerprint == self._fingerprints.get('page'):
+            self.fetch_stats['unchanged'] += 1
+            self.fetch_time = int(time.time())
+            return
+        with Phase(self, 'parse'):
+            # Initialize beautifulsoup4
+            soup = BeautifulSoup(response.text, 'html.parser')
+            c_soup = soup.find('script', id='getAreaStat')
+            w_soup = soup.find('script', id='getListByCountryTypeService2true')
+            n_soup = soup.find('script', id='getTimelineService1')
+        with Phase(self, 'decode'):
+            changed = self._decode_page(c_soup, w_soup, n_soup)
+        self._fingerprints['page'] = fingerprint
+        self.fetch_time = int(time.time())
+        if not changed:
+            self.fetch_stats['unchanged'] += 1
+            return
+        self.version += 1  # The memoized results of the old data will not be used any more.
+        if self.store is not None:
+            self.store.record(self)
+
+    def _decode_page(self, c_soup, w_soup, n_soup):
+        """
+        # Decode the json data in the scripts of the DXY page.
+
+        A script is decoded only if it's changed since the last fetch, otherwise the decoded data is kept.
+        :return: The count of the scripts which are changed.
+        """
+        import hashlib  # Import hashlib module, which is used to find the unchanged scripts
+        changed = 0
+        for name, soup in [('c_data', c_soup), ('w_data', w_soup), ('n_data', n_soup)]:
+            script = str(soup)
+            fingerprint = hashlib.sha1(script.encode('utf-8')).digest()
+            if fingerprint == self._fingerprints.get(name):
+                self.fetch_stats['sections_reused'] += 1
+                continue
+            if name == 'c_data':
+                # Get the covid-19 data from China.
+                self.c_data = json.loads(script
+                                         .strip('<script id="getAreaStat">try { window.getAreaStat = ')
+                                         .strip('}catch(e){}</script>')
+                                         )
+            elif name == 'w_data':
+                # Get the covid-19 data from the world.
+                self.w_data = json.loads(script
+                                         .strip(
+                    '<script id="getListByCountryTypeService2true">try { window.getListByCountryTypeService2true = ')
+                    .strip('}catch(e){}</script>')
+                )
+            else:
+                # Get the news about covid-19 from China.
+                self.n_data = json.loads(script
+                                         .strip('<script id="getTimelineService1">try { window.getTimelineService1 = ')
+                                         .strip('}catch(e){}</script>')
+                                         )
+            self._fingerprints[name] = fingerprint
+            self.fetch_stats['sections_decoded'] += 1
+            changed += 1
+        return changed
 
     def get_language(self, language='auto'):
         if language == 'auto':
@@ -96,6 +465,7 @@ class Covid19:
             language = 'en_US'
         return language
 
+    @timed('geolocation')
     def get_region(self, language='prog'):
         """
         # Get the region of the covid-19 data, in order to get the covid-19 data of the region.
@@ -114,6 +484,10 @@ class Covid19:
             pass
         else:
             language = 'en_US'
+        # Import pypinyin module, get your place name in Chinese
+        from pypinyin import lazy_pinyin
+        # Import iso3166 module, get your place name in English
+        from iso3166 import countries
         url = 'https://ipinfo.io/json'
         place = {
             'countryName': '',
@@ -121,7 +495,7 @@ class Covid19:
             'cityName': '',
         }
         try:
-            response = requests.get(url=url, timeout=2).json()
+            response = self.transport.get(url, timeout=2).json()
             # print(response)
         except Exception:
             if language == 'zh_CN':
@@ -164,6 +538,7 @@ class Covid19:
                     break
         return place
 
+    @timed('check_upgrade')
     def check_upgrade(self):
         """Check if there is a new version of the program.
         :return: If there is a new version, return True, otherwise return False, if check failed, return 'Failed'.
@@ -180,7 +555,7 @@ class Covid19:
         # Get the latest version of the program.
         url = 'https://pypi.org/pypi/pyeumonia/json'
         try:
-            response = requests.get(url=url, timeout=2).json()
+            response = self.transport.get(url, timeout=2).json()
         except Exception:
             if self.language == 'zh_CN':
                 print('检查更新失败，请前往 https://pypi.org/project/pyeumonia 查看更新。')
@@ -218,6 +593,8 @@ class Covid19:
                     raise CovidException(
                         'pypi package update failed, please check your network connection.')
 
+    @timed('query.')
+    @memoized()
     def cn_covid_data(self, include_cities=False):
         """
         # Get the covid-19 data from China.
@@ -238,9 +615,7 @@ class Covid19:
             if include_cities:
                 cities = []
                 for city in province['cities']:
-                    ignore_cities = ['待明确地区', '境外输入', '外地来沪', '境外来沪',
-                                     '境外输入人员', '外地来津', '外地来京', '省十里丰监狱', '省级（湖北输入）']
-                    if city['cityName'] in ignore_cities:
+                    if city['cityName'] in IGNORE_CITIES:
                         continue
                     city_data = {
                         'cityName': city['cityName'],
@@ -262,13 +637,21 @@ class Covid19:
             data.append(province_data)
         return data
 
-    def province_covid_data(self, province_name='北京', show_timeline: int = 0):
+    @timed('query.')
+    @memoized(bypass=['columnar'])
+    def province_covid_data(self, province_name='北京', show_timeline: int = 0, columnar=False,
+                            start=None, end=None, step=1):
         """
         # Get the covid-19 data from China, for every province.
 
         This function is only supported in Chinese.
         :param province_name: The province you want to get the data, default is '北京', if you want to get the data of province automatically, please set the parameter to 'auto'.
+        The pinyin, the aliases and the names with typos are also supported, see `resolver()`.
         :param show_timeline: If you want to get covid-19 data before ** days, please set the parameter to ** days.
+        :param columnar: If you want to get the timeline as a `pyeumonia.timeline.Timeline` backed by numpy arrays, set this parameter to True.
+        :param start: The first day of the timeline, such as 20220401, it overrides `show_timeline`.
+        :param end: The last day of the timeline, such as 20220430, default is None, until today.
+        :param step: Keep one day in every ** days, or set it to 'week' or 'month' to keep the last day of every week or month.
         :return: The data in json format.
         """
         if province_name == 'auto':
@@ -279,6 +662,9 @@ class Covid19:
         data = {}
         c_data = self.c_data
         timeline_url = ''
+        if not any(province['provinceName'] == province_name or province['provinceShortName'] == province_name
+                   for province in c_data):
+            province_name = self._resolve_name(province_name, 'province', 'zh_CN')
         for province in c_data:
             if province['provinceName'] == province_name or province['provinceShortName'] == province_name:
                 province_data = {
@@ -292,38 +678,19 @@ class Covid19:
                 data = province_data
                 timeline_url = province['statisticsData']
                 break
-        if show_timeline:
+        if show_timeline or start is not None or end is not None:
             # print(data)
-            t_data = []
-            raw_timeline_data = requests.get(timeline_url).json()
-            if raw_timeline_data['code'] != 'success':
-                raise CovidException(
-                    f'获取疫情信息失败，错误代码：{raw_timeline_data["code"]}.')
-            now = int(time.strftime('%Y%m%d', time.localtime()))
-            # get the date of 30 days ago
-            date = int(time.strftime('%Y%m%d', time.localtime(
-                time.time() - show_timeline * 24 * 60 * 60)))
-            for timeline in raw_timeline_data['data']:
-                if timeline['dateId'] < date:  # get the data of 30 days ago
-                    continue
-                del timeline['confirmedIncr']
-                del timeline['curedIncr']
-                del timeline['currentConfirmedIncr']
-                del timeline['deadIncr']
-                del timeline['highDangerCount']
-                del timeline['midDangerCount']
-                del timeline['suspectedCount']
-                del timeline['suspectedCountIncr']
-                t_data.append(timeline)
+            raw_timeline_data = self.fetch_timeline(timeline_url, language='zh_CN')
             timeline_data = {'provinceShortName': data['provinceShortName']}
             del data['provinceShortName']
-            data['dateId'] = now
-            t_data.append(data)
-            timeline_data['data'] = t_data
+            timeline_data['data'] = self._select_timeline(raw_timeline_data, data, show_timeline, start, end, step,
+                                                          columnar)
             return timeline_data
         else:
             return data
 
+    @timed('query.')
+    @memoized()
     def city_covid_data(self, city_name='杨浦区', show_danger_areas=False):
         """
         # Get covid-19 data from a city
@@ -332,6 +699,7 @@ class Covid19:
         :param show_danger_areas: If you want to get the danger areas count of the city,
         please set the parameter to True.
         :param city_name: The city you want to get the data, default is '杨浦区', if you want to get the data of the city automatically, please set the parameter to 'auto'.
+        The names without the suffix such as '大兴安岭', the pinyin and the names with typos are also supported.
         :return: The data in json format.
         """
         if city_name == 'auto':
@@ -339,6 +707,8 @@ class Covid19:
             if place['countryName'] != 'Failed':
                 city_name = place['cityName']
         c_data = self.c_data
+        if not any(city['cityName'] == city_name for province in c_data for city in province['cities']):
+            city_name = self._resolve_name(city_name, 'city', 'zh_CN')
         for province in c_data:
             for city in province['cities']:
                 if city['cityName'] == city_name:
@@ -354,6 +724,8 @@ class Covid19:
                         city_data['midDangerCount'] = city['midDangerCount']
                     return city
 
+    @timed('query.')
+    @memoized()
     def danger_areas_data(self, city_name=None):
         """
         # Get danger areas data from China.
@@ -525,111 +897,287 @@ class Covid19:
             data.append(province_data)
         return data
 
-    def world_covid_data(self):
+    @timed('query.')
+    @memoized()
+    def world_covid_data(self, language=None):
         """
         # Get the covid-19 data from the world.
 
         Both Chinese and English are supported in this function.
+        :param language: The language of the data, default is None, use the program language.
         :return: The data in json format.
         """
+        language = self._language(language)
+        translations = self.translations(language)
         data = []
         w_data = self.w_data
-        for country in w_data:
+        for country, name, continent in zip(w_data, translations['countryName'], translations['continents']):
             country_data = {
                 'currentConfirmedCount': country['currentConfirmedCount'],
                 'confirmedCount': country['confirmedCount'],
                 'curedCount': country['curedCount'],
                 'deadCount': country['deadCount']
             }
-            if self.language == 'zh_CN':
-                country_data['countryName'] = country['provinceName']
-                country_data['continents'] = country['continents']
+            # The order of the keys is kept the same as before.
+            if language == 'zh_CN':
+                country_data['countryName'] = name
+                country_data['continents'] = continent
             else:
-                continents_trans = {  # If user language is not Chinese, the continents will be translated to English.
-                    '亚洲': 'Asia',
-                    '欧洲': 'Europe',
-                    '非洲': 'Africa',
-                    '北美洲': 'North America',
-                    '南美洲': 'South America',
-                    '大洋洲': 'Oceania',
-                    '南极洲': 'Antarctica',
-                    '其他': 'Other'
-                }
-                country_data['continents'] = continents_trans[country['continents']]
-                country_data['countryName'] = country['countryFullName']
+                country_data['continents'] = continent
+                country_data['countryName'] = name
             data.append(country_data)
         return data
 
-    def country_covid_data(self, country_name='United States of America', show_timeline: int = 0):
+    @timed('query.')
+    @memoized(bypass=['columnar'])
+    def country_covid_data(self, country_name='United States of America', show_timeline: int = 0, columnar=False,
+                           start=None, end=None, step=1, language=None):
         """
         # Get the covid-19 data from the world, for every country.
 
         This function is both supported in Chinese and English.
         :param country_name: The covid-19 data of this country will be returned, default is 'United States of America', if you want to get covid-19 data from your country, set this parameter to "auto".
+        The names in both languages, the ISO codes, the aliases such as 'usa' and the names with typos are also
+        supported.
         :param show_timeline: If you want to get the data for ** days, set this parameter to **.
+        :param columnar: If you want to get the timeline as a `pyeumonia.timeline.Timeline` backed by numpy arrays, set this parameter to True.
+        :param start: The first day of the timeline, such as 20220401, it overrides `show_timeline`.
+        :param end: The last day of the timeline, such as 20220430, default is None, until today.
+        :param step: Keep one day in every ** days, or set it to 'week' or 'month' to keep the last day of every week or month.
+        :param language: The language of `country_name` and the data, default is None, use the program language.
         :return: The data in json format.
         """
+        language = self._language(language)
         if country_name == 'auto':
-            place = self.get_region()
+            place = self.get_region(language=language)
             if place['countryName'] != 'Failed':
                 country_name = place['countryName']
-        url = ''
+        with_timeline = show_timeline or start is not None or end is not None
         country_raw_data = {}
-        w_data = self.w_data
-        for country in w_data:
-            if show_timeline:
-                url = str(country['statisticsData'])
-            if self.language == 'zh_CN':
-                if country['provinceName'] == country_name:
-                    country_raw_data = {
-                        'currentConfirmedCount': country['currentConfirmedCount'],
-                        'confirmedCount': country['confirmedCount'],
-                        'curedCount': country['curedCount'],
-                        'deadCount': country['deadCount'],
-                        'countryName': country['provinceName'],
-                    }
-                    break
-            else:
-                if country['countryFullName'] == country_name:
-                    country_raw_data = {
-                        'currentConfirmedCount': country['currentConfirmedCount'],
-                        'confirmedCount': country['confirmedCount'],
-                        'curedCount': country['curedCount'],
-                        'deadCount': country['deadCount'],
-                        'countryName': country['countryFullName'],
-                    }
-                    break
-        if show_timeline:
-            t_data = []
-            raw_timeline_data = requests.get(url).json()
+        position = self.translations(language)['index'].get(country_name)
+        if position is None:
+            country_name = self._resolve_name(country_name, 'country', language)
+            position = self.translations(language)['index'].get(country_name)
+        if position is not None:
+            country = self.w_data[position]
+            country_raw_data = {
+                'currentConfirmedCount': country['currentConfirmedCount'],
+                'confirmedCount': country['confirmedCount'],
+                'curedCount': country['curedCount'],
+                'deadCount': country['deadCount'],
+                'countryName': country_name,
+            }
+        if with_timeline:
             country_name = country_raw_data['countryName']
-            if raw_timeline_data['code'] != 'success':
-                raise CovidException(
-                    f'There is some error in the data, error code: {raw_timeline_data["code"]}.')
+            raw_timeline_data = self.fetch_timeline(str(country['statisticsData']), language='en_US')
             country_data = {'countryName': country_name}
-            now = int(time.strftime('%Y%m%d', time.localtime()))
-            # get the date of several days ago
-            date = int(time.strftime('%Y%m%d', time.localtime(
-                time.time() - show_timeline * 24 * 60 * 60)))
-            for timeline in raw_timeline_data['data']:
-                if timeline['dateId'] < date:
-                    continue
-                t_temp_data = {
-                    'dateId': timeline['dateId'],
-                    'confirmedCount': timeline['confirmedCount'],
-                    'curedCount': timeline['curedCount'],
-                    'deadCount': timeline['deadCount'],
-                    'currentConfirmedCount': timeline['currentConfirmedCount'],
-                }
-                t_data.append(t_temp_data)
             del country_raw_data['countryName']
-            country_raw_data['dateId'] = now
-            t_data.append(country_raw_data)
-            country_data['data'] = t_data
+            country_data['data'] = self._select_timeline(raw_timeline_data, country_raw_data, show_timeline, start,
+                                                         end, step, columnar)
             return country_data
         else:
             return country_raw_data
 
+    def _select_timeline(self, raw_timeline_data, current_data, show_timeline, start, end, step, columnar):
+        """Get the days between start and end from the timeline, the current data is added as the data of today."""
+        now = int(time.strftime('%Y%m%d', time.localtime()))
+        if start is None and show_timeline:
+            # get the date of several days ago
+            start = int(time.strftime('%Y%m%d', time.localtime(
+                time.time() - show_timeline * 24 * 60 * 60)))
+        t_data = [{key: timeline[key] for key in TIMELINE_FIELDS}
+                  for timeline in _slice_timeline(raw_timeline_data, start, end)]
+        if end is None or end >= now:
+            current_data['dateId'] = now
+            t_data.append(current_data)
+        if step != 1:
+            t_data = _resample_timeline(t_data, step)
+        if columnar:
+            from .timeline import Timeline
+            t_data = Timeline.from_records(t_data)
+        return t_data
+
+    def fetch_timeline(self, url, language='prog'):
+        """
+        # Download the timeline of a province or a country from DXY.
+
+        :param url: The `statisticsData` url of the province or the country.
+        :param language: The language of the error message, default is 'prog', use the program language.
+        :return: The data of every day, sorted by dateId.
+        """
+        if language == 'prog':
+            language = self.language
+        with Phase(self, 'timeline.fetch', url=url) as phase:
+            response = self.transport.get(url)
+            phase.attributes['status_code'] = response.status_code
+            phase.attributes['bytes'] = len(response.content)
+        self.bytes_received += len(response.content)
+        with Phase(self, 'timeline.decode', url=url):
+            raw_timeline_data = response.json()
+        if raw_timeline_data['code'] != 'success':
+            if language == 'zh_CN':
+                raise CovidException(
+                    f'获取疫情信息失败，错误代码：{raw_timeline_data["code"]}.')
+            else:
+                raise CovidException(
+                    f'There is some error in the data, error code: {raw_timeline_data["code"]}.')
+        return raw_timeline_data['data']
+
+    def timeline_urls(self, provinces=True, countries=True):
+        """
+        # Get the `statisticsData` urls of all the provinces and countries.
+
+        :param provinces: If you don't want to get the urls of Chinese provinces, set this parameter to False.
+        :param countries: If you don't want to get the urls of the countries, set this parameter to False.
+        :return: A list of (region type, region name, url), region type is 'province' or 'country',
+        the region name is the short name of the province or the full name of the country.
+        """
+        urls = []
+        if provinces:
+            for province in self.c_data:
+                urls.append(('province', province['provinceShortName'], province['statisticsData']))
+        if countries:
+            for country in self.w_data:
+                country_name = country.get('countryFullName') or country['provinceName']
+                urls.append(('country', country_name, country['statisticsData']))
+        return urls
+
+    def iter_timelines(self, provinces=True, countries=True, skip=()):
+        """
+        # Download the timelines of all the provinces and countries one by one.
+
+        Every timeline is downloaded only when the generator reaches it.
+        :param provinces: If you don't want to get the timelines of Chinese provinces, set this parameter to False.
+        :param countries: If you don't want to get the timelines of the countries, set this parameter to False.
+        :param skip: The (region type, region name) pairs which will not be downloaded.
+        :return: A generator of (region type, region name, timeline).
+        """
+        skip = set(skip)
+        for region_type, region_name, url in self.timeline_urls(provinces, countries):
+            if (region_type, region_name) in skip:
+                continue
+            yield region_type, region_name, self.fetch_timeline(url)
+
+    def fetch_timelines(self, provinces=True, countries=True, max_workers=8):
+        """
+        # Download the timelines of all the provinces and countries at the same time.
+
+        :param provinces: If you don't want to get the timelines of Chinese provinces, set this parameter to False.
+        :param countries: If you don't want to get the timelines of the countries, set this parameter to False.
+        If the requests are rate limited, a timeline is downloaded only if there is a token for it, so the
+        concurrency follows the tokens which are left by the other processes.
+        :param max_workers: The count of timelines which are downloaded at the same time at most, default is 8.
+        :return: A list of (region type, region name, timeline), in the same order as `timeline_urls()`.
+        """
+        # Import concurrent.futures module, which is used to download the timelines at the same time
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        from urllib.parse import urlsplit  # Import urllib.parse module, which is used to find the host of a timeline
+        urls = self.timeline_urls(provinces, countries)
+        limiter = self._rate_limiter()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if limiter is None:
+                timelines = executor.map(self.fetch_timeline, [url for region_type, region_name, url in urls])
+            else:
+                timelines = [None] * len(urls)
+                running = {}
+                for index, (region_type, region_name, url) in enumerate(urls):
+                    host = urlsplit(url).netloc
+                    # Wait for a download to finish, or for a new token, instead of waiting in the transport.
+                    while running and (len(running) >= max_workers or limiter.available(host) < 1):
+                        done, _ = wait(running, timeout=limiter.interval(host) or None,
+                                       return_when=FIRST_COMPLETED)
+                        for future in done:
+                            timelines[running.pop(future)] = future.result()
+                    running[executor.submit(self.fetch_timeline, url)] = index
+                for future, index in running.items():
+                    timelines[index] = future.result()
+            return [(region_type, region_name, timeline)
+                    for (region_type, region_name, url), timeline in zip(urls, timelines)]
+
+    def province_matrix(self, max_workers=8):
+        """
+        # Get the timelines of all the provinces aligned on the same days, numpy is required.
+
+        This function is only supported in Chinese.
+        :param max_workers: The count of timelines which are downloaded at the same time, default is 8.
+        :return: A `pyeumonia.timeline.TimelineMatrix`, `labels` are the province names, `date_ids` are the days,
+        `matrix['confirmedCount']` is a province × day numpy array.
+        """
+        from .timeline import TimelineMatrix
+        timelines = self.fetch_timelines(countries=False, max_workers=max_workers)
+        return TimelineMatrix.stack((region_name, timeline) for region_type, region_name, timeline in timelines)
+
+    def country_matrix(self, max_workers=8, language=None):
+        """
+        # Get the timelines of all the countries aligned on the same days, grouped by continents, numpy is required.
+
+        Both Chinese and English are supported in this function.
+        :param max_workers: The count of timelines which are downloaded at the same time, default is 8.
+        :param language: The language of the names, default is None, use the program language.
+        :return: A dict of the continent and a `pyeumonia.timeline.TimelineMatrix` of the countries in it.
+        """
+        from .timeline import TimelineMatrix
+        language = self._language(language)
+        translations = self.translations(language)
+        timelines = self.fetch_timelines(provinces=False, max_workers=max_workers)
+        continents = {}
+        for position, (region_type, region_name, timeline) in enumerate(timelines):
+            continent = translations['continents'][position]
+            if language == 'zh_CN':
+                region_name = translations['countryName'][position]
+            continents.setdefault(continent, []).append((region_name, timeline))
+        return {continent: TimelineMatrix.stack(timelines) for continent, timelines in continents.items()}
+
+    def analytics(self, provinces=True, countries=True):
+        """
+        # Get the epidemiological metrics of all the provinces and countries, numpy is required.
+
+        The timelines are downloaded only once for every snapshot.
+        :param provinces: If you don't want to include Chinese provinces, set this parameter to False.
+        :param countries: If you don't want to include the countries, set this parameter to False.
+        :return: A `pyeumonia.analytics.Analytics`.
+        """
+        from .analytics import Analytics
+        return Analytics.from_covid(self, provinces, countries)
+
+    def to_arrow(self, dataset='world', language=None):
+        """
+        # Get the data as an arrow table, pyarrow is required.
+
+        :param dataset: 'world' for `world_covid_data()`, 'provinces' for `cn_covid_data()`,
+        'cities' for `cn_covid_data(include_cities=True)`, default is 'world'.
+        :param language: The language of the names, default is None, use the program language.
+        :return: A `pyarrow.Table`.
+        """
+        from .export import snapshot_table
+        return snapshot_table(self, dataset, language)
+
+    def to_pandas(self, dataset='world', language=None):
+        """
+        # Get the data as a pandas DataFrame, pyarrow and pandas are required.
+
+        :param dataset: 'world', 'provinces' or 'cities', the same as `to_arrow()`.
+        :param language: The language of the names, default is None, use the program language.
+        :return: A `pandas.DataFrame`.
+        """
+        from .export import snapshot_table, to_pandas
+        # The table is only used here, so its buffers are released while it's converted.
+        return to_pandas(snapshot_table(self, dataset, language), self_destruct=True)
+
+    def to_parquet(self, root, datasets=('world', 'provinces', 'cities'), language=None):
+        """
+        # Save the data into parquet files, which are partitioned by the date of the snapshot and the dataset.
+
+        :param root: The root directory of the files.
+        :param datasets: The datasets to save, 'world', 'provinces', 'cities' and 'timelines' are supported.
+        :param language: The language of the names, default is None, use the program language.
+        :return: The paths of the files.
+        """
+        from .export import write_parquet
+        return write_parquet(self, root, datasets, language)
+
+    @timed('query.')
+    @memoized(bypass=['open_url'])
     def cn_news_data(self, province=None, show_summary=True, open_url=False):
         """
         Get the news from CCTV
@@ -641,30 +1189,28 @@ class Covid19:
         local_news = {}
         if province == 'auto':
             province = self.get_region()['provinceName']
-        n_data = self.n_data
-        for news in n_data:
-            del news['id']
-            pub_timestamp = news['pubDate'] / 1000
+        data = []
+        for raw_news in self.n_data:
+            # Copy the news, so the raw data will not be changed.
+            news = {key: value for key, value in raw_news.items() if key not in [
+                'id', 'pubDateStr', 'pubDate', 'provinceId', 'articleId', 'category', 'jumpUrl']}
+            pub_timestamp = raw_news['pubDate'] / 1000
             pub_time = time.strftime(
                 '%Y-%m-%d %H:%M:%S', time.localtime(pub_timestamp))
             news['pubTime'] = pub_time
-            del news['pubDateStr']
-            del news['pubDate']
-            del news['provinceId']
-            del news['articleId']
-            del news['category']
-            del news['jumpUrl']
             if not show_summary:
                 del news['summary']
+            data.append(news)
             if province is None:
                 continue
             if province in news['title']:
                 local_news = news
                 if open_url:
+                    import webbrowser  # Import webbrowser module, it will open a browser to show the result.
                     webbrowser.open(news['sourceUrl'])
                 return local_news
 
-        return n_data
+        return data
 
     def open_website(self, website='Official'):
         """# It will open a website in your computer.
@@ -705,11 +1251,40 @@ class Covid19:
             website = 'https://pypi.org/project/pyeumonia/'
         else:
             raise CovidException(f'The website {website} is not supported.')
+        import webbrowser  # Import webbrowser module, it will open a browser to show the result.
         webbrowser.open(website)
 
 
+class CovidView:
+    """
+    # A view of a `Covid19` instance in another language, it's returned by `covid.view(language)`.
+
+    The view has no data of its own, every attribute and method comes from the instance, so it's refreshed with the
+    instance, and the methods in `LANGUAGE_METHODS` are called with the language of the view.
+    :param covid: The `Covid19` instance.
+    :param language: The language of the view, 'zh_CN' or 'en_US'.
+    """
+
+    def __init__(self, covid, language):
+        self.covid = covid
+        self.language = covid.get_language(language)
+        for name in LANGUAGE_METHODS:
+            setattr(self, name, functools.partial(getattr(covid, name), language=self.language))
+
+    def view(self, language):
+        """Get a view of the same instance in another language."""
+        return CovidView(self.covid, language)
+
+    def __getattr__(self, name):
+        return getattr(self.covid, name)
+
+    def __repr__(self):
+        return f'CovidView({self.covid!r}, {self.language!r})'
+
+
 if __name__ == '__main__':
     """While importing this module, your internet connection is required."""
+    import requests  # Import requests module, which is used to send HTTP requests
     try:
         requests.get('https://ncov.dxy.cn/ncovh5/view/pneumonia')
     except Exception:
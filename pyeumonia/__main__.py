@@ -0,0 +1,5 @@
+import sys  # Import sys module, which is used to exit with the code of the command
+
+from .cli import main
+
+sys.exit(main())
@@ -0,0 +1,328 @@
+import logging  # Import logging module, which is used to report the failed callbacks
+import time  # Import time module, which is used to check the cooldowns and the days of the snapshots
+
+from .feed import diff_snapshots
+
+logger = logging.getLogger(__name__)
+
+# The region of the rules which watch all the regions of a kind.
+ANY_REGION = '*'
+
+
+class Alert:
+    """
+    # A notification of a rule.
+
+    :param rule: The name of the rule.
+    :param kind: The kind of the record, such as 'province', 'city' or 'country'.
+    :param parent: The province of a city, or the continent of a country.
+    :param region: The name of the region.
+    :param field: The field of the record, such as 'currentConfirmedCount'.
+    :param value: The new value of the field.
+    :param previous: The value which is compared with, or None.
+    :param message: The description of the alert.
+    """
+
+    def __init__(self, rule, kind, parent, region, field, value, previous, message):
+        self.rule = rule
+        self.kind = kind
+        self.parent = parent
+        self.region = region
+        self.field = field
+        self.value = value
+        self.previous = previous
+        self.message = message
+        self.time = time.time()
+
+    def to_dict(self):
+        return {
+            'rule': self.rule, 'kind': self.kind, 'parent': self.parent, 'region': self.region, 'field': self.field,
+            'value': self.value, 'previous': self.previous, 'message': self.message, 'time': self.time,
+        }
+
+    def __repr__(self):
+        return f'Alert({self.rule!r}, {self.message!r})'
+
+
+class Rule:
+    """
+    # The base class of the rules.
+
+    A rule watches a field of the records of a kind, in some regions or in all of them. The name of a province also
+    matches its cities and danger areas, and the name of a continent matches its countries.
+    Subclass it and override `check()` to add another rule.
+    A rule is `sustained` if it describes a state which lasts, such as a value above a threshold, its alert is sent
+    once while it's triggered. Otherwise every triggered change is a new event, and an alert is sent for every one.
+    :param name: The name of the rule, it must be unique in an engine.
+    :param kind: The kind of the records, 'province', 'city' or 'country'.
+    :param field: The field to watch, such as 'currentConfirmedCount'.
+    :param regions: The names of the regions, provinces or continents, default is None, watch all of them.
+    :param cooldown: The same alert of a region is sent once in ** seconds at most, default is 0.
+    """
+    sustained = True
+
+    def __init__(self, name, kind, field, regions=None, cooldown=0):
+        self.name = name
+        self.kind = kind
+        self.field = field
+        self.regions = list(regions) if regions else [ANY_REGION]
+        self.cooldown = cooldown
+
+    def check(self, region, record, previous, yesterday):
+        """
+        # Check a changed record.
+
+        :param region: The name of the region.
+        :param record: The new record.
+        :param previous: The record before this refresh, or None.
+        :param yesterday: The last record of the day before, or None.
+        :return: A tuple of the value which is compared with and the message if the rule is triggered, otherwise None.
+        """
+        raise NotImplementedError
+
+
+class Threshold(Rule):
+    """
+    # Alert if a field is above or below a value.
+
+    Usage:
+    ```python
+    from pyeumonia.alerts import Threshold
+    rule = Threshold('shanghai-danger', 'province', 'highDangerCount', above=0, regions=['上海'])
+    ```
+    :param above: Alert if the field is greater than it, default is None.
+    :param below: Alert if the field is less than it, default is None.
+    """
+
+    def __init__(self, name, kind, field, above=None, below=None, regions=None, cooldown=0):
+        super().__init__(name, kind, field, regions, cooldown)
+        self.above = above
+        self.below = below
+
+    def check(self, region, record, previous, yesterday):
+        value = record.get(self.field)
+        if value is None:
+            return None
+        if self.above is not None and value > self.above:
+            return self.above, f'{region} {self.field} is {value}, above {self.above}.'
+        if self.below is not None and value < self.below:
+            return self.below, f'{region} {self.field} is {value}, below {self.below}.'
+        return None
+
+
+class Increase(Rule):
+    """
+    # Alert if a field increases more than an amount or a ratio.
+
+    Usage:
+    ```python
+    from pyeumonia.alerts import Increase
+    # Any city in Shanghai gains a high-danger area.
+    rule = Increase('shanghai-city-danger', 'city', 'highDangerCount', amount=0, regions=['上海'])
+    # The current confirmed count of France rises more than 10% day over day.
+    rule = Increase('france-10%', 'country', 'currentConfirmedCount', ratio=0.1, period='day', regions=['France'])
+    ```
+    :param amount: Alert if the field increases more than it, default is None.
+    :param ratio: Alert if the field increases more than the ratio, 0.1 means 10%, default is None.
+    :param period: 'refresh' compares with the record before this refresh, 'day' compares with the last record of the
+    day before, default is 'refresh'.
+    """
+
+    def __init__(self, name, kind, field, amount=None, ratio=None, period='refresh', regions=None, cooldown=0):
+        super().__init__(name, kind, field, regions, cooldown)
+        if amount is None and ratio is None:
+            raise ValueError('Either amount or ratio is required.')
+        self.amount = amount
+        self.ratio = ratio
+        self.period = period
+        # An increase since the day before lasts for the day, but every increase since the last refresh is new.
+        self.sustained = period == 'day'
+
+    def check(self, region, record, previous, yesterday):
+        base = yesterday if self.period == 'day' else previous
+        if base is None:
+            return None
+        value, old = record.get(self.field), base.get(self.field)
+        if value is None or old is None:
+            return None
+        if self.amount is not None and value - old > self.amount:
+            return old, f'{region} {self.field} increased from {old} to {value}.'
+        if self.ratio is not None and old > 0 and value / old - 1 > self.ratio:
+            return old, f'{region} {self.field} increased {(value / old - 1) * 100:.1f}% from {old} to {value}.'
+        return None
+
+
+class Condition(Rule):
+    """
+    # Alert if a function returns True for a changed record.
+
+    :param function: A function which accepts the new record, the record before this refresh and the last record of
+    the day before, the records before may be None.
+    :param fields: The fields which are used by the function, the rule is checked only if one of them is changed.
+    """
+
+    def __init__(self, name, kind, fields, function, regions=None, cooldown=0):
+        super().__init__(name, kind, fields[0], regions, cooldown)
+        self.fields = list(fields)
+        self.function = function
+
+    def check(self, region, record, previous, yesterday):
+        if self.function(record, previous, yesterday):
+            return None, f'{region} matches {self.name}.'
+        return None
+
+
+class AlertEngine:
+    """
+    # Evaluate the rules after every refresh, only with the changed records.
+
+    The rules are indexed by the kind, the region and the field, so a changed record only checks the rules of its
+    region, its province or continent, and the fields which are changed.
+    The alert of a sustained rule is sent once while the rule keeps triggered, even if the value keeps changing, and
+    sent again only after it was recovered, and after the cooldown of the rule. The other rules, such as the increases
+    since the last refresh, send an alert for every triggered change after the cooldown. An alert which is dropped by
+    the cooldown is sent at the next change after the cooldown if the rule is still triggered.
+    If a callback raises an exception, it's logged by the 'pyeumonia.alerts' logger and counted in `failed`, the
+    other callbacks are still called.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.alerts import AlertEngine, Increase
+    covid = Covid19()
+    engine = AlertEngine([Increase('shanghai-city-danger', 'city', 'highDangerCount', amount=0, regions=['上海'])])
+    engine.add_callback(print)
+    engine.evaluate(None, covid.snapshot())
+    # After every refresh
+    engine.refresh(covid)
+    ```
+    :param rules: The rules, default is None.
+    :param clock: The function to get current time, default is `time.time`.
+    """
+
+    def __init__(self, rules=None, clock=time.time):
+        self.clock = clock
+        self.rules = {}
+        self.callbacks = []
+        self._index = {}
+        self._records = {}
+        self._yesterday = {}
+        self._date_ids = {}
+        self._active = set()  # The sustained rules and the records which are triggered, and the alerts were sent.
+        self._sent = {}
+        self.suppressed = 0  # The count of alerts which are dropped by the cooldowns.
+        self.failed = 0  # The count of callback calls which raised an exception.
+        for rule in rules or []:
+            self.add_rule(rule)
+
+    def add_rule(self, rule):
+        """Add a rule, the rule with the same name is replaced."""
+        if rule.name in self.rules:
+            self.remove_rule(rule.name)
+        self.rules[rule.name] = rule
+        for region in rule.regions:
+            for field in getattr(rule, 'fields', [rule.field]):
+                self._index.setdefault((rule.kind, region, field), []).append(rule)
+
+    def remove_rule(self, name):
+        """Remove a rule by its name."""
+        rule = self.rules.pop(name)
+        for region in rule.regions:
+            for field in getattr(rule, 'fields', [rule.field]):
+                rules = self._index[(rule.kind, region, field)]
+                rules.remove(rule)
+                if not rules:
+                    del self._index[(rule.kind, region, field)]
+
+    def add_callback(self, callback):
+        """
+        # Call a function with every alert.
+
+        :param callback: A function which accepts an `Alert`.
+        """
+        self.callbacks.append(callback)
+
+    def _rules_of(self, kind, parent, region, record, previous):
+        """Find the rules of the changed fields of a record, a rule is returned only once."""
+        if previous is None:
+            fields = record.keys()
+        else:
+            fields = [field for field, value in record.items() if previous.get(field) != value]
+        rules = {}
+        for field in fields:
+            for name in (region, parent, ANY_REGION):
+                for rule in self._index.get((kind, name, field), ()):
+                    rules[rule.name] = rule
+        return rules.values()
+
+    def process(self, changes, fetch_time=None):
+        """
+        # Evaluate the rules with the changed records, and send the alerts.
+
+        :param changes: The changes returned by `pyeumonia.feed.diff_snapshots()` or `UpdateFeed.publish()`.
+        :param fetch_time: The fetch time of the new snapshot, default is None, use current time.
+        :return: The alerts which are sent.
+        """
+        now = self.clock()
+        date_id = int(time.strftime('%Y%m%d', time.localtime(fetch_time or now)))
+        alerts = []
+        for change in changes:
+            key = (change['kind'], change['parent'], change['region'])
+            record = change['data']
+            previous = self._records.get(key)
+            if self._date_ids.get(key, date_id) < date_id:
+                self._yesterday[key] = previous
+            self._date_ids[key] = date_id
+            if record is None:
+                self._records.pop(key, None)
+                continue
+            self._records[key] = record
+            if not isinstance(record, dict):  # The danger areas of a city are a list, they are watched by the counts.
+                continue
+            for rule in self._rules_of(*key, record, previous):
+                identity = (rule.name,) + key
+                result = rule.check(change['region'], record, previous, self._yesterday.get(key))
+                if result is None:
+                    self._active.discard(identity)
+                    continue
+                if rule.sustained and identity in self._active:  # It has been sent, and it's still triggered.
+                    continue
+                if rule.cooldown and now - self._sent.get(identity, float('-inf')) < rule.cooldown:
+                    self.suppressed += 1
+                    continue
+                compared, message = result
+                if rule.sustained:
+                    self._active.add(identity)
+                self._sent[identity] = now
+                alerts.append(Alert(rule.name, *key, rule.field, record.get(rule.field), compared, message))
+        for alert in alerts:
+            for callback in self.callbacks:
+                try:
+                    callback(alert)
+                except Exception:
+                    self.failed += 1
+                    logger.exception('The callback %r failed with %r.', callback, alert)
+        return alerts
+
+    def evaluate(self, old, new):
+        """
+        # Evaluate the rules with the changes between two snapshots.
+
+        :param old: The old snapshot returned by `Covid19.snapshot()`, or None.
+        :param new: The new snapshot.
+        :return: The alerts which are sent.
+        """
+        return self.process(diff_snapshots(old, new), new['fetch_time'])
+
+    def refresh(self, covid):
+        """
+        # Refresh the data of a `Covid19` instance, and evaluate the rules with the changes.
+
+        :param covid: The `Covid19` instance.
+        :return: The alerts which are sent.
+        """
+        old = covid.snapshot()
+        version = covid.version
+        covid.refresh()
+        if covid.version == version:  # Nothing is changed, there is no need to compare the snapshots.
+            return []
+        return self.evaluate(old, covid.snapshot())
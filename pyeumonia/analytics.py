@@ -0,0 +1,161 @@
+import weakref  # Import weakref module, which is used to cache the analytics of every Covid19 instance
+
+import numpy as np  # Import numpy module, which is used to compute the metrics of all the regions at once
+
+from . import CovidException
+from .timeline import TimelineMatrix, TimelinePyramid
+
+# The snapshot version of every Covid19 instance, and its analytics keyed by the regions.
+_cache = weakref.WeakKeyDictionary()
+
+
+class Analytics:
+    """
+    # Compute the epidemiological metrics of all the regions at once.
+
+    The timelines of all the regions are stacked into region × day arrays, every metric is computed for every region
+    and every day in one pass, and every metric is computed only once.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    covid = Covid19()
+    analytics = covid.analytics()
+    # The 7-day moving average of new cases in the latest day of every region.
+    latest = analytics.latest(analytics.moving_average(7))
+    ```
+    :param matrix: A `pyeumonia.timeline.TimelineMatrix`.
+    """
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.labels = matrix.labels
+        self.date_ids = matrix.date_ids
+        self._results = {}
+
+    @classmethod
+    def from_covid(cls, covid, provinces=True, countries=True, max_workers=8):
+        """
+        # Download the timelines of all the regions and compute the metrics, the result is cached for every snapshot.
+
+        :param covid: The `Covid19` instance.
+        :param provinces: If you don't want to include Chinese provinces, set this parameter to False.
+        :param countries: If you don't want to include the countries, set this parameter to False.
+        :param max_workers: The count of timelines which are downloaded at the same time, default is 8.
+        :return: The analytics.
+        """
+        version, cache = _cache.get(covid, (None, None))
+        if version != covid.version:
+            # The analytics of the old snapshots will not be used any more.
+            cache = {}
+            _cache[covid] = (covid.version, cache)
+        key = (provinces, countries)
+        if key not in cache:
+            timelines = ((region_name, timeline) for region_type, region_name, timeline
+                         in covid.fetch_timelines(provinces, countries, max_workers))
+            cache[key] = cls(TimelineMatrix.stack(timelines))
+        return cache[key]
+
+    def _cached(self, key, compute):
+        """Compute a metric only once."""
+        if key not in self._results:
+            result = compute()
+            result.setflags(write=False)
+            self._results[key] = result
+        return self._results[key]
+
+    def new_cases(self, field='confirmedCount'):
+        """
+        # Get the daily increments of a field.
+
+        :param field: The field, default is 'confirmedCount'.
+        :return: A region × day numpy array, the increment of the first day is 0.
+        """
+        return self._cached(('new_cases', field), lambda: np.diff(
+            self.matrix[field], axis=1, prepend=self.matrix[field][:, :1]))
+
+    def _window_sums(self, window, field):
+        """Get the sum of the increments in the last `window` days, for every day."""
+        if not isinstance(window, (int, np.integer)) or window <= 0:
+            raise CovidException(f'The window {window} must be a positive integer.')
+
+        def compute():
+            cumsum = np.cumsum(self.new_cases(field), axis=1)
+            sums = cumsum.copy()
+            sums[:, window:] -= cumsum[:, :-window]
+            return sums
+        return self._cached(('window_sums', window, field), compute)
+
+    def moving_average(self, window=7, field='confirmedCount'):
+        """
+        # Get the moving average of the daily increments.
+
+        :param window: The count of days, default is 7.
+        :param field: The field, default is 'confirmedCount'.
+        :return: A region × day numpy array, the first days are averaged over the days which are available.
+        """
+        def compute():
+            sums = self._window_sums(window, field)
+            return sums / np.minimum(np.arange(1, len(self.date_ids) + 1), window)
+        return self._cached(('moving_average', window, field), compute)
+
+    def week_over_week(self, field='confirmedCount'):
+        """
+        # Get the growth of the new cases in the last 7 days compared with the 7 days before.
+
+        :param field: The field, default is 'confirmedCount'.
+        :return: A region × day numpy array, 0.1 means 10% growth, nan if there is no case in the 7 days before.
+        """
+        def compute():
+            sums = self._window_sums(7, field).astype(np.float64)
+            previous = np.full_like(sums, np.nan)
+            previous[:, 7:] = sums[:, :-7]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(previous > 0, sums / previous - 1, np.nan)
+        return self._cached(('week_over_week', field), compute)
+
+    def doubling_time(self, field='confirmedCount'):
+        """
+        # Get the days for the cumulative count to double, estimated by the growth in the last 7 days.
+
+        :param field: The field, default is 'confirmedCount'.
+        :return: A region × day numpy array, inf if the count doesn't grow, nan if there is no data 7 days before.
+        """
+        def compute():
+            counts = self.matrix[field].astype(np.float64)
+            previous = np.full_like(counts, np.nan)
+            previous[:, 7:] = counts[:, :-7]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                growth = np.log(counts / previous)
+                return np.where(previous > 0, np.where(growth > 0, 7 * np.log(2) / growth, np.inf), np.nan)
+        return self._cached(('doubling_time', field), compute)
+
+    def case_fatality_rate(self):
+        """
+        # Get the case fatality rate, the dead count divided by the confirmed count.
+
+        :return: A region × day numpy array, nan if there is no confirmed case.
+        """
+        def compute():
+            confirmed = self.matrix['confirmedCount'].astype(np.float64)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return np.where(confirmed > 0, self.matrix['deadCount'] / confirmed, np.nan)
+        return self._cached(('case_fatality_rate',), compute)
+
+    def pyramid(self):
+        """
+        # Get the timelines aggregated by day, week, month and quarter, which are built only once.
+
+        :return: A `pyeumonia.timeline.TimelinePyramid`.
+        """
+        if 'pyramid' not in self._results:
+            self._results['pyramid'] = TimelinePyramid(self.matrix)
+        return self._results['pyramid']
+
+    def latest(self, metric):
+        """
+        # Get the value of a metric in the latest day for every region.
+
+        :param metric: A region × day numpy array returned by the methods above.
+        :return: A dict of the region name and the value.
+        """
+        return dict(zip(self.labels, metric[:, -1].tolist()))
@@ -0,0 +1,187 @@
+import array  # Import array module, which is used to collect the columns before writing them
+import mmap  # Import mmap module, which is used to load the file without reading it
+import os  # Import os module, which is used to replace the old file atomically
+import struct  # Import struct module, which is used to pack the header and the region index
+import sys  # Import sys module, which is used to check the byte order of the machine
+
+MAGIC = b'PYEUTL01'
+# magic, count of regions, count of rows
+HEADER = struct.Struct('<8sIQ')
+# region type, region name, the first row and the count of rows of the region
+INDEX_ENTRY = struct.Struct('<B7x88sQQ')
+REGION_TYPES = ['province', 'country']
+# The columns in the file, dateId is int32, the counts are int64, all of them are little-endian like the header.
+COLUMNS = [
+    ('dateId', 'i'),
+    ('confirmedCount', 'q'),
+    ('curedCount', 'q'),
+    ('deadCount', 'q'),
+    ('currentConfirmedCount', 'q'),
+    ('confirmedIncr', 'q'),
+    ('curedIncr', 'q'),
+    ('deadIncr', 'q'),
+    ('currentConfirmedIncr', 'q'),
+]
+
+
+def _align(offset):
+    """Align the offset to 8 bytes, so every int64 column can be read directly."""
+    return (offset + 7) // 8 * 8
+
+
+def write_timelines(path, timelines):
+    """
+    # Write the timelines into a binary file.
+
+    The file contains a region index and one fixed-width column for every field, the rows of every region are
+    continuous in the columns, so the file can be loaded by `TimelineFile` with `mmap`.
+    :param path: The path of the file, the old file will be replaced after the new file is written.
+    :param timelines: A iterable of (region type, region name, timeline), such as the result of
+    `Covid19.iter_timelines()`.
+    :return: The count of regions written into the file.
+    """
+    index = []
+    columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+    rows = 0
+    for region_type, region_name, timeline in timelines:
+        name = region_name.encode('utf-8')
+        if len(name) > 88:
+            raise ValueError(f'The region name {region_name} is too long.')
+        index.append((REGION_TYPES.index(region_type), name, rows, len(timeline)))
+        for day in timeline:
+            for field, column in columns.items():
+                column.append(day.get(field, 0))
+        rows += len(timeline)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, len(index), rows))
+            for entry in index:
+                f.write(INDEX_ENTRY.pack(*entry))
+            for name, typecode in COLUMNS:
+                column = columns[name]
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                f.write(b'\0' * (_align(f.tell()) - f.tell()))
+                f.write(column.tobytes())
+        os.replace(temp_path, path)
+    except BaseException:
+        # The old file is kept, and the half-written file is removed.
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return len(index)
+
+
+def dump_timelines(covid, path, provinces=True, countries=True):
+    """
+    # Download the timelines of all the regions and write them into a binary file.
+
+    :param covid: The `Covid19` instance.
+    :param path: The path of the file.
+    :param provinces: If you don't want to save the timelines of Chinese provinces, set this parameter to False.
+    :param countries: If you don't want to save the timelines of the countries, set this parameter to False.
+    :return: The count of regions written into the file.
+    """
+    return write_timelines(path, covid.iter_timelines(provinces=provinces, countries=countries))
+
+
+class TimelineFile:
+    """
+    # Load the timelines from a binary file written by `write_timelines`.
+
+    The file is mapped into memory, nothing is copied while loading, so it's fast to open, and several processes
+    share the same page cache. On a big-endian machine, the columns are copied and converted to the native byte order.
+    Usage:
+    ```python
+    from pyeumonia.binary import TimelineFile
+    timelines = TimelineFile('timelines.bin')
+    confirmed = timelines.column('上海', 'confirmedCount')
+    ```
+    :param path: The path of the file.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        magic, region_count, rows = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a timeline file.')
+        self.regions = {}
+        offset = HEADER.size
+        for i in range(region_count):
+            region_type, name, first, count = INDEX_ENTRY.unpack_from(buffer, offset)
+            region_name = name.rstrip(b'\0').decode('utf-8')
+            self.regions[(REGION_TYPES[region_type], region_name)] = (first, count)
+            offset += INDEX_ENTRY.size
+        self._columns = {}
+        for name, typecode in COLUMNS:
+            offset = _align(offset)
+            size = struct.calcsize(typecode) * rows
+            column = buffer[offset:offset + size].cast(typecode)
+            if sys.byteorder != 'little':
+                native = array.array(typecode, column)
+                native.byteswap()
+                column.release()
+                column = memoryview(native)
+            self._columns[name] = column
+            offset += size
+        buffer.release()
+
+    def close(self):
+        """
+        # Close the file.
+
+        The columns returned by `column()` and the timelines of `Timeline.from_file()` are views of the file, they are
+        still valid after closing, and the file is unmapped after the last of them is released or deleted.
+        """
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        if self._mmap is None:
+            return
+        try:
+            self._mmap.close()
+        except BufferError:  # Some columns are still used, the file is unmapped when they are garbage collected.
+            pass
+        self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _find(self, region_name, region_type=None):
+        """Find the rows of a region."""
+        if region_type is not None:
+            return self.regions[(region_type, region_name)]
+        for region_type in REGION_TYPES:
+            if (region_type, region_name) in self.regions:
+                return self.regions[(region_type, region_name)]
+        raise KeyError(region_name)
+
+    def column(self, region_name, field, region_type=None):
+        """
+        # Get a column of a region.
+
+        :param region_name: The short name of the province or the full name of the country.
+        :param field: The field, such as 'dateId' or 'confirmedCount'.
+        :param region_type: 'province' or 'country', default is None, find the region in both of them.
+        :return: A memoryview of the column, which is not copied from the file.
+        """
+        first, count = self._find(region_name, region_type)
+        return self._columns[field][first:first + count]
+
+    def timeline(self, region_name, region_type=None):
+        """
+        # Get the timeline of a region, in the same format as `Covid19.fetch_timeline`.
+
+        :param region_name: The short name of the province or the full name of the country.
+        :param region_type: 'province' or 'country', default is None, find the region in both of them.
+        :return: The data of every day.
+        """
+        first, count = self._find(region_name, region_type)
+        columns = [(name, self._columns[name]) for name, typecode in COLUMNS]
+        return [{name: column[i] for name, column in columns} for i in range(first, first + count)]
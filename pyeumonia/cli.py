@@ -0,0 +1,205 @@
+import argparse  # Import argparse module, which is used to parse the command-line arguments
+import hashlib  # Import hashlib module, which is used to name the cached outputs
+import json  # Import json module, which is used to save the snapshot and print the data
+import locale  # Import locale module, which is used to get system language
+import os  # Import os module, which is used to find the cache directory
+import sys  # Import sys module, which is used to print the data
+import time  # Import time module, which is used to check if the cache is fresh
+
+from . import Covid19, CovidException
+
+
+def cache_dir():
+    """Get the cache directory, `$XDG_CACHE_HOME/pyeumonia` or `~/.cache/pyeumonia`."""
+    root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(root, 'pyeumonia')
+
+
+def _write_atomic(path, data):
+    """Write a file, the readers will never see a half-written file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+def load_covid(language='auto', max_age=600, refresh=False):
+    """
+    # Get a `Covid19` instance, from the cached snapshot if it's fresh, otherwise fetch the data and cache it.
+
+    :param language: The language of the data, default is 'auto'.
+    :param max_age: The cached snapshot is fresh in ** seconds, default is 600.
+    :param refresh: If you want to fetch the data even if the cache is fresh, set this parameter to True.
+    :return: A `Covid19` instance.
+    """
+    path = os.path.join(cache_dir(), 'snapshot.json')
+    if not refresh:
+        try:
+            if time.time() - os.stat(path).st_mtime < max_age:
+                with open(path, 'rb') as f:
+                    return Covid19.from_snapshot(json.loads(f.read()), language=language)
+        except (OSError, ValueError):
+            pass
+    covid = Covid19(language=language, check_upgradable=False)
+    _write_atomic(path, json.dumps(covid.snapshot(), ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+    # The cached outputs of the old snapshot will not be used any more.
+    output_dir = os.path.join(cache_dir(), 'output')
+    for name in os.listdir(output_dir) if os.path.isdir(output_dir) else []:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except OSError:
+            pass
+    return covid
+
+
+def _output_path(stat, options):
+    """The cached output is named by the modified time of the snapshot and the options of the command."""
+    key = json.dumps([stat.st_mtime_ns, options], ensure_ascii=False, sort_keys=True)
+    return os.path.join(cache_dir(), 'output', hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def _rows(data):
+    """Convert the data to rows, the nested lists and dicts are kept as json."""
+    if isinstance(data, dict) and isinstance(data.get('data'), list):
+        name = {key: value for key, value in data.items() if key != 'data'}
+        data = [dict(name, **row) for row in data['data']]
+    elif isinstance(data, dict):
+        data = [data]
+    elif data is None:
+        data = []
+    rows = []
+    for row in data:
+        rows.append({key: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+                     for key, value in row.items()})
+    return rows
+
+
+def render(data, output_format='json'):
+    """
+    # Convert the data to text.
+
+    :param data: The data returned by `Covid19`.
+    :param output_format: 'json', 'csv' or 'table', default is 'json'.
+    :return: The text.
+    """
+    if output_format == 'json':
+        return json.dumps(data, ensure_ascii=False, indent=2) + '\n'
+    rows = _rows(data)
+    columns = []
+    for row in rows:
+        columns.extend(key for key in row if key not in columns)
+    if output_format == 'csv':
+        import csv  # Import csv module, which is used to print the data as csv
+        import io  # Import io module, which is used to write the csv into a string
+        output = io.StringIO()
+        writer = csv.DictWriter(output, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+        return output.getvalue()
+    cells = [[str(column) for column in columns]] + [[str(row.get(column, '')) for column in columns] for row in rows]
+    widths = [max(_width(line[i]) for line in cells) for i in range(len(columns))]
+    return ''.join('  '.join(cell + ' ' * (width - _width(cell)) for cell, width in zip(line, widths)).rstrip() + '\n'
+                   for line in cells)
+
+
+def _width(text):
+    """Get the width of a text in the terminal, a Chinese character is as wide as two letters."""
+    return sum(2 if ord(char) > 0x2e80 else 1 for char in text)
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='pyeumonia', description='Get the latest covid-19 data from DXY.')
+    parser.add_argument('-l', '--language', default='auto', help="'zh_CN' or 'en_US', default is 'auto'")
+    parser.add_argument('-f', '--format', default='json', choices=['json', 'csv', 'table'], dest='output_format')
+    parser.add_argument('--max-age', type=int, default=600, help='the cached data is fresh in ** seconds')
+    parser.add_argument('--refresh', action='store_true', help='fetch the data even if the cache is fresh')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('world', help='the data of all the countries')
+    china = commands.add_parser('china', help='the data of all the Chinese provinces')
+    china.add_argument('--cities', action='store_true', help='include the cities')
+    country = commands.add_parser('country', help='the data of a country')
+    country.add_argument('name', nargs='?', default='United States of America')
+    country.add_argument('--timeline', type=int, default=0, help='the data of the last ** days')
+    province = commands.add_parser('province', help='the data of a Chinese province')
+    province.add_argument('name', nargs='?', default='北京')
+    province.add_argument('--timeline', type=int, default=0, help='the data of the last ** days')
+    city = commands.add_parser('city', help='the data of a Chinese city')
+    city.add_argument('name', nargs='?', default='杨浦区')
+    city.add_argument('--danger-areas', action='store_true', help='include the count of danger areas')
+    danger_areas = commands.add_parser('danger-areas', help='the danger areas in China')
+    danger_areas.add_argument('--city', default=None)
+    news = commands.add_parser('news', help='the latest news')
+    news.add_argument('--province', default=None)
+    news.add_argument('--no-summary', action='store_true')
+    serve = commands.add_parser('serve', help='start the HTTP server')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8000)
+    serve.add_argument('--refresh-interval', type=int, default=600)
+    return parser
+
+
+def query(covid, args):
+    """Get the data of a command."""
+    if args.command == 'world':
+        return covid.world_covid_data()
+    if args.command == 'china':
+        return covid.cn_covid_data(include_cities=args.cities)
+    if args.command == 'country':
+        return covid.country_covid_data(args.name, show_timeline=args.timeline)
+    if args.command == 'province':
+        return covid.province_covid_data(args.name, show_timeline=args.timeline)
+    if args.command == 'city':
+        return covid.city_covid_data(args.name, show_danger_areas=args.danger_areas)
+    if args.command == 'danger-areas':
+        return covid.danger_areas_data(args.city)
+    if args.command == 'news':
+        return covid.cn_news_data(args.province, show_summary=not args.no_summary)
+
+
+def main(argv=None):
+    """
+    # The command-line interface, `pyeumonia` or `python -m pyeumonia`.
+
+    The data is served from the cached snapshot if it's fresh, and the output of every command is cached for the
+    snapshot, so a cached command only reads a small file.
+    :param argv: The arguments, default is None, use `sys.argv`.
+    :return: The exit code.
+    """
+    args = _parser().parse_args(argv)
+    if args.command == 'serve':
+        from .server import serve
+        serve(args.host, args.port, args.language, args.refresh_interval)
+        return 0
+    if args.language == 'auto':
+        args.language = locale.getdefaultlocale()[0]
+    if args.language != 'zh_CN':
+        args.language = 'en_US'
+    snapshot_path = os.path.join(cache_dir(), 'snapshot.json')
+    options = {key: value for key, value in vars(args).items() if key not in ['max_age', 'refresh']}
+    try:
+        stat = os.stat(snapshot_path)
+    except OSError:
+        stat = None
+    if stat is not None and not args.refresh and time.time() - stat.st_mtime < args.max_age:
+        try:
+            with open(_output_path(stat, options), 'rb') as f:
+                sys.stdout.write(f.read().decode('utf-8'))
+            return 0
+        except OSError:
+            pass
+    try:
+        covid = load_covid(args.language, args.max_age, args.refresh)
+        output = render(query(covid, args), args.output_format)
+    except CovidException as e:
+        print(*e.args, file=sys.stderr)
+        return 1
+    except OSError as e:  # Such as the network errors of requests and the timeouts, they are subclasses of OSError.
+        if args.language == 'zh_CN':
+            print(f'获取数据失败，请检查网络连接：{e}', file=sys.stderr)
+        else:
+            print(f'Failed to get the data, please check your network connection: {e}', file=sys.stderr)
+        return 1
+    _write_atomic(_output_path(os.stat(snapshot_path), options), output.encode('utf-8'))
+    sys.stdout.write(output)
+    return 0
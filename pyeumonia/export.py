@@ -0,0 +1,213 @@
+import array  # Import array module, which is used to collect the integer columns without python objects
+import gzip  # Import gzip module, which is used to compress the ndjson files
+import json  # Import json module, which is used to write the ndjson files
+import os  # Import os module, which is used to make the directories of the partitions
+import time  # Import time module, which is used to get the date of the snapshot
+
+from . import CovidException, IGNORE_CITIES, TIMELINE_FIELDS
+
+COUNT_FIELDS = ['currentConfirmedCount', 'confirmedCount', 'curedCount', 'deadCount']
+
+
+def _import_pyarrow(language='en_US'):
+    """Import pyarrow, it's an optional dependency."""
+    try:
+        import pyarrow
+    except ImportError:
+        if language == 'zh_CN':
+            raise CovidException('导出数据需要安装pyarrow，请使用 `pip install pyarrow` 安装。')
+        raise CovidException('pyarrow is required to export the data, please install it by `pip install pyarrow`.')
+    return pyarrow
+
+
+def _int_column(pa, values):
+    """Build an int64 arrow array from the buffer of an `array.array`, the values are not copied again."""
+    values = array.array('q', values)
+    return pa.Array.from_buffers(pa.int64(), len(values), [None, pa.py_buffer(values)])
+
+
+def snapshot_table(covid, dataset='world', language=None):
+    """
+    # Build an arrow table from the snapshot of a `Covid19` instance.
+
+    :param covid: The `Covid19` instance.
+    :param dataset: 'world' for `world_covid_data()`, 'provinces' for `cn_covid_data()`,
+    'cities' for `cn_covid_data(include_cities=True)`, default is 'world'.
+    :param language: The language of the names, default is None, use the language of the instance.
+    :return: A `pyarrow.Table`.
+    """
+    pa = _import_pyarrow(covid.language)
+    if dataset == 'world':
+        rows = covid.w_data
+        translations = covid.translations(language)
+        columns = {
+            'countryName': pa.array(translations['countryName'], pa.string()),
+            'continents': pa.array(translations['continents'], pa.string()),
+        }
+    elif dataset == 'provinces':
+        rows = covid.c_data
+        columns = {'provinceShortName': pa.array([province['provinceShortName'] for province in rows], pa.string())}
+    elif dataset == 'cities':
+        rows = []
+        province_names = []
+        for province in covid.c_data:
+            if province['provinceShortName'] in ['香港', '澳门', '台湾']:
+                cities = [dict(province, cityName=province['provinceShortName'])]
+            else:
+                cities = [city for city in province['cities'] if city['cityName'] not in IGNORE_CITIES]
+            rows.extend(cities)
+            province_names.extend([province['provinceShortName']] * len(cities))
+        columns = {
+            'provinceShortName': pa.array(province_names, pa.string()),
+            'cityName': pa.array([city['cityName'] for city in rows], pa.string()),
+        }
+    else:
+        raise CovidException(f'The dataset {dataset} is not supported.')
+    for field in COUNT_FIELDS:
+        columns[field] = _int_column(pa, (row[field] for row in rows))
+    return pa.table(columns)
+
+
+def timelines_table(timelines):
+    """
+    # Build an arrow table from the timelines of several regions.
+
+    :param timelines: A iterable of (region type, region name, timeline), such as the result of
+    `Covid19.iter_timelines()`, the timeline can be a list of dicts or a `pyeumonia.timeline.Timeline`.
+    :return: A `pyarrow.Table`, with one row for every day of every region.
+    """
+    pa = _import_pyarrow()
+    region_types = []
+    region_names = []
+    chunks = {field: [] for field in TIMELINE_FIELDS}
+    for region_type, region_name, timeline in timelines:
+        region_types.append(pa.array([region_type] * len(timeline), pa.string()))
+        region_names.append(pa.array([region_name] * len(timeline), pa.string()))
+        for field in TIMELINE_FIELDS:
+            if isinstance(timeline, list):
+                chunks[field].append(_int_column(pa, (day[field] for day in timeline)))
+            else:  # The numpy arrays of a Timeline are converted without copying.
+                chunks[field].append(pa.array(timeline[field]).cast(pa.int64()))
+    columns = {
+        'regionType': pa.chunked_array(region_types, pa.string()),
+        'regionName': pa.chunked_array(region_names, pa.string()),
+    }
+    for field in TIMELINE_FIELDS:
+        columns[field] = pa.chunked_array(chunks[field], pa.int64())
+    return pa.table(columns)
+
+
+def to_pandas(table, self_destruct=False):
+    """
+    # Convert an arrow table to a pandas DataFrame.
+
+    The integer columns without null values are converted without copying where pandas allows it.
+    :param table: The `pyarrow.Table`.
+    :param self_destruct: If the table is not used any more, set this parameter to True, its buffers are released
+    while they are converted, so the memory is not doubled. The table must not be used after that.
+    :return: A `pandas.DataFrame`.
+    """
+    try:
+        return table.to_pandas(split_blocks=True, self_destruct=self_destruct)
+    except ImportError:
+        raise CovidException('pandas is required to convert the data, please install it by `pip install pandas`.')
+
+
+def write_parquet(covid, root, datasets=('world', 'provinces', 'cities'), language=None):
+    """
+    # Write the snapshot into parquet files, which are partitioned by the date of the snapshot and the dataset.
+
+    The files will be saved as `<root>/snapshot_date=<dateId>/dataset=<dataset>/<fetch time>.parquet`.
+    :param covid: The `Covid19` instance.
+    :param root: The root directory of the files.
+    :param datasets: The datasets to write, 'world', 'provinces', 'cities' and 'timelines' are supported,
+    the timelines of all the regions will be downloaded if 'timelines' is given.
+    :param language: The language of the names, default is None, use the language of the instance.
+    :return: The paths of the files.
+    """
+    _import_pyarrow(covid.language)
+    import pyarrow.parquet as pq
+    snapshot_date = time.strftime('%Y%m%d', time.localtime(covid.fetch_time))
+    paths = []
+    for dataset in datasets:
+        if dataset == 'timelines':
+            table = timelines_table(covid.iter_timelines())
+        else:
+            table = snapshot_table(covid, dataset, language)
+        directory = os.path.join(root, f'snapshot_date={snapshot_date}', f'dataset={dataset}')
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{covid.fetch_time}.parquet')
+        pq.write_table(table, path)
+        paths.append(path)
+    return paths
+
+
+def _write_region(f, region_type, region_name, timeline, compress):
+    """Write the timeline of a region into an ndjson file, every region is a gzip member if it's compressed."""
+    if compress:
+        f = gzip.GzipFile(fileobj=f, mode='wb')
+    for day in timeline:
+        record = {'regionType': region_type, 'regionName': region_name}
+        record.update(day)
+        f.write(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+    if compress:
+        f.close()
+
+
+def write_ndjson(covid, file, compress=None, resume=True, provinces=True, countries=True):
+    """
+    # Download the timelines of all the regions and write them into an ndjson file one by one.
+
+    Every line is one day of a region. The timelines are downloaded while they are written,
+    only one timeline is kept in memory, so the memory will not grow with the count of regions.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.export import write_ndjson
+    covid = Covid19()
+    # If the export is interrupted, run it again and it will continue from the last region.
+    write_ndjson(covid, 'timelines.ndjson.gz')
+    ```
+    :param covid: The `Covid19` instance.
+    :param file: The path of the file, a str or a `pathlib.Path`, or a binary file-like object.
+    :param compress: If you want to compress the file with gzip, set this parameter to True,
+    default is None, compress it if the path ends with '.gz'.
+    :param resume: If the file is a path, the finished regions are saved into '<path>.progress',
+    when it's True, the regions in it will be skipped, and the unfinished region will be removed from the file.
+    :param provinces: If you don't want to write the timelines of Chinese provinces, set this parameter to False.
+    :param countries: If you don't want to write the timelines of the countries, set this parameter to False.
+    :return: The count of regions written this time.
+    """
+    if isinstance(file, os.PathLike):
+        file = os.fspath(file)
+    if compress is None:
+        compress = isinstance(file, str) and file.endswith('.gz')
+    if not isinstance(file, str):
+        count = 0
+        for region_type, region_name, timeline in covid.iter_timelines(provinces, countries):
+            _write_region(file, region_type, region_name, timeline, compress)
+            count += 1
+        return count
+    progress_path = f'{file}.progress'
+    finished = []
+    offset = 0
+    if resume and os.path.exists(progress_path) and os.path.exists(file):
+        with open(progress_path, encoding='utf-8') as progress:
+            for line in progress:
+                end, region_type, region_name = line.rstrip('\n').split('\t')
+                finished.append((region_type, region_name))
+                offset = int(end)
+    mode = 'r+b' if finished else 'wb'
+    count = 0
+    with open(file, mode) as f, open(progress_path, 'a' if finished else 'w', encoding='utf-8') as progress:
+        # Remove the region which was being written while the last export was interrupted.
+        f.seek(offset)
+        f.truncate()
+        for region_type, region_name, timeline in covid.iter_timelines(provinces, countries, skip=finished):
+            _write_region(f, region_type, region_name, timeline, compress)
+            f.flush()
+            progress.write(f'{f.tell()}\t{region_type}\t{region_name}\n')
+            progress.flush()
+            count += 1
+    os.remove(progress_path)
+    return count
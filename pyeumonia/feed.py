@@ -0,0 +1,238 @@
+import asyncio  # Import asyncio module, which is used to provide the async iterator of the changes
+import threading  # Import threading module, which is used to wake up the subscribers
+from collections import OrderedDict, deque  # Import collections module, which is used to queue the changes
+
+from .store import snapshot_records
+
+
+def diff_snapshots(old, new):
+    """
+    # Get the changed records between two snapshots.
+
+    :param old: The old snapshot returned by `Covid19.snapshot()`, or None.
+    :param new: The new snapshot.
+    :return: A list of changes, every change has the kind, parent, region and the new data, the data is None if the
+    record was removed.
+    """
+    old_records = snapshot_records(old) if old is not None else {}
+    new_records = snapshot_records(new)
+    changes = []
+    for key, data in new_records.items():
+        if old_records.get(key) != data:
+            changes.append(_change(key, data))
+    for key in old_records:
+        if key not in new_records:
+            changes.append(_change(key, None))
+    return changes
+
+
+def _change(key, data):
+    kind, parent, region = key
+    return {'kind': kind, 'parent': parent, 'region': region, 'data': data}
+
+
+def _matches(change, kinds, regions):
+    """Check if a change is wanted by the filters of a subscriber."""
+    if kinds and change['kind'] not in kinds:
+        return False
+    if regions and change['region'] not in regions and change['parent'] not in regions:
+        return False
+    return True
+
+
+class Subscription:
+    """
+    # The changes which are not received by a subscriber yet.
+
+    The subscriber never blocks the feed, if it's slower than the refreshing, the pending changes of the same record
+    are merged, only the latest one is kept, so the queue never grows over the count of records.
+    Use `get()` in a thread, or `async for changes in subscription` in a coroutine. After the changes are received,
+    `version` is the version of the feed which the latest of them were published in, it can be used as the `since` of
+    `UpdateFeed.changes_since()` to get the changes after them.
+    """
+
+    def __init__(self, feed, kinds=None, regions=None):
+        self.feed = feed
+        self.kinds = set(kinds or [])
+        self.regions = set(regions or [])
+        self.merged = 0  # The count of changes which are replaced by newer changes of the same record.
+        self.version = 0
+        self._pending = OrderedDict()
+        self._pending_version = 0
+        self._condition = threading.Condition()
+        self._waiters = []
+        self.closed = False
+
+    def _push(self, changes, version):
+        """Add the changes of a version into the queue, it's called by the feed and never blocks."""
+        wanted = [change for change in changes if _matches(change, self.kinds, self.regions)]
+        if not wanted:
+            return
+        with self._condition:
+            for change in wanted:
+                key = (change['kind'], change['parent'], change['region'])
+                if key in self._pending:
+                    self.merged += 1
+                    del self._pending[key]
+                self._pending[key] = change
+            self._pending_version = version
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def _take(self):
+        with self._condition:
+            changes = list(self._pending.values())
+            self._pending.clear()
+            if changes:
+                self.version = self._pending_version
+            return changes
+
+    def get(self, timeout=None):
+        """
+        # Wait for the changes.
+
+        :param timeout: Wait for ** seconds at most, default is None, wait until there are changes.
+        :return: A list of changes, it's empty if there is no change before timeout.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._pending or self.closed, timeout)
+        return self._take()
+
+    def close(self):
+        """Stop receiving the changes."""
+        self.feed.unsubscribe(self)
+        self.closed = True
+        with self._condition:
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            if self.closed:
+                raise StopAsyncIteration
+            event = asyncio.Event()
+            with self._condition:
+                if not self._pending:
+                    self._waiters.append((asyncio.get_running_loop(), event))
+                else:
+                    event.set()
+            await event.wait()
+            changes = self._take()
+            if changes:
+                return changes
+
+
+class UpdateFeed:
+    """
+    # Push the changed records to the subscribers after every refresh.
+
+    The changes of a refresh are computed only once, and pushed to every subscriber with its own filters.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.feed import UpdateFeed
+    covid = Covid19()
+    feed = UpdateFeed(covid)
+    subscription = feed.subscribe(kinds=['province', 'dangerAreas'], regions=['上海'])
+    feed.refresh()
+    changes = subscription.get(timeout=0)
+    ```
+    :param covid: The `Covid19` instance, default is None, the snapshots can also be published by `publish()`.
+    :param history: The count of refreshes which are kept for `changes_since()`, default is 64.
+    """
+
+    def __init__(self, covid=None, history=64):
+        self.covid = covid
+        self.version = 0
+        self.history = deque(maxlen=history)
+        self._subscriptions = []
+        self._condition = threading.Condition()
+
+    def subscribe(self, kinds=None, regions=None):
+        """
+        # Subscribe the changes.
+
+        :param kinds: The kinds of the records, such as ['province', 'city', 'dangerAreas', 'country', 'news'],
+        default is None, subscribe all of them.
+        :param regions: The names of the regions, the changes of the cities and danger areas in a province are included
+        if the province is given, default is None, subscribe all of them.
+        :return: A `Subscription`.
+        """
+        subscription = Subscription(self, kinds, regions)
+        with self._condition:
+            self._subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Stop pushing the changes to a subscriber."""
+        with self._condition:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+
+    def publish(self, old, new):
+        """
+        # Push the changes between two snapshots to the subscribers.
+
+        :param old: The old snapshot returned by `Covid19.snapshot()`.
+        :param new: The new snapshot.
+        :return: The changes.
+        """
+        changes = diff_snapshots(old, new)
+        if not changes:
+            return changes
+        with self._condition:
+            self.version += 1
+            self.history.append((self.version, changes))
+            self._condition.notify_all()
+            # The changes are pushed in the order of the versions, `_push()` never blocks.
+            for subscription in self._subscriptions:
+                subscription._push(changes, self.version)
+        return changes
+
+    def refresh(self):
+        """
+        # Refresh the data of the `Covid19` instance, and push the changes to the subscribers.
+
+        :return: The changes.
+        """
+        old = self.covid.snapshot()
+        version = self.covid.version
+        self.covid.refresh()
+        if self.covid.version == version:  # Nothing is changed, there is no need to compare the snapshots.
+            return []
+        return self.publish(old, self.covid.snapshot())
+
+    def changes_since(self, version, kinds=None, regions=None, timeout=None):
+        """
+        # Get the changes after a version, for long polling.
+
+        :param version: The version which is received last time, 0 for the first time.
+        :param kinds: The kinds of the records, default is None, all of them.
+        :param regions: The names of the regions, default is None, all of them.
+        :param timeout: If there is no change after the version, wait for ** seconds at most.
+        :return: A dict with the latest version and the changes, `reset` is True if the version is too old, or newer
+        than the latest one, such as after the server is restarted, and the client should get the full data again.
+        """
+        kinds = set(kinds or [])
+        regions = set(regions or [])
+        with self._condition:
+            # A version from before a restart is never reached, so it's reset at once instead of waiting.
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            history = list(self.history)
+            latest = self.version
+        reset = version > latest or version < latest and (not history or history[0][0] > version + 1)
+        changes = {}
+        for batch_version, batch in history:
+            if batch_version <= version:
+                continue
+            for change in batch:
+                if _matches(change, kinds, regions):
+                    changes[(change['kind'], change['parent'], change['region'])] = change
+        return {'version': latest, 'reset': reset, 'changes': list(changes.values())}
@@ -0,0 +1,79 @@
+import functools  # Import functools module, which is used to keep the names of the timed functions
+import time  # Import time module, which is used to time the phases
+from time import perf_counter  # The clock of the phases, which is looked up only once
+
+
+class Span:
+    """
+    # A finished phase of `Covid19`, which is passed to the hooks.
+
+    :param name: The name of the phase, such as 'fetch', 'parse', 'decode', 'timeline.fetch' or 'query.cn_covid_data'.
+    :param start: The start time, a unix timestamp in seconds.
+    :param duration: The duration in seconds.
+    :param attributes: The attributes of the phase, such as {'url': ..., 'bytes': ...}.
+    :param error: The exception raised in the phase, or None.
+    """
+    __slots__ = ('name', 'start', 'duration', 'attributes', 'error')
+
+    def __init__(self, name, start, duration, attributes, error=None):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.attributes = attributes
+        self.error = error
+
+    def __repr__(self):
+        return f'Span({self.name!r}, duration={self.duration:.6f}, attributes={self.attributes!r})'
+
+
+class Phase:
+    """
+    # Time a phase of a `Covid19` instance, use it as `with Phase(covid, 'fetch', url=url) as phase:`.
+
+    The duration is saved into `covid.timings`, the span is created only if there are hooks, so a phase costs two
+    clock reads when no hook is attached.
+    """
+    __slots__ = ('covid', 'name', 'attributes', 'started')
+
+    def __init__(self, covid, name, **attributes):
+        self.covid = covid
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        duration = time.perf_counter() - self.started
+        self.covid.timings[self.name] = duration
+        if self.covid.hooks:
+            span = Span(self.name, time.time() - duration, duration, self.attributes, exc)
+            for hook in self.covid.hooks:
+                hook(span)
+        return False
+
+
+def timed(name):
+    """
+    # Time a method of `Covid19` as a phase.
+
+    The methods are called very often, so the `Phase` is used only if there are hooks.
+    :param name: The name of the phase, the name of the method is used if it ends with '.'.
+    :return: The decorator.
+    """
+    def decorator(method):
+        phase_name = f'{name}{method.__name__}' if name.endswith('.') else name
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.hooks:
+                with Phase(self, phase_name):
+                    return method(self, *args, **kwargs)
+            started = perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.timings[phase_name] = perf_counter() - started
+        return wrapper
+    return decorator
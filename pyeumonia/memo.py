@@ -0,0 +1,111 @@
+import copy  # Import copy module, which is used to get a changeable copy of a memoized result
+import functools  # Import functools module, which is used to keep the names of the memoized functions
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError("The memoized result can't be changed, use copy.deepcopy() to get a changeable copy.")
+
+
+class FrozenDict(dict):
+    """A dict which can't be changed, it's still a dict, so it can be used by json and isinstance()."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """A list which can't be changed, it's still a list, so it can be used by json and isinstance()."""
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only
+    append = extend = insert = pop = remove = clear = sort = reverse = _read_only
+
+    def __copy__(self):
+        return list(self)
+
+    def __deepcopy__(self, memo):
+        return [copy.deepcopy(value, memo) for value in self]
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+# The types which are frozen by `freeze()`.
+_CONTAINERS = {dict, list, FrozenDict, FrozenList}
+
+
+def freeze(data):
+    """
+    # Copy the dicts and the lists in the data into the ones which can't be changed.
+
+    :param data: The data returned by a query method.
+    :return: The frozen data, the other objects such as `Timeline` are not copied.
+    """
+    if isinstance(data, dict):
+        frozen = FrozenDict(data)
+        # Most of the dicts only have numbers and strings, they are checked without a loop in python.
+        if not _CONTAINERS.isdisjoint(map(type, data.values())):
+            for key, value in data.items():
+                if type(value) in _CONTAINERS:
+                    dict.__setitem__(frozen, key, freeze(value))
+        return frozen
+    if isinstance(data, list):
+        return FrozenList([freeze(value) if type(value) in _CONTAINERS else value for value in data])
+    return data
+
+
+def memoized(bypass=()):
+    """
+    # Memoize a query method of `Covid19` for the current snapshot.
+
+    The results are keyed by the method and the arguments, and dropped when the version of the snapshot is changed.
+    A result is frozen, the same result is returned to every caller without copying, and nobody can change it, use
+    `copy.deepcopy()` to get a changeable copy.
+    At most `covid.memo_size` results are kept, the least recently used ones are dropped first.
+    :param bypass: The names of the parameters, if one of them is truthy, the method is always called, such as
+    'open_url' which opens a browser, or 'columnar' which returns numpy arrays.
+    :return: The decorator.
+    """
+    def decorator(method):
+        names = method.__code__.co_varnames[1:method.__code__.co_argcount]
+        positions = [(name, names.index(name)) for name in bypass]
+        method_name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            for name, position in positions:
+                if kwargs.get(name) or (len(args) > position and args[position]):
+                    return method(self, *args, **kwargs)
+            key = (method_name, args, tuple(sorted(kwargs.items())) if kwargs else ())
+            try:
+                hash(key)
+            except TypeError:
+                return method(self, *args, **kwargs)
+            memo = self._memo
+            version = self.version
+            with self._memo_lock:
+                if self._memo_version != version:
+                    memo.clear()
+                    self._memo_version = version
+                if key in memo:
+                    memo.move_to_end(key)
+                    self.memo_stats['hits'] += 1
+                    return memo[key]
+                self.memo_stats['misses'] += 1
+            result = freeze(method(self, *args, **kwargs))
+            with self._memo_lock:
+                # If the data is refreshed while computing, the result of the old snapshot is dropped.
+                if self._memo_version == version:
+                    memo[key] = result
+                    while len(memo) > self.memo_size:
+                        memo.popitem(last=False)
+            return result
+        return wrapper
+    return decorator
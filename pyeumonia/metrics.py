@@ -0,0 +1,368 @@
+import bisect  # Import bisect module, which is used to find the bucket of an observation
+import threading  # Import threading module, which is used to keep the values of every thread
+import time  # Import time module, which is used to get the age of the snapshot
+
+# The buckets of the durations in seconds.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+# The buckets of the response sizes in bytes.
+BYTES_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+
+def _escape(value):
+    """Escape a label value of the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    """Format the labels, such as '{phase="fetch"}'."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    """Format a number of the Prometheus text format."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    """
+    # The base class of the counters and the histograms.
+
+    Every thread updates its own values without any lock, and the values of all the threads are added up only when
+    the metrics are read. The values of the finished threads are merged when a new thread updates the metric, and
+    when the metrics are read, so there are never too many of them, even if the metrics are never read.
+    """
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._local = threading.local()
+        self._lock = threading.Lock()  # It's only used when a thread updates the metric at the first time.
+        self._shards = []
+        self._retired = {}
+
+    def _shard(self):
+        """Get the values of the current thread."""
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = {}
+            with self._lock:
+                # Such as a server with a thread for every connection, the finished threads are merged here too.
+                self._retire()
+                self._shards.append((threading.current_thread(), shard))
+            return shard
+
+    def _retire(self):
+        """Merge the values of the finished threads, the lock must be held."""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:  # Nobody will update it any more.
+                for key, value in shard.items():
+                    self._merge(self._retired, key, value)
+        self._shards = alive
+
+    def _key(self, labels):
+        return tuple(labels[name] for name in self.labels) if self.labels else ()
+
+    def _merge(self, total, key, value):
+        raise NotImplementedError
+
+    def values(self):
+        """
+        # Get the values of all the threads.
+
+        :return: A dict of the label values and the value.
+        """
+        with self._lock:
+            self._retire()
+            total = {}
+            for key, value in self._retired.items():
+                self._merge(total, key, value)
+            for thread, shard in self._shards:
+                for key, value in shard.copy().items():
+                    self._merge(total, key, value)
+        return total
+
+    def render(self):
+        """Get the metric in Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for key, value in sorted(self.values().items()):
+            lines.extend(self._render_value(key, value))
+        return '\n'.join(lines) + '\n'
+
+    def _render_value(self, key, value):
+        return [f'{self.name}{_labels(self.labels, key)} {_number(value)}']
+
+
+class Counter(_Metric):
+    """
+    # A value which only increases, such as the count of errors.
+
+    :param name: The name of the metric, such as 'pyeumonia_errors_total'.
+    :param documentation: The description of the metric.
+    :param labels: The names of the labels, default is ().
+    :param function: A function which returns a dict of the label values and the counts which are kept by others,
+    such as `covid.memo_stats`, they are added to the counts of `inc()` when the metrics are read, default is None.
+    """
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def values(self):
+        total = super().values()
+        if self.function is not None:
+            for key, value in self.function().items():
+                self._merge(total, key, value)
+        return total
+
+    def inc(self, amount=1, **labels):
+        """
+        # Increase the counter.
+
+        :param amount: The amount, default is 1.
+        :param labels: The values of the labels.
+        """
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge(self, total, key, value):
+        total[key] = total.get(key, 0) + value
+
+
+class Histogram(_Metric):
+    """
+    # Count the observations in buckets, such as the durations of the requests.
+
+    :param name: The name of the metric, such as 'pyeumonia_phase_seconds'.
+    :param documentation: The description of the metric.
+    :param labels: The names of the labels, default is ().
+    :param buckets: The upper bounds of the buckets, default is `LATENCY_BUCKETS`.
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """
+        # Add an observation.
+
+        :param value: The value.
+        :param labels: The values of the labels.
+        """
+        shard = self._shard()
+        key = self._key(labels)
+        counts = shard.get(key)
+        if counts is None:
+            # The count of every bucket and +Inf, then the sum.
+            counts = shard[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def _merge(self, total, key, value):
+        counts = total.get(key)
+        if counts is None:
+            total[key] = list(value)
+        else:
+            total[key] = [a + b for a, b in zip(counts, value)]
+
+    def _render_value(self, key, value):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value):
+            cumulative += count
+            le = _number(float(bound))
+            labels = _labels(self.labels, key, f'le="{le}"')
+            lines.append(f'{self.name}_bucket{labels} {cumulative}')
+        lines.append(f'{self.name}_sum{_labels(self.labels, key)} {_number(value[-1])}')
+        lines.append(f'{self.name}_count{_labels(self.labels, key)} {cumulative}')
+        return lines
+
+
+class Gauge(_Metric):
+    """
+    # A value which is computed when the metrics are read, such as the age of the snapshot.
+
+    :param name: The name of the metric, such as 'pyeumonia_snapshot_age_seconds'.
+    :param documentation: The description of the metric.
+    :param labels: The names of the labels, default is ().
+    :param function: A function which returns a dict of the label values and the value.
+    """
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labels=(), function=None):
+        super().__init__(name, documentation, labels)
+        self.function = function
+
+    def values(self):
+        return self.function() if self.function is not None else {}
+
+
+class Metrics:
+    """
+    # The metrics of the fetch health and the data freshness of a `Covid19` instance.
+
+    The durations and the sizes come from the phases of `Covid19` by its hooks, the gauges, the memoized results and
+    the conditional fetches of the instance are read from it when the metrics are read. Read them in Prometheus text
+    format by `render()`, or from `/metrics` of `CovidServer`.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.metrics import Metrics
+    metrics = Metrics()
+    covid = Covid19(hooks=[metrics.hook])
+    metrics.instrument(covid)
+    print(metrics.render())
+    ```
+    """
+
+    def __init__(self):
+        self.covid = None
+        self.phase_seconds = Histogram('pyeumonia_phase_seconds', 'The duration of the phases of Covid19.',
+                                       ['phase'])
+        self.response_bytes = Histogram('pyeumonia_response_bytes', 'The size of the responses from DXY.',
+                                        ['phase'], BYTES_BUCKETS)
+        self.bytes_received = Counter('pyeumonia_bytes_received_total', 'The bytes received from DXY.', ['phase'])
+        self.errors = Counter('pyeumonia_errors_total', 'The errors by phase and type.', ['phase', 'type'])
+        self.cache_requests = Counter('pyeumonia_cache_requests_total', 'The cache lookups by cache and result.',
+                                      ['cache', 'result'], function=self._memo_requests)
+        self.fetches = Counter('pyeumonia_fetches_total', 'The fetches of the DXY page.', function=self._fetches)
+        self.fetches_skipped = Counter('pyeumonia_fetches_skipped_total',
+                                       'The fetches which changed nothing, by reason.', ['reason'],
+                                       function=self._fetches_skipped)
+        self.page_sections = Counter('pyeumonia_page_sections_total',
+                                     'The scripts of the fetched pages which are decoded or reused.', ['result'],
+                                     function=self._page_sections)
+        self.snapshot_age = Gauge('pyeumonia_snapshot_age_seconds', 'The seconds since the snapshot was fetched.',
+                                  function=self._snapshot_age)
+        self.fetch_time = Gauge('pyeumonia_snapshot_fetch_time_seconds', 'The unix time of the snapshot.',
+                                function=self._fetch_time)
+        self.stale = Gauge('pyeumonia_snapshot_stale', '1 if the latest fetch failed and the old data is served.',
+                           function=self._stale)
+        self.records = Gauge('pyeumonia_records', 'The count of records in the snapshot.', ['kind'],
+                             function=self._records)
+        self.metrics = [self.phase_seconds, self.response_bytes, self.bytes_received, self.errors,
+                        self.cache_requests, self.fetches, self.fetches_skipped, self.page_sections, self.snapshot_age,
+                        self.fetch_time, self.stale, self.records]
+
+    def instrument(self, covid):
+        """
+        # Collect the metrics of a `Covid19` instance, the hook is added if it's not added yet.
+
+        :param covid: The `Covid19` instance.
+        :return: The instance.
+        """
+        self.covid = covid
+        if self.hook not in covid.hooks:
+            covid.add_hook(self.hook)
+        return covid
+
+    def hook(self, span):
+        """
+        # Update the metrics with a phase of `Covid19`, add it to the hooks of the instance.
+
+        :param span: A `pyeumonia.instrument.Span`.
+        """
+        self.phase_seconds.observe(span.duration, phase=span.name)
+        size = span.attributes.get('bytes')
+        if size is not None:
+            self.response_bytes.observe(size, phase=span.name)
+            self.bytes_received.inc(size, phase=span.name)
+        if span.error is not None:
+            self.errors.inc(phase=span.name, type=type(span.error).__name__)
+        elif span.attributes.get('status_code', 200) != 200:
+            self.errors.inc(phase=span.name, type=f'HTTP {span.attributes["status_code"]}')
+
+    def error(self, phase, error):
+        """
+        # Count an error which is not raised in a phase, such as a failed refresh of the server.
+
+        :param phase: The name of the phase.
+        :param error: The exception.
+        """
+        self.errors.inc(phase=phase, type=type(error).__name__)
+
+    def cache(self, name, hit):
+        """
+        # Count a cache lookup.
+
+        :param name: The name of the cache, such as 'server'.
+        :param hit: True if the value is found in the cache.
+        """
+        self.cache_requests.inc(cache=name, result='hit' if hit else 'miss')
+
+    def _stats(self, name):
+        """Get the stats of the `Covid19` instance, such as `memo_stats`, or None."""
+        return getattr(self.covid, name, None)
+
+    def _memo_requests(self):
+        stats = self._stats('memo_stats')
+        if stats is None:
+            return {}
+        return {('memo', 'hit'): stats['hits'], ('memo', 'miss'): stats['misses']}
+
+    def _fetches(self):
+        stats = self._stats('fetch_stats')
+        return {(): stats['fetches']} if stats is not None else {}
+
+    def _fetches_skipped(self):
+        stats = self._stats('fetch_stats')
+        if stats is None:
+            return {}
+        return {('not_modified',): stats['not_modified'], ('unchanged',): stats['unchanged']}
+
+    def _page_sections(self):
+        stats = self._stats('fetch_stats')
+        if stats is None:
+            return {}
+        return {('decoded',): stats['sections_decoded'], ('reused',): stats['sections_reused']}
+
+    def _snapshot_age(self):
+        if getattr(self.covid, 'fetch_time', None) is None:
+            return {}
+        return {(): max(0, time.time() - self.covid.fetch_time)}
+
+    def _fetch_time(self):
+        if getattr(self.covid, 'fetch_time', None) is None:
+            return {}
+        return {(): self.covid.fetch_time}
+
+    def _stale(self):
+        if getattr(self.covid, 'fetch_time', None) is None:
+            return {}
+        return {(): int(getattr(self.covid, 'stale', False))}
+
+    def _records(self):
+        if getattr(self.covid, 'fetch_time', None) is None:
+            return {}
+        c_data = self.covid.c_data
+        return {
+            ('province',): len(c_data),
+            ('city',): sum(len(province.get('cities', [])) for province in c_data),
+            ('dangerArea',): sum(len(province.get('dangerAreas', [])) for province in c_data),
+            ('country',): len(self.covid.w_data),
+            ('news',): len(self.covid.n_data),
+        }
+
+    def render(self):
+        """
+        # Get all the metrics in Prometheus text format.
+
+        :return: The text.
+        """
+        return ''.join(metric.render() for metric in self.metrics)
@@ -0,0 +1,233 @@
+import json  # Import json module, which is used to save the buckets into the shared file
+import os  # Import os module, which is used to open the shared file safely
+import threading  # Import threading module, which is used to protect the buckets in a process
+import time  # Import time module, which is used to refill the buckets
+from urllib.parse import urlsplit  # Import urllib.parse module, which is used to find the host of a request
+
+from . import CovidException
+from .cli import cache_dir
+from .shared import _lock, _unlock
+from .transport import RequestsTransport, Transport
+
+# The requests per second and the burst of every host, the hosts which are not in it are not limited.
+DEFAULT_LIMITS = {
+    'ncov.dxy.cn': (1, 3),
+    'file1.dxycdn.com': (10, 20),
+    'ipinfo.io': (1, 2),
+    'pypi.org': (1, 2),
+}
+
+
+def _state_dir():
+    """Get the private directory of the user, `$XDG_RUNTIME_DIR/pyeumonia` or the cache directory of the CLI."""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    return os.path.join(runtime_dir, 'pyeumonia') if runtime_dir else cache_dir()
+
+
+# The path of the buckets shared by all the processes of a user, it's not in the shared temporary directory, so the
+# other users can't replace it.
+DEFAULT_PATH = os.path.join(_state_dir(), 'ratelimit.json')
+
+
+def _open(path):
+    """Open the shared file for reading and writing, a symbolic link or a file of another user is never opened."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+    flags = os.O_RDWR | os.O_CREAT | getattr(os, 'O_NOFOLLOW', 0) | getattr(os, 'O_BINARY', 0)
+    try:
+        fd = os.open(path, flags, 0o600)
+    except OSError as e:  # Such as ELOOP, the path is a symbolic link.
+        raise CovidException(f'The rate limits can not be shared by {path}: {e}')
+    if hasattr(os, 'getuid') and os.fstat(fd).st_uid != os.getuid():
+        os.close(fd)
+        raise CovidException(f'The rate limits can not be shared by {path}, it belongs to another user.')
+    return os.fdopen(fd, 'r+b')
+
+
+class RateLimiter:
+    """
+    # Token buckets of the hosts, which are shared by all the processes on the same machine.
+
+    Every host has a bucket of `burst` tokens which is refilled at `rate` tokens per second, a request takes a token,
+    and waits if there is no token. The buckets are saved in a file which is locked while it's read and written, so
+    the processes which use the same path share the same limits. The file is opened once and kept open until
+    `close()`, it's created in a directory which only the user can access, and a symbolic link is never followed.
+    If the file is corrupted, such as by a process which was killed while writing it, the buckets are reset.
+    If the path is None, the buckets are only shared by the threads of this process.
+    When a host returns 429, `pause()` stops the requests of all the processes until the time in Retry-After.
+    :param limits: A dict of the host and a tuple of the requests per second and the burst, default is None,
+    use `DEFAULT_LIMITS`.
+    :param path: The path of the shared buckets, default is `DEFAULT_PATH`, set it to None to only limit this process.
+    :param clock: The function to get current time, default is `time.time`, it must be the same in all the processes.
+    """
+
+    def __init__(self, limits=None, path=DEFAULT_PATH, clock=time.time):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.path = path
+        self.clock = clock
+        self.waited = 0.0  # The seconds which the requests of this process waited for the tokens.
+        self._buckets = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _update(self, host, function):
+        """Call a function with the bucket of a host while it's locked, and save the bucket."""
+        with self._lock:
+            if self.path is None:
+                bucket = self._buckets.get(host)
+                result, self._buckets[host] = function(bucket)
+                return result
+            if self._file is None:
+                self._file = _open(self.path)
+            f = self._file
+            _lock(f, True)
+            try:
+                f.seek(0)
+                data = f.read()
+                try:
+                    buckets = json.loads(data) if data else {}
+                except ValueError:  # The file is corrupted, all the buckets are full again.
+                    buckets = {}
+                if not isinstance(buckets, dict):
+                    buckets = {}
+                bucket = buckets.get(host)
+                if not isinstance(bucket, list) or len(bucket) != 3:
+                    bucket = None
+                result, buckets[host] = function(bucket)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(buckets).encode('utf-8'))
+                f.flush()
+            finally:
+                _unlock(f)
+            return result
+
+    def close(self):
+        """Close the shared file, it's opened again by the next request."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _refill(self, host, bucket):
+        """Get the tokens, the update time and the pause time of a bucket after refilling it."""
+        rate, burst = self.limits[host]
+        now = self.clock()
+        if bucket is None:
+            return burst, now, 0
+        tokens, updated, paused_until = bucket
+        return min(burst, tokens + max(0, now - updated) * rate), now, paused_until
+
+    def try_acquire(self, host, tokens=1):
+        """
+        # Take tokens of a host if there are enough of them.
+
+        :param host: The host, such as 'ncov.dxy.cn'.
+        :param tokens: The count of tokens, default is 1.
+        :return: 0 if the tokens are taken, otherwise the seconds to wait for them.
+        """
+        if host not in self.limits:
+            return 0
+
+        def take(bucket):
+            available, now, paused_until = self._refill(host, bucket)
+            if now < paused_until:
+                return paused_until - now, [available, now, paused_until]
+            if available >= tokens:
+                return 0, [available - tokens, now, paused_until]
+            return (tokens - available) / self.limits[host][0], [available, now, paused_until]
+        return self._update(host, take)
+
+    def acquire(self, host, tokens=1, timeout=None):
+        """
+        # Take tokens of a host, wait until there are enough of them.
+
+        :param host: The host, such as 'ncov.dxy.cn'.
+        :param tokens: The count of tokens, default is 1.
+        :param timeout: Wait for ** seconds at most, default is None, wait until the tokens are taken.
+        :return: The seconds waited.
+        """
+        started = time.monotonic()
+        while True:
+            wait_time = self.try_acquire(host, tokens)
+            waited = time.monotonic() - started
+            if not wait_time:
+                self.waited += waited
+                return waited
+            if timeout is not None and waited + wait_time > timeout:
+                self.waited += waited
+                raise CovidException(f'The requests to {host} are rate limited, no token in {timeout} seconds.')
+            time.sleep(wait_time)
+
+    def available(self, host):
+        """
+        # Get the tokens of a host which can be taken now.
+
+        :param host: The host, such as 'ncov.dxy.cn'.
+        :return: The count of tokens, infinity if the host is not limited, 0 if it's paused.
+        """
+        if host not in self.limits:
+            return float('inf')
+
+        def peek(bucket):
+            available, now, paused_until = self._refill(host, bucket)
+            return (0 if now < paused_until else available), [available, now, paused_until]
+        return self._update(host, peek)
+
+    def interval(self, host):
+        """Get the seconds to get a new token of a host."""
+        return 1 / self.limits[host][0] if host in self.limits else 0
+
+    def pause(self, host, seconds):
+        """
+        # Stop the requests to a host in all the processes, such as after a 429 response.
+
+        :param host: The host.
+        :param seconds: The seconds to pause.
+        """
+        if host not in self.limits:
+            return
+
+        def stop(bucket):
+            available, now, paused_until = self._refill(host, bucket)
+            return None, [0, now, max(paused_until, now + seconds)]
+        self._update(host, stop)
+
+
+class RateLimitedTransport(Transport):
+    """
+    # Send the requests by another transport after taking a token of the host from a `RateLimiter`.
+
+    It's used by `Covid19` by default, under the retries of `ResilientTransport`, so the retries also take tokens.
+    If a host returns 429, its requests are paused in all the processes for the seconds in Retry-After.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.ratelimit import RateLimitedTransport, RateLimiter
+    from pyeumonia.resilience import ResilientTransport
+    limiter = RateLimiter({'ncov.dxy.cn': (1, 3), 'file1.dxycdn.com': (5, 10)})
+    covid = Covid19(transport=ResilientTransport(RateLimitedTransport(limiter=limiter)))
+    ```
+    :param transport: The transport which sends the requests, default is None, use `RequestsTransport`.
+    :param limiter: The `RateLimiter`, default is None, use `DEFAULT_LIMITS` shared by the processes.
+    :param pause: The seconds to pause a host after 429 if there is no Retry-After, default is 30.
+    """
+
+    def __init__(self, transport=None, limiter=None, pause=30):
+        self.transport = transport or RequestsTransport()
+        self.limiter = limiter or RateLimiter()
+        self.pause = pause
+
+    def get(self, url, headers=None, timeout=None):
+        host = urlsplit(url).netloc
+        self.limiter.acquire(host, timeout=timeout)
+        response = self.transport.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 429:
+            retry_after = {key.lower(): value for key, value in response.headers.items()}.get('retry-after')
+            try:
+                seconds = float(retry_after)
+            except (TypeError, ValueError):  # It's missing, or an HTTP date.
+                seconds = self.pause
+            self.limiter.pause(host, seconds)
+        return response
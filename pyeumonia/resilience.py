@@ -0,0 +1,242 @@
+import random  # Import random module, which is used to add jitter to the backoff
+import threading  # Import threading module, which is used to protect the states of the circuit breakers
+import time  # Import time module, which is used to check the deadlines and the circuit breakers
+from urllib.parse import urlsplit  # Import urllib.parse module, which is used to find the host of a request
+
+from . import CovidException
+from .transport import RequestsTransport, Transport
+
+# The status codes which mean the upstream is temporarily unavailable, the requests are retried.
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(CovidException):
+    """While the circuit breaker of a host is open, the request is rejected without being sent."""
+
+
+class CircuitBreaker:
+    """
+    # Stop sending the requests to a failing host for a while.
+
+    The breaker is opened after `failure_threshold` failed requests in a row, and the requests are rejected at once.
+    After `reset_timeout` seconds, one request is sent as a trial, the breaker is closed if it succeeds, otherwise it
+    stays open for another `reset_timeout` seconds.
+    :param failure_threshold: Open the breaker after ** failed requests in a row, default is 5.
+    :param reset_timeout: Send a trial request after ** seconds, default is 30.
+    :param clock: The function to get current time, default is `time.monotonic`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self._opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        # Check if a request can be sent.
+
+        :return: True if the breaker is closed, or a trial request can be sent.
+        """
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.clock() - self._opened_at < self.reset_timeout:
+                return False
+            # Only one trial request is sent in every `reset_timeout` seconds.
+            self.state = 'half_open'
+            self._opened_at = self.clock()
+            return True
+
+    def retry_after(self):
+        """Get the seconds until the next trial request."""
+        with self._lock:
+            if self.state == 'closed':
+                return 0
+            return max(0, self.reset_timeout - (self.clock() - self._opened_at))
+
+    def success(self):
+        """Record a successful request, the breaker is closed."""
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+
+    def failure(self):
+        """Record a failed request, the breaker is opened if there are too many failures, or the trial failed."""
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self.state = 'open'
+                self._opened_at = self.clock()
+
+
+class ResilientTransport(Transport):
+    """
+    # Send the requests by another transport with deadlines, retries, hedged requests and circuit breakers.
+
+    Every attempt waits for `timeout` seconds at most, and a request gives up after `deadline` seconds, even if the
+    transport doesn't support timeouts. The failed attempts and the responses in `RETRY_STATUS_CODES` are retried
+    with exponential backoff and full jitter. If `hedge_after` is given, a duplicate request is sent when the first
+    one is slower than it, and the first successful response is used.
+    The attempts which are given up keep running in daemon threads until the transport returns, `abandoned` is the
+    count of them, while there are `max_abandoned` of them, no more attempts are started and the requests fail.
+    Every host has its own circuit breaker, while it's open, `CircuitOpenError` is raised at once, and `Covid19` keeps
+    the last good snapshot and sets `covid.stale` to True.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.resilience import ResilientTransport
+    covid = Covid19(transport=ResilientTransport(timeout=5, retries=3, hedge_after=1))
+    ```
+    :param transport: The transport which sends the requests, default is None, use `RequestsTransport`.
+    :param timeout: The timeout of every attempt in seconds, default is 10.
+    :param deadline: Give up a request after ** seconds, including the retries, default is 30.
+    :param retries: The count of retries after the first attempt, default is 2.
+    :param backoff: The maximum delay before the first retry in seconds, it's doubled for every retry, default is 0.5.
+    :param max_backoff: The maximum delay before a retry in seconds, default is 10.
+    :param hedge_after: Send a duplicate request if the first one is slower than ** seconds, default is None,
+    no hedged requests.
+    :param failure_threshold: Open the circuit breaker after ** failed requests in a row, default is 5.
+    :param reset_timeout: Send a trial request ** seconds after the circuit breaker is opened, default is 30.
+    :param max_abandoned: Stop starting attempts while ** given up attempts are still running, default is 16.
+    """
+
+    def __init__(self, transport=None, timeout=10, deadline=30, retries=2, backoff=0.5, max_backoff=10,
+                 hedge_after=None, failure_threshold=5, reset_timeout=30, max_abandoned=16):
+        self.transport = transport or RequestsTransport()
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_abandoned = max_abandoned
+        self.abandoned = 0  # The count of the given up attempts which are still running.
+        self.breakers = {}
+        self.stats = {'requests': 0, 'retries': 0, 'timeouts': 0, 'hedges': 0, 'hedge_wins': 0, 'rejected': 0,
+                      'abandoned': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        """Increase a counter of `stats`, the requests and the hedged attempts are counted in different threads."""
+        with self._lock:
+            self.stats[name] += 1
+
+    def breaker(self, host):
+        """
+        # Get the circuit breaker of a host.
+
+        :param host: The host, such as 'ncov.dxy.cn'.
+        :return: A `CircuitBreaker`.
+        """
+        with self._lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def get(self, url, headers=None, timeout=None):
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            self._count('rejected')
+            raise CircuitOpenError(f'{host} is failing, the requests are stopped for {breaker.retry_after():.1f} '
+                                   f'seconds.')
+        self._count('requests')
+        timeout = min(timeout or self.timeout, self.timeout)
+        deadline = time.monotonic() + self.deadline
+        response, error = None, None
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                response, error = self._attempt(url, headers, min(timeout, remaining)), None
+            except CovidException:  # Such as a missing fixture, it will not be fixed by retrying.
+                raise
+            except Exception as e:
+                response, error = None, e
+            if response is not None and response.status_code not in RETRY_STATUS_CODES:
+                breaker.success()
+                return response
+            if attempt == self.retries:
+                break
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if time.monotonic() + delay >= deadline:
+                break
+            time.sleep(delay)
+            self._count('retries')
+        breaker.failure()
+        if response is not None:  # The status code is checked by the caller.
+            return response
+        if error is not None:
+            raise error
+        raise TimeoutError(f'{url} did not respond in {self.deadline} seconds.')
+
+    def _attempt(self, url, headers, timeout):
+        """Send a request, and a hedged one if it's slow, return the first successful response."""
+        import queue  # Import queue module, which is used to get the first finished request
+        started = time.monotonic()
+        results = queue.Queue()
+        running, given_up = set(), set()  # The indexes of the requests which are running, and which are given up.
+
+        def send(index):
+            try:
+                results.put((index, self.transport.get(url, headers=headers, timeout=timeout), None))
+            except Exception as e:
+                results.put((index, None, e))
+            finally:
+                with self._lock:
+                    running.discard(index)
+                    if index in given_up:
+                        self.abandoned -= 1
+
+        def start(index):
+            with self._lock:
+                if self.abandoned >= self.max_abandoned:
+                    return False
+                running.add(index)
+            # The threads are daemon threads, so a request which never returns doesn't block the exit of the program.
+            threading.Thread(target=send, args=(index,), daemon=True, name='pyeumonia-transport').start()
+            return True
+
+        if not start(0):
+            raise TimeoutError(f'{self.abandoned} requests which are given up are still running, {url} is not sent.')
+        sent, finished = 1, 0
+        response, error = None, None
+        hedge = self.hedge_after is not None
+        try:
+            while finished < sent:
+                hedging = hedge and sent == 1
+                wait_time = (min(self.hedge_after, timeout) if hedging else timeout) - (time.monotonic() - started)
+                try:
+                    index, response, error = results.get(timeout=max(0, wait_time))
+                except queue.Empty:
+                    if hedging and time.monotonic() - started < timeout:
+                        # The first request is slow, send a duplicate one, the first response of them is used.
+                        if start(1):
+                            self._count('hedges')
+                            sent += 1
+                        else:  # Too many attempts are given up, wait for the first one only.
+                            hedge = False
+                        continue
+                    self._count('timeouts')
+                    raise TimeoutError(f'{url} did not respond in {timeout} seconds.')
+                finished += 1
+                if error is None and response.status_code not in RETRY_STATUS_CODES:
+                    if index:
+                        self._count('hedge_wins')
+                    return response
+        finally:
+            # The slow requests keep running in the threads, but nobody waits for them.
+            with self._lock:
+                given_up.update(running)
+                self.abandoned += len(running)
+                self.stats['abandoned'] += len(running)
+        if error is not None:
+            raise error
+        return response
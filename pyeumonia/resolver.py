@@ -0,0 +1,351 @@
+import collections  # Import collections module, which is used to evict the least recently resolved names
+import functools  # Import functools module, which is used to cache the pinyin of the names
+import unicodedata  # Import unicodedata module, which is used to normalize the full-width characters and tones
+
+# The suffixes of the Chinese city names, '大兴安岭' is the same as '大兴安岭地区'.
+CITY_SUFFIXES = ['自治州', '自治县', '地区', '新区', '林区', '盟', '市', '区', '县']
+# The short names of the provinces, such as '沪' for '上海'.
+PROVINCE_ALIASES = {
+    '北京': ['京'], '天津': ['津'], '上海': ['沪', '申'], '重庆': ['渝'], '河北': ['冀'], '山西': ['晋'],
+    '内蒙古': ['蒙', 'inner mongolia'], '辽宁': ['辽'], '吉林': ['吉'], '黑龙江': ['黑'], '江苏': ['苏'],
+    '浙江': ['浙'], '安徽': ['皖'], '福建': ['闽'], '江西': ['赣'], '山东': ['鲁'], '河南': ['豫'], '湖北': ['鄂'],
+    '湖南': ['湘'], '广东': ['粤', 'canton'], '广西': ['桂'], '海南': ['琼'], '四川': ['川', '蜀'],
+    '贵州': ['黔', '贵'], '云南': ['滇', '云'], '西藏': ['藏', 'tibet'], '陕西': ['陕', '秦', 'shaanxi'],
+    '甘肃': ['甘', '陇'], '青海': ['青'], '宁夏': ['宁'], '新疆': ['新'], '香港': ['港', 'hong kong', 'hk'],
+    '澳门': ['澳', 'macau', 'macao'], '台湾': ['台', 'taiwan'],
+}
+# The common names of the countries which are not their full names, by the ISO alpha-3 code.
+COUNTRY_ALIASES = {
+    'USA': ['us', 'america', 'united states', 'the united states', '美国'],
+    'GBR': ['uk', 'britain', 'great britain', 'england', 'united kingdom', '英国'],
+    'KOR': ['south korea', 'korea', '韩国'],
+    'PRK': ['north korea', '朝鲜'],
+    'RUS': ['russia', '俄罗斯'],
+    'IRN': ['iran'],
+    'VNM': ['vietnam', 'viet nam'],
+    'SYR': ['syria'],
+    'LAO': ['laos'],
+    'BOL': ['bolivia'],
+    'VEN': ['venezuela'],
+    'TZA': ['tanzania'],
+    'MDA': ['moldova'],
+    'CZE': ['czechia', 'czech'],
+    'NLD': ['holland', 'netherlands'],
+    'ARE': ['uae', 'emirates'],
+    'CHN': ['china', 'prc', '中华人民共和国'],
+}
+# The count of the best regions which are kept in every node of the trie for autocomplete.
+TOP_K = 32
+# The count of the resolved names which are cached, the typed names of a search box are resolved again and again.
+CACHE_SIZE = 4096
+# The regions of the same name are ranked by the kind first.
+KIND_ORDER = {'province': 0, 'country': 1, 'city': 2}
+
+
+def normalize(text):
+    """
+    # Normalize a name for the index, the full-width characters, the cases, the tones, the spaces and the punctuation
+    are ignored.
+
+    :param text: The name.
+    :return: The normalized name.
+    """
+    text = unicodedata.normalize('NFKD', text).lower()
+    return ''.join(char for char in text if char.isalnum() and not unicodedata.combining(char))
+
+
+@functools.lru_cache(maxsize=None)
+def pinyin(name):
+    """Get the pinyin of a name, such as 'shanghai', it's cached because the names are the same in every snapshot."""
+    # Import pypinyin module, which is used to index the pinyin of the Chinese names
+    from pypinyin import lazy_pinyin
+    return ''.join(lazy_pinyin(name))
+
+
+def strip_suffix(name):
+    """Remove the suffix of a Chinese city name, if the rest has 2 characters at least."""
+    for suffix in CITY_SUFFIXES:
+        if name.endswith(suffix) and len(name) - len(suffix) >= 2:
+            return name[:-len(suffix)]
+    return name
+
+
+class Region:
+    """
+    # A province, a city or a country which is found by `RegionResolver`.
+
+    :param kind: 'province', 'city' or 'country'.
+    :param name: The Chinese name used by DXY, such as '上海市', '杨浦区' or '法国'.
+    :param english_name: The English name, such as 'France', it's None for the provinces and the cities.
+    :param province: The province of a city, or None.
+    :param code: The ISO alpha-3 code of a country, or None.
+    :param count: The confirmed count, which is used to rank the regions.
+    """
+    __slots__ = ('kind', 'name', 'english_name', 'province', 'code', 'count')
+
+    def __init__(self, kind, name, english_name=None, province=None, code=None, count=0):
+        self.kind = kind
+        self.name = name
+        self.english_name = english_name
+        self.province = province
+        self.code = code
+        self.count = count
+
+    def name_in(self, language):
+        """Get the name which is used by the query methods in a language."""
+        if language == 'en_US' and self.english_name:
+            return self.english_name
+        return self.name
+
+    def to_dict(self):
+        return {'kind': self.kind, 'name': self.name, 'englishName': self.english_name, 'province': self.province,
+                'code': self.code}
+
+    def _rank(self):
+        return KIND_ORDER[self.kind], -self.count
+
+    def __repr__(self):
+        return f'Region({self.kind!r}, {self.name!r})'
+
+
+class _Node:
+    """A node of the trie, with the regions of the names which end here and the best regions under it."""
+    __slots__ = ('children', 'regions', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.regions = []
+        self.top = []
+
+
+class RegionResolver:
+    """
+    # Find the provinces, the cities and the countries by the names which are typed by the users.
+
+    All the names are normalized into a trie: the Chinese names, the names without the suffixes such as '地区', the
+    pinyin, the English names, the ISO alpha-2 and alpha-3 codes and the aliases. It's built once for every snapshot
+    by `Covid19.resolver()`, then a name is found by walking the trie, the best regions of every prefix are
+    precomputed for autocomplete, and the typos are found by the edit distance computed along the trie.
+    `resolve()` only accepts the exact names, and the typos of a single region in the Latin letters, such as the
+    pinyin and the English names. A wrong Chinese character makes another name, such as '东城区' and '西城区', so the
+    Chinese names are never corrected, and the beginnings of the names are only autocompleted by `complete()`.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    covid = Covid19(check_upgradable=False)
+    resolver = covid.resolver()
+    resolver.resolve('dàxīng ānlǐng')  # Region('city', '大兴安岭地区')
+    resolver.resolve('Frnace')  # Region('country', '法国')
+    resolver.resolve('Fra')  # None, it's the beginning of several names
+    resolver.complete('shang', limit=5)
+    ```
+    :param c_data: The data of the provinces, `Covid19.c_data`.
+    :param w_data: The data of the countries, `Covid19.w_data`.
+    """
+
+    def __init__(self, c_data, w_data):
+        self.root = _Node()
+        self.regions = []
+        self._resolved = collections.OrderedDict()
+        names = self._names(c_data, w_data)
+        for region, keys in names:
+            self.regions.append(region)
+            for key in keys:
+                self._insert(key, region)
+        self._collect(self.root)
+
+    @staticmethod
+    def _names(c_data, w_data):
+        """Get the regions and all their names."""
+        try:
+            from iso3166 import countries  # Import iso3166 module, which is used to index the ISO codes and names
+        except ImportError:
+            countries = None
+        names = []
+        for province in c_data:
+            region = Region('province', province['provinceName'], count=province.get('confirmedCount', 0))
+            keys = {province['provinceName'], province['provinceShortName']}
+            keys.update(PROVINCE_ALIASES.get(province['provinceShortName'], []))
+            keys.add(pinyin(province['provinceShortName']))
+            names.append((region, keys))
+            for city in province.get('cities', []):
+                region = Region('city', city['cityName'], province=province['provinceName'],
+                                count=city.get('confirmedCount', 0))
+                short_name = strip_suffix(city['cityName'])
+                keys = {city['cityName'], short_name, pinyin(city['cityName']), pinyin(short_name)}
+                names.append((region, keys))
+        for country in w_data:
+            code = country.get('countryShortCode')
+            region = Region('country', country['provinceName'], country.get('countryFullName'), code=code,
+                            count=country.get('confirmedCount', 0))
+            keys = {country['provinceName'], pinyin(country['provinceName'])}
+            if country.get('countryFullName'):
+                keys.add(country['countryFullName'])
+            if code:
+                keys.add(code)
+                keys.update(COUNTRY_ALIASES.get(code, []))
+                try:
+                    iso = countries.get(code) if countries is not None else None
+                except KeyError:
+                    iso = None
+                if iso is not None:
+                    keys.update([iso.alpha2, iso.name, iso.apolitical_name])
+            names.append((region, keys))
+        return names
+
+    def _insert(self, key, region):
+        node = self.root
+        for char in normalize(key):
+            node = node.children.setdefault(char, _Node())
+        if node is not self.root and region not in node.regions:
+            node.regions.append(region)
+
+    def _collect(self, node):
+        """Precompute the best regions under every node, the children are collected first."""
+        regions = set(node.regions)
+        for child in node.children.values():
+            self._collect(child)
+            regions.update(child.top)
+        node.top = sorted(regions, key=Region._rank)[:TOP_K]
+        node.regions.sort(key=Region._rank)
+
+    def _find(self, key):
+        node = self.root
+        for char in key:
+            node = node.children.get(char)
+            if node is None:
+                return None
+        return node
+
+    def lookup(self, name, kind=None):
+        """
+        # Find the regions of a name exactly, the cases, the spaces, the punctuation and the city suffixes are ignored.
+
+        :param name: The name, the pinyin, the English name, the ISO code or an alias.
+        :param kind: 'province', 'city' or 'country', default is None, all the kinds.
+        :return: A list of the regions, the best one is the first.
+        """
+        for key in [normalize(name), normalize(strip_suffix(name))]:
+            node = self._find(key) if key else None
+            if node is not None:
+                regions = [region for region in node.regions if kind is None or region.kind == kind]
+                if regions:
+                    return regions
+        return []
+
+    def complete(self, prefix, kind=None, limit=10):
+        """
+        # Autocomplete a name.
+
+        :param prefix: The beginning of a name, the pinyin, the English name, the ISO code or an alias.
+        :param kind: 'province', 'city' or 'country', default is None, all the kinds.
+        :param limit: The count of regions at most, default is 10.
+        :return: A list of the regions, the exact matches are the first, then the most confirmed ones.
+        """
+        key = normalize(prefix)
+        node = self._find(key) if key else None
+        if node is None:
+            return []
+        regions = [region for region in node.top if kind is None or region.kind == kind]
+        if len(regions) < limit and len(node.top) == TOP_K:
+            # There may be more regions of the kind under the node, which are not in the best ones.
+            regions = sorted({region for region in self._walk(node) if kind is None or region.kind == kind},
+                             key=Region._rank)
+        exact = [region for region in node.regions if kind is None or region.kind == kind]
+        return (exact + [region for region in regions if region not in exact])[:limit]
+
+    def _walk(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield from node.regions
+            stack.extend(node.children.values())
+
+    def search(self, name, kind=None, limit=10, max_distance=None):
+        """
+        # Find the regions of a name with typos.
+
+        :param name: The name, the pinyin, the English name, the ISO code or an alias.
+        :param kind: 'province', 'city' or 'country', default is None, all the kinds.
+        :param limit: The count of regions at most, default is 10.
+        :param max_distance: The count of the wrong, missing, extra or swapped characters at most, default is None,
+        0 for 1-2 characters, 1 for 3-5 characters, and 2 for longer names.
+        :return: A list of the regions, the closest ones are the first.
+        """
+        distances = self._distances(name, kind, max_distance)
+        return sorted(distances, key=lambda region: (distances[region],) + region._rank())[:limit]
+
+    def _distances(self, name, kind, max_distance):
+        """Get a dict of the regions within the edit distance of a name, and their distances."""
+        query = normalize(name)
+        if not query:
+            return {}
+        if max_distance is None:
+            max_distance = 0 if len(query) <= 2 else 1 if len(query) <= 5 else 2
+        distances = {}
+        size = len(query)
+        too_far = max_distance + 1
+        first_row = [i if i <= max_distance else too_far for i in range(size + 1)]
+        # Every item is a node, its character, the character of its parent, the row of its parent and grandparent, and
+        # the depth of the node. Only the cells within `max_distance` of the diagonal are computed, the others are
+        # always too far.
+        stack = [(child, char, None, first_row, None, 1) for char, child in self.root.children.items()]
+        while stack:
+            node, char, parent_char, parent_row, grand_row, depth = stack.pop()
+            row = [too_far] * (size + 1)
+            if depth <= max_distance:
+                row[0] = depth
+            for i in range(max(1, depth - max_distance), min(size, depth + max_distance) + 1):
+                distance = min(row[i - 1] + 1, parent_row[i] + 1, parent_row[i - 1] + (query[i - 1] != char))
+                if grand_row is not None and i > 1 and query[i - 1] == parent_char and query[i - 2] == char:
+                    distance = min(distance, grand_row[i - 2] + 1)  # Two characters are swapped.
+                row[i] = min(distance, too_far)
+            if row[-1] <= max_distance:
+                for region in node.regions:
+                    if (kind is None or region.kind == kind) and row[-1] < distances.get(region, max_distance + 1):
+                        distances[region] = row[-1]
+            if min(row) <= max_distance:
+                stack.extend((child, child_char, char, row, parent_row, depth + 1)
+                             for child_char, child in node.children.items())
+        return distances
+
+    def resolve(self, name, kind=None):
+        """
+        # Find the region of a name exactly, or with typos in the Latin letters if only one region is the closest.
+
+        :param name: The name, the pinyin, the English name, the ISO code or an alias.
+        :param kind: 'province', 'city' or 'country', default is None, all the kinds.
+        :return: A `Region`, or None if nothing is found, the typos are close to several regions, or the name is not
+        in the Latin letters and it's not found exactly.
+        """
+        key = (name, kind)
+        region = self._resolved.get(key, False)
+        if region is not False:
+            self._resolved.move_to_end(key)
+            return region
+        regions = self.lookup(name, kind)
+        if regions:
+            region = regions[0]
+        elif not normalize(name).isascii():  # Such as '东城区', it's not a typo of '西城区'.
+            region = None
+        else:
+            distances = self._distances(name, kind, None)
+            closest = [region for region, distance in distances.items() if distance == min(distances.values())]
+            region = closest[0] if len(closest) == 1 else None
+        self._resolved[key] = region
+        if len(self._resolved) > CACHE_SIZE:
+            self._resolved.popitem(last=False)
+        return region
+
+    def suggest(self, name, kind=None, limit=3):
+        """
+        # Get the regions which may be meant by a name which is not resolved.
+
+        :param name: The name, the pinyin, the English name, the ISO code or an alias.
+        :param kind: 'province', 'city' or 'country', default is None, all the kinds.
+        :param limit: The count of regions at most, default is 3.
+        :return: A list of the regions, the completions of the name are the first, then the closest ones.
+        """
+        regions = self.complete(name, kind, limit) if len(normalize(name)) >= 2 else []
+        regions += [region for region in self.search(name, kind, limit, 3) if region not in regions]
+        return regions[:limit]
@@ -0,0 +1,290 @@
+import gzip  # Import gzip module, which is used to compress the responses
+import hashlib  # Import hashlib module, which is used to generate the ETag of the responses
+import json  # Import json module, which is used to serialize the responses
+import threading  # Import threading module, which is used to refresh the data in the background
+from collections import OrderedDict  # Import collections module, which is used to drop the oldest responses
+# Import http.server module, which is used to serve the data without any other web framework
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit  # Import urllib.parse module, which is used to parse the urls
+
+from . import Covid19, CovidException
+from .feed import UpdateFeed
+from .metrics import Metrics
+
+
+def _int(value, default=0):
+    """Convert a query parameter to int."""
+    return int(value) if value not in [None, ''] else default
+
+
+def _bool(value):
+    """Convert a query parameter to bool."""
+    return value in ['1', 'true', 'True', 'yes']
+
+
+def _list(value):
+    """Convert a query parameter such as 'province,news' to list."""
+    return [item for item in (value or '').split(',') if item]
+
+
+# The endpoints of the server, every endpoint gets the data from the Covid19 instance with the query parameters.
+ROUTES = {
+    '/world': lambda covid, params: covid.world_covid_data(language=params.get('lang')),
+    '/china': lambda covid, params: covid.cn_covid_data(include_cities=_bool(params.get('cities'))),
+    '/country': lambda covid, params: covid.country_covid_data(
+        params.get('name', 'United States of America'), show_timeline=_int(params.get('timeline')),
+        language=params.get('lang')),
+    '/province': lambda covid, params: covid.province_covid_data(
+        params.get('name', '北京'), show_timeline=_int(params.get('timeline'))),
+    '/city': lambda covid, params: covid.city_covid_data(
+        params.get('name', '杨浦区'), show_danger_areas=_bool(params.get('danger_areas'))),
+    '/danger-areas': lambda covid, params: covid.danger_areas_data(params.get('city')),
+    '/news': lambda covid, params: covid.cn_news_data(
+        params.get('province'), show_summary=not params.get('summary') == '0'),
+    '/complete': lambda covid, params: [region.to_dict() for region in covid.resolver().complete(
+        params.get('q', ''), params.get('kind'), limit=_int(params.get('limit'), 10))],
+}
+
+
+class Response:
+    """A response which is serialized only once, with the gzip body and the ETag."""
+
+    def __init__(self, data, status=200):
+        self.status = status
+        self.body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.gzip_body = gzip.compress(self.body)
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()[:16]}"'
+
+
+class CovidServer:
+    """
+    # Serve the covid-19 data over HTTP.
+
+    Every response is serialized only once for every snapshot, and the snapshot is refreshed in the background.
+    The endpoints are `/world`, `/china?cities=1`, `/country?name=France&timeline=30`, `/province?name=上海`,
+    `/city?name=杨浦区&danger_areas=1`, `/danger-areas?city=杨浦区` and `/news?province=上海`, `/world` and `/country`
+    accept `lang=zh_CN` or `lang=en_US`, both languages are served from the same data.
+    The region names of a search box are autocompleted by `/complete?q=shang&kind=city&limit=10`.
+    The changed records after every refresh are pushed by Server-Sent Events from `/events?kinds=province&regions=上海`,
+    the missed changes are sent again after reconnecting with Last-Event-ID, or returned by long polling from
+    `/updates?since=<version>&kinds=province&regions=上海`.
+    The metrics of the fetch health and the data freshness are served in Prometheus text format from `/metrics`.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.server import CovidServer
+    server = CovidServer(Covid19(check_upgradable=False), port=8000)
+    server.serve_forever()
+    ```
+    :param covid: The `Covid19` instance.
+    :param host: The host to listen, default is '127.0.0.1'.
+    :param port: The port to listen, default is 8000.
+    :param refresh_interval: Refresh the data every ** seconds, default is 600, set it to 0 to disable refreshing.
+    :param max_responses: The maximum count of responses which are kept for a snapshot, the least recently used ones
+    are dropped first, default is 4096.
+    :param metrics: A `pyeumonia.metrics.Metrics`, default is None, create one for the Covid19 instance.
+    """
+
+    def __init__(self, covid, host='127.0.0.1', port=8000, refresh_interval=600, max_responses=4096, metrics=None):
+        self.covid = covid
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.metrics.instrument(covid)
+        self.refresh_interval = refresh_interval
+        self.max_responses = max_responses
+        self._responses = OrderedDict()
+        self._lock = threading.Lock()
+        self.feed = UpdateFeed(covid)
+        self._stopped = threading.Event()
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.covid_server = self
+
+    def response(self, path, query=''):
+        """
+        # Get the response of a request, it's serialized only once for every snapshot.
+
+        :param path: The path of the request, such as '/world'.
+        :param query: The query string of the request, such as 'name=France'.
+        :return: A `Response`, or None if the path is not found.
+        """
+        if path not in ROUTES:
+            return None
+        params = {key: values[0] for key, values in parse_qs(query).items()}
+        key = (path, tuple(sorted(params.items())))
+        # If the data is refreshed while serializing, the response will be saved into the old dict and dropped.
+        responses = self._responses
+        with self._lock:
+            response = responses.get(key)
+            if response is not None:
+                responses.move_to_end(key)
+        self.metrics.cache('server', response is not None)
+        if response is None:
+            try:
+                response = Response(ROUTES[path](self.covid, params))
+            except (CovidException, ValueError, KeyError) as e:
+                return Response({'error': str(e)}, status=400)
+            except Exception as e:
+                self.metrics.error('response', e)
+                return Response({'error': f'{type(e).__name__}: {e}'}, status=500)
+            with self._lock:
+                responses[key] = response
+                while len(responses) > self.max_responses:
+                    responses.popitem(last=False)
+        return response
+
+    def refresh(self):
+        """Refresh the data, the old responses will be dropped, and the changes will be pushed to the subscribers."""
+        old = self.covid.snapshot()
+        version = self.covid.version
+        self.covid.refresh()
+        if self.covid.version == version:  # Nothing is changed, the responses are still valid.
+            return
+        self._responses = OrderedDict()
+        self.feed.publish(old, self.covid.snapshot())
+
+    def _refresh_forever(self):
+        """
+        # Refresh the data until the server is stopped.
+
+        If the refreshing failed, the old data will be served, and the error is counted by
+        `pyeumonia_errors_total{phase="refresh"}` of the metrics.
+        """
+        while not self._stopped.wait(self.refresh_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                self.metrics.error('refresh', e)
+
+    def serve_forever(self):
+        """Start the server, and refresh the data in the background."""
+        if self.refresh_interval:
+            threading.Thread(target=self._refresh_forever, daemon=True).start()
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """Stop the server."""
+        self._stopped.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handle the requests of `CovidServer`."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/metrics':
+            body = self.server.covid_server.metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if url.path in ['/events', '/updates']:
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path == '/events':
+                self._events(params)
+            else:
+                self._updates(params)
+            return
+        response = self.server.covid_server.response(url.path, url.query)
+        if response is None:
+            response = Response({'error': f'{url.path} is not found.'}, status=404)
+        if response.status == 200 and self.headers.get('If-None-Match') == response.etag:
+            self.send_response(304)
+            self.send_header('ETag', response.etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        body = response.body
+        self.send_response(response.status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('ETag', response.etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = response.gzip_body
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _updates(self, params):
+        """Long polling, return the changes after the version, or wait for them."""
+        feed = self.server.covid_server.feed
+        timeout = min(_int(params.get('timeout'), 30), 60)
+        self._send_json(feed.changes_since(_int(params.get('since')), _list(params.get('kinds')),
+                                           _list(params.get('regions')), timeout))
+
+    def _events(self, params):
+        """
+        # Push the changes by Server-Sent Events until the client is disconnected.
+
+        The id of every event is the version of the feed of its changes. If the client reconnects with Last-Event-ID,
+        the changes after it are sent first, an event named 'reset' is sent if they are not kept any more.
+        """
+        feed = self.server.covid_server.feed
+        kinds, regions = _list(params.get('kinds')), _list(params.get('regions'))
+        subscription = feed.subscribe(kinds, regions)
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            last_event_id = self.headers.get('Last-Event-ID')
+            if last_event_id:
+                # The changes which are also pushed to the subscription later are sent twice, they are the same.
+                missed = feed.changes_since(_int(last_event_id), kinds, regions, timeout=0)
+                if missed['reset']:
+                    self.wfile.write(f'id: {missed["version"]}\nevent: reset\ndata: {{}}\n\n'.encode('utf-8'))
+                elif missed['changes']:
+                    self._write_event(missed['version'], missed['changes'])
+            while True:
+                changes = subscription.get(timeout=15)
+                if changes:
+                    self._write_event(subscription.version, changes)
+                else:  # Keep the connection alive, and find the disconnected clients.
+                    self.wfile.write(b': ping\n\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            subscription.close()
+
+    def _write_event(self, version, changes):
+        data = json.dumps(changes, ensure_ascii=False, separators=(',', ':'))
+        self.wfile.write(f'id: {version}\ndata: {data}\n\n'.encode('utf-8'))
+
+    def log_message(self, format, *args):
+        """Don't print every request."""
+
+
+def serve(host='127.0.0.1', port=8000, language='auto', refresh_interval=600):
+    """
+    # Fetch the data and start the server.
+
+    :param host: The host to listen, default is '127.0.0.1'.
+    :param port: The port to listen, default is 8000.
+    :param language: The language of the data, default is 'auto'.
+    :param refresh_interval: Refresh the data every ** seconds, default is 600.
+    """
+    metrics = Metrics()
+    covid = Covid19(language=language, check_upgradable=False, hooks=[metrics.hook])
+    server = CovidServer(covid, host, port, refresh_interval, metrics=metrics)
+    print(f'Serving on http://{host}:{port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,207 @@
+import json  # Import json module, which is used to serialize the snapshot
+import logging  # Import logging module, which is used to report the failed fetches while the stale snapshot is served
+import os  # Import os module, which is used to replace the shared snapshot atomically
+import struct  # Import struct module, which is used to pack the header
+import threading  # Import threading module, which is used to check the snapshot only once in a process
+import time  # Import time module, which is used to check if the snapshot is fresh
+
+from . import Covid19, CovidException
+
+MAGIC = b'PYEUSS01'
+# The header of the shared snapshot: magic, version, fetch time and the length of the json data.
+HEADER = struct.Struct('<8sQQQ')
+
+logger = logging.getLogger(__name__)
+
+
+def _lock(file, blocking):
+    """Lock a file exclusively, return False if it's locked by another process and blocking is False."""
+    try:
+        import fcntl  # Import fcntl module, which is used to lock the file on Linux and macOS
+    except ImportError:
+        import msvcrt  # Import msvcrt module, which is used to lock the file on Windows
+        # The first byte is locked, it's counted from the current position, which is moved by reading and writing.
+        file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                return True
+            except OSError:
+                if not blocking:
+                    return False
+                time.sleep(0.1)
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        return True
+    except BlockingIOError:
+        return False
+
+
+def _unlock(file):
+    try:
+        import fcntl  # Import fcntl module, which is used to lock the file on Linux and macOS
+    except ImportError:
+        import msvcrt  # Import msvcrt module, which is used to lock the file on Windows
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        return
+    fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+def read_header(path):
+    """
+    # Read the header of a shared snapshot.
+
+    :param path: The path of the shared snapshot.
+    :return: A tuple of the version and the fetch time, or None if there is no shared snapshot.
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+    except FileNotFoundError:
+        return None
+    if len(header) < HEADER.size:
+        return None
+    magic, version, fetch_time, length = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise CovidException(f'{path} is not a shared snapshot of pyeumonia.')
+    return version, fetch_time
+
+
+def write_snapshot(path, snapshot, version):
+    """
+    # Write a shared snapshot, the readers never see a half-written file.
+
+    :param path: The path of the shared snapshot.
+    :param snapshot: The snapshot returned by `Covid19.snapshot()`.
+    :param version: The version of the snapshot.
+    """
+    data = json.dumps(snapshot, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, version, snapshot['fetch_time'], len(data)))
+        f.write(data)
+    # The readers which have opened the old file keep reading it, the others read the new one.
+    os.replace(temp_path, path)
+
+
+def read_snapshot(path):
+    """
+    # Read a shared snapshot.
+
+    Python objects can't be shared between processes, so every process decodes its own copy of the snapshot, but only
+    when the version is changed.
+    :param path: The path of the shared snapshot.
+    :return: A tuple of the version and the snapshot.
+    """
+    with open(path, 'rb') as f:
+        magic, version, fetch_time, length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise CovidException(f'{path} is not a shared snapshot of pyeumonia.')
+        snapshot = json.loads(f.read(length))
+    return version, snapshot
+
+
+class SharedSnapshot:
+    """
+    # Share the refreshes between processes, such as the workers of gunicorn, so the data is fetched and parsed once.
+
+    The process which gets the file lock fetches the data and writes the snapshot into a file with a version header,
+    the other processes only read the file when the version is changed. The refreshes are shared, but the data is
+    not: every process decodes its own copy of the snapshot, so the memory still grows with the count of processes,
+    only the requests to DXY and the parsing of the page don't. If the fetcher exits, another process will
+    get the lock and fetch the data, so there are no extra processes to manage.
+    If a fetch fails while there is a snapshot, the stale snapshot is served, the error is logged by the
+    'pyeumonia.shared' logger, and the data is fetched again after `min(60, refresh_interval)` seconds.
+    Usage:
+    ```python
+    from pyeumonia.shared import SharedSnapshot
+    shared = SharedSnapshot('/tmp/pyeumonia.snapshot', language='zh_CN')
+    # In every request, the latest data is used.
+    data = shared.covid().cn_covid_data()
+    ```
+    :param path: The path of the shared snapshot, the lock file is '<path>.lock'.
+    :param language: The language of the data, default is 'auto'.
+    :param refresh_interval: Fetch the data if the snapshot is older than ** seconds, default is 600.
+    :param check_interval: Check the version of the snapshot once in ** seconds at most, default is 1.
+    :param transport: The transport used to fetch the data, default is None, use requests.
+    """
+
+    def __init__(self, path, language='auto', refresh_interval=600, check_interval=1, transport=None):
+        self.path = path
+        self.language = language
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self.transport = transport
+        self.version = 0
+        self.fetches = 0  # The count of fetches by this process.
+        self._covid = None
+        self._fetcher = None  # The instance which fetched the data last time, it's refreshed with conditional requests.
+        self._checked = float('-inf')
+        self._retry_time = 0
+        self._lock = threading.Lock()
+
+    def covid(self):
+        """
+        # Get the `Covid19` instance of the latest snapshot.
+
+        The version is checked once in `check_interval` seconds, the snapshot is read only if the version is changed,
+        and the data is fetched only if the snapshot is stale and this process gets the lock.
+        :return: The `Covid19` instance, don't keep it for a long time, call this function again to get new data.
+        """
+        if self._covid is not None and time.monotonic() - self._checked < self.check_interval:
+            return self._covid
+        with self._lock:
+            if self._covid is not None and time.monotonic() - self._checked < self.check_interval:
+                return self._covid
+            header = read_header(self.path)
+            stale = header is not None and time.time() - header[1] >= self.refresh_interval
+            if header is None or (stale and time.time() >= self._retry_time):
+                # Wait for the fetcher if there is no snapshot yet, otherwise serve the stale one while it's fetching.
+                fetched = self._fetch(blocking=header is None)
+                if fetched is not None:  # The data fetched by this process is used without reading it again.
+                    self.version, self._covid = fetched
+                header = read_header(self.path)
+            if header is None:
+                raise CovidException('The shared snapshot is not available.')
+            if header[0] != self.version:
+                self.version, snapshot = read_snapshot(self.path)
+                self._covid = Covid19.from_snapshot(snapshot, self.language, self.transport)
+            self._checked = time.monotonic()
+            return self._covid
+
+    def _fetch(self, blocking):
+        """Fetch the data and write the snapshot if this process gets the lock, return the version and the data."""
+        with open(f'{self.path}.lock', 'a+b') as lock_file:
+            if not _lock(lock_file, blocking):
+                return
+            try:
+                header = read_header(self.path)
+                # Another process may have fetched the data while waiting for the lock.
+                if header is not None and time.time() - header[1] < self.refresh_interval:
+                    return
+                try:
+                    if self._fetcher is None:
+                        covid = Covid19(self.language, check_upgradable=False, transport=self.transport)
+                    else:
+                        covid = self._fetcher
+                        old_version = covid.version
+                        covid.refresh()
+                        if header is not None and covid.version == old_version:
+                            # Nothing is changed, only the fetch time is updated, the readers don't read it again.
+                            self.fetches += 1
+                            write_snapshot(self.path, covid.snapshot(), header[0])
+                            return header[0], covid
+                except Exception:
+                    self._retry_time = time.time() + min(60, self.refresh_interval)
+                    if header is None:
+                        raise
+                    logger.warning('Fetch failed, the stale snapshot of %s will be used.', self.path, exc_info=True)
+                    return
+                self.fetches += 1
+                self._fetcher = covid
+                version = (header[0] if header else 0) + 1
+                write_snapshot(self.path, covid.snapshot(), version)
+                return version, covid
+            finally:
+                _unlock(lock_file)
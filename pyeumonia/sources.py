@@ -0,0 +1,210 @@
+import collections  # Import collections module, which is used to keep the recent results of the sources
+import threading  # Import threading module, which is used to protect the health of the sources
+import time  # Import time module, which is used to measure the latency of the sources
+
+from . import CovidException
+from .transport import Response
+
+# The page of DXY, every source must return a page with the same scripts.
+DXY_URL = 'https://ncov.dxy.cn/ncovh5/view/pneumonia'
+# The English page of DXY, which is also opened by `Covid19.open_website('DXY')`.
+DXY_EN_URL = 'https://ncov.dxy.cn/ncovh5/view/en_pneumonia?from=dxy&source=&link=&share='
+
+
+class Source:
+    """
+    # The base class of the data sources of `Covid19`.
+
+    A source returns the DXY page, or a page with the same scripts, so the data of all the sources is decoded in the
+    same way, and the snapshots are the same. Subclass it and override `fetch()` to add another source.
+    :param name: The name of the source, it must be unique in a `SourcePool`.
+    :param priority: The sources of a smaller priority are tried first, default is None, use the priority of the
+    class, 0 for the pages and 1 for the local files, which are only the fallbacks.
+    """
+    priority = 0
+
+    def __init__(self, name, priority=None):
+        self.name = name
+        if priority is not None:
+            self.priority = priority
+
+    def fetch(self, transport, headers):
+        """
+        # Get the page.
+
+        :param transport: The transport of the `Covid19` instance.
+        :param headers: The headers of the request, such as User-Agent and If-None-Match.
+        :return: A response with `status_code`, `content`, `text`, `headers` and `encoding`.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.name!r})'
+
+
+class PageSource(Source):
+    """
+    # Download the page from a url, such as the DXY page, the English DXY page or a mirror.
+
+    :param url: The url of the page.
+    :param name: The name of the source, default is None, use the url.
+    :param priority: The sources of a smaller priority are tried first, default is None, 0.
+    """
+
+    def __init__(self, url, name=None, priority=None):
+        super().__init__(name or url, priority)
+        self.url = url
+
+    def fetch(self, transport, headers):
+        return transport.get(self.url, headers=headers)
+
+
+class FileSource(Source):
+    """
+    # Read the page from a local file, such as a saved DXY page, or a snapshot saved by `Covid19.snapshot()`.
+
+    A json file is treated as a snapshot, and rendered into a page with the same scripts. It's a fallback, it's only
+    used when the pages fail, unless its priority is given.
+    :param path: The path of the file.
+    :param name: The name of the source, default is None, use the path.
+    :param priority: The sources of a smaller priority are tried first, default is None, 1.
+    """
+    priority = 1
+
+    def __init__(self, path, name=None, priority=None):
+        super().__init__(name or path, priority)
+        self.path = path
+
+    def fetch(self, transport, headers):
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        if self.path.endswith('.json'):
+            import json  # Import json module, which is used to read the snapshot
+            from .standin import render_page
+            content = render_page(json.loads(content))
+        return Response(200, content, {'Content-Type': 'text/html; charset=utf-8'}, self.path)
+
+
+class SourceHealth:
+    """
+    # The recent latency and error rate of a source.
+
+    :param window: The count of recent requests which are used to compute the error rate.
+    :param alpha: The weight of the latest latency in the moving average.
+    """
+
+    def __init__(self, window=20, alpha=0.3):
+        self.alpha = alpha
+        self.results = collections.deque(maxlen=window)  # True for the successful requests.
+        self.latency = None  # The moving average of the latency of the successful requests in seconds.
+        self.requests = 0
+        self.failures = 0
+        self.last_failure = float('-inf')
+
+    @property
+    def error_rate(self):
+        return self.results.count(False) / len(self.results) if self.results else 0.0
+
+    def record(self, ok, latency):
+        self.requests += 1
+        self.results.append(ok)
+        if ok:
+            self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        else:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+
+    def to_dict(self):
+        return {'latency': self.latency, 'error_rate': self.error_rate, 'requests': self.requests,
+                'failures': self.failures}
+
+
+class SourcePool:
+    """
+    # Get the page from the healthy source of the best priority, and fail over to the others automatically.
+
+    The healthy sources are ranked by their priority, such as the pages before the local files, then by the moving
+    average of their latency, the sources which are never used are tried after the measured ones of the same
+    priority, then in the configured order. So a fast fallback never takes over from a healthy primary source.
+    A source is unhealthy if its error rate of the recent requests is above `max_error_rate`, it's tried after the
+    healthy ones, and it's ranked by its priority again `cooldown` seconds after its last failure.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.sources import DXY_EN_URL, DXY_URL, FileSource, PageSource, SourcePool
+    sources = SourcePool([PageSource(DXY_URL), PageSource(DXY_EN_URL), FileSource('/data/pyeumonia.json')])
+    covid = Covid19(sources=sources)
+    print(sources.health())
+    ```
+    :param sources: The sources, `Source` instances or urls.
+    :param max_error_rate: A source is unhealthy if more than ** of its recent requests failed, default is 0.5.
+    :param cooldown: An unhealthy source is ranked by its latency again after ** seconds, default is 60.
+    :param window: The count of recent requests which are used to compute the error rate, default is 20.
+    """
+
+    def __init__(self, sources, max_error_rate=0.5, cooldown=60, window=20):
+        self.sources = [PageSource(source) if isinstance(source, str) else source for source in sources]
+        if not self.sources:
+            raise CovidException('At least one source is required.')
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self._health = {source.name: SourceHealth(window) for source in self.sources}
+        self._lock = threading.Lock()
+
+    def ranked(self):
+        """
+        # Get the sources in the order they are tried.
+
+        :return: A list of the sources, the healthy one of the best priority is the first.
+        """
+        now = time.monotonic()
+        with self._lock:
+            def rank(item):
+                position, source = item
+                health = self._health[source.name]
+                unhealthy = health.error_rate > self.max_error_rate and now - health.last_failure < self.cooldown
+                # The latency only ranks the sources of the same priority, the unmeasured ones are not probed first.
+                unmeasured = health.latency is None
+                return unhealthy, source.priority, unmeasured, 0 if unmeasured else health.latency, position
+            return [source for position, source in sorted(enumerate(self.sources), key=rank)]
+
+    def fetch(self, transport, headers, validators=None):
+        """
+        # Get the page from the best source, the other sources are tried if it fails.
+
+        :param transport: The transport of the `Covid19` instance.
+        :param headers: The headers of the request.
+        :param validators: A dict of the source name and its ETag and Last-Modified, default is None.
+        :return: A tuple of the source and the response, the status code is 200 or 304 unless all the sources failed,
+        then the last response is returned, or the last error is raised.
+        """
+        response, error = None, None
+        for source in self.ranked():
+            source_headers = dict(headers)
+            source_validators = (validators or {}).get(source.name, {})
+            if 'etag' in source_validators:
+                source_headers['If-None-Match'] = source_validators['etag']
+            if 'last-modified' in source_validators:
+                source_headers['If-Modified-Since'] = source_validators['last-modified']
+            started = time.perf_counter()
+            try:
+                response, error = source.fetch(transport, source_headers), None
+            except Exception as e:
+                response, error = None, e
+            ok = response is not None and response.status_code in [200, 304]
+            with self._lock:
+                self._health[source.name].record(ok, time.perf_counter() - started)
+            if ok:
+                return source, response
+        if response is not None:
+            return source, response
+        raise error
+
+    def health(self):
+        """
+        # Get the health of the sources.
+
+        :return: A dict of the source name and its latency, error rate, count of requests and failures.
+        """
+        with self._lock:
+            return {name: health.to_dict() for name, health in self._health.items()}
@@ -0,0 +1,369 @@
+import argparse  # Import argparse module, which is used to parse the command-line arguments
+import hashlib  # Import hashlib module, which is used to generate the ETag of the responses
+import json  # Import json module, which is used to serialize the data
+import random  # Import random module, which is used to generate the data and inject the failures
+import threading  # Import threading module, which is used to run the stand-in in the background
+import time  # Import time module, which is used to generate the dates and inject the latency
+# Import http.server module, which is used to serve the data without any other web framework
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit  # Import urllib.parse module, which is used to parse the urls
+
+from . import CONTINENTS_TRANS
+from .transport import Response, Transport
+
+# The scripts of the DXY page which contain the data, and the keys of them in the snapshot.
+PAGE_SCRIPTS = [
+    ('getAreaStat', 'c_data'),
+    ('getListByCountryTypeService2true', 'w_data'),
+    ('getTimelineService1', 'n_data'),
+]
+# The host of the `statisticsData` urls in the generated data.
+TIMELINE_HOST = 'https://file1.dxycdn.com'
+
+
+def _counts(rng, scale):
+    """Generate the counts of a region, the current confirmed count is the confirmed count minus cured and dead."""
+    confirmed = rng.randint(scale, scale * 10)
+    cured = rng.randint(0, confirmed)
+    dead = rng.randint(0, (confirmed - cured) // 10)
+    return {
+        'currentConfirmedCount': confirmed - cured - dead,
+        'confirmedCount': confirmed,
+        'suspectedCount': 0,
+        'curedCount': cured,
+        'deadCount': dead,
+    }
+
+
+def generate_snapshot(provinces=34, cities=16, countries=200, news=40, danger_areas=4, seed=0, fetch_time=None):
+    """
+    # Generate a snapshot which has the same structure as the data of DXY.
+
+    The same seed always generates the same data, so the runs are reproducible.
+    :param provinces: The count of Chinese provinces, default is 34.
+    :param cities: The count of cities in every province, default is 16.
+    :param countries: The count of countries, default is 200.
+    :param news: The count of news, default is 40.
+    :param danger_areas: The count of danger areas in every province, default is 4.
+    :param seed: The random seed, default is 0.
+    :param fetch_time: The fetch time of the snapshot, default is None, use current time.
+    :return: A snapshot which can be used by `Covid19.from_snapshot()` or `StandinServer`.
+    """
+    rng = random.Random(seed)
+    fetch_time = int(time.time()) if fetch_time is None else fetch_time
+    c_data = []
+    for i in range(provinces):
+        # The first province is Shanghai, where the stand-in of ipinfo is, the others are named by the index.
+        short_name = '上海' if i == 0 else f'省份{i}'
+        province = {
+            'provinceName': f'{short_name}市' if i == 0 else f'{short_name}省',
+            'provinceShortName': short_name,
+            **_counts(rng, 1000),
+            'comment': '',
+            'locationId': 100000 + i * 10000,
+            'statisticsData': f'{TIMELINE_HOST}/pyeumonia/province/{i}.json',
+            'highDangerCount': 0,
+            'midDangerCount': 0,
+            'cities': [],
+            'dangerAreas': [],
+        }
+        for j in range(cities):
+            province['cities'].append({
+                'cityName': f'城市{i}-{j}',
+                **_counts(rng, 50),
+                'highDangerCount': 0,
+                'midDangerCount': 0,
+                'locationId': province['locationId'] + j + 1,
+            })
+        for j in range(danger_areas):
+            city = province['cities'][j % cities] if cities else {'cityName': province['provinceShortName']}
+            level = 1 if j % 2 == 0 else 2
+            city['highDangerCount' if level == 1 else 'midDangerCount'] = \
+                city.get('highDangerCount' if level == 1 else 'midDangerCount', 0) + 1
+            province['highDangerCount' if level == 1 else 'midDangerCount'] += 1
+            province['dangerAreas'].append({
+                'cityName': city['cityName'],
+                'areaName': f'{city["cityName"]}第{j}小区',
+                'dangerLevel': level,
+            })
+        c_data.append(province)
+    continents = list(CONTINENTS_TRANS)[:6]
+    w_data = []
+    for i in range(countries):
+        # The first country is China, the others are named by the index.
+        w_data.append({
+            'id': i,
+            'continents': continents[i % len(continents)],
+            'provinceId': '',
+            'provinceName': '中国' if i == 0 else f'国家{i}',
+            'provinceShortName': '中国' if i == 0 else f'国家{i}',
+            'countryShortCode': 'CHN' if i == 0 else f'X{i:02d}',
+            'countryFullName': 'China' if i == 0 else f'Country {i}',
+            **_counts(rng, 10000),
+            'locationId': 900000 + i,
+            'statisticsData': f'{TIMELINE_HOST}/pyeumonia/country/{i}.json',
+        })
+    n_data = []
+    for i in range(news):
+        province = c_data[i % len(c_data)] if c_data else {'provinceShortName': '全国', 'locationId': 0}
+        n_data.append({
+            'id': i,
+            'pubDate': (fetch_time - i * 3600) * 1000,
+            'pubDateStr': f'{i}小时前',
+            'title': f'{province["provinceShortName"]}新闻{i}',
+            'summary': f'{province["provinceShortName"]}的第{i}条新闻。',
+            'infoSource': '央视新闻app',
+            'sourceUrl': f'https://example.com/news/{i}',
+            'provinceId': str(province['locationId'] // 10000),
+            'articleId': i,
+            'category': 0,
+            'jumpUrl': '',
+        })
+    return {'fetch_time': fetch_time, 'c_data': c_data, 'w_data': w_data, 'n_data': n_data}
+
+
+def generate_timeline(current, days=60, seed=0):
+    """
+    # Generate the timeline of a region, which ends with the current data of the region.
+
+    :param current: The current data of the province or the country.
+    :param days: The count of days, default is 60.
+    :param seed: The random seed, default is 0.
+    :return: The data of every day, sorted by dateId, the same as `Covid19.fetch_timeline()`.
+    """
+    rng = random.Random(f'{seed}:{current["statisticsData"]}')
+    fields = ['confirmedCount', 'curedCount', 'deadCount']
+    counts = {field: current[field] for field in fields}
+    timeline = []
+    today = time.time()
+    for day in range(days):
+        date_id = int(time.strftime('%Y%m%d', time.localtime(today - day * 86400)))
+        timeline.append({
+            'dateId': date_id,
+            **counts,
+            'currentConfirmedCount': counts['confirmedCount'] - counts['curedCount'] - counts['deadCount'],
+            'suspectedCount': 0,
+            'highDangerCount': current.get('highDangerCount', 0),
+            'midDangerCount': current.get('midDangerCount', 0),
+        })
+        counts = {field: max(0, value - rng.randint(0, max(1, value // 50))) for field, value in counts.items()}
+        counts['curedCount'] = min(counts['curedCount'], counts['confirmedCount'])
+        counts['deadCount'] = min(counts['deadCount'], counts['confirmedCount'] - counts['curedCount'])
+    timeline.reverse()
+    for i, record in enumerate(timeline):
+        previous = timeline[i - 1] if i else record
+        for field in ['confirmed', 'cured', 'dead', 'currentConfirmed']:
+            record[f'{field}Incr'] = record[f'{field}Count'] - previous[f'{field}Count']
+        record['suspectedCountIncr'] = 0
+    return timeline
+
+
+def render_page(snapshot):
+    """
+    # Render the DXY page of a snapshot, the data is in the scripts, the same as the real page.
+
+    :param snapshot: The snapshot returned by `Covid19.snapshot()` or `generate_snapshot()`.
+    :return: The page in bytes.
+    """
+    scripts = ''.join(
+        f'<script id="{script_id}">try {{ window.{script_id} = '
+        f'{json.dumps(snapshot[key], ensure_ascii=False, separators=(",", ":"))}}}catch(e){{}}</script>'
+        for script_id, key in PAGE_SCRIPTS)
+    return f'<!DOCTYPE html><html><head><meta charset="utf-8"></head><body>{scripts}</body></html>'.encode('utf-8')
+
+
+class StandinServer:
+    """
+    # A local stand-in of DXY, ipinfo and PyPI, so `Covid19` can run without internet connection.
+
+    It serves the DXY page, the `statisticsData` timelines, `https://ipinfo.io/json` and
+    `https://pypi.org/pypi/pyeumonia/json`, the responses are serialized only once.
+    The latency and the failures can be injected, to measure the performance and test the error handling.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.standin import StandinServer
+    from pyeumonia.transport import RewriteTransport
+    with StandinServer(latency=0.05, failure_rate=0.1) as standin:
+        covid = Covid19(check_upgradable=False, transport=RewriteTransport(standin.url))
+    ```
+    :param snapshot: The snapshot to serve, default is None, use `generate_snapshot()`.
+    :param host: The host to listen, default is '127.0.0.1'.
+    :param port: The port to listen, default is 0, use a free port.
+    :param latency: Every response is delayed for ** seconds, default is 0.
+    :param failure_rate: The rate of the responses which fail with 503, default is 0.
+    :param days: The count of days in every timeline, default is 60.
+    :param seed: The random seed of the timelines and the failures, default is 0.
+    :param etags: If you want the stand-in to ignore If-None-Match like a server without ETag, set it to False.
+    """
+
+    def __init__(self, snapshot=None, host='127.0.0.1', port=0, latency=0, failure_rate=0, days=60, seed=0,
+                 etags=True):
+        self.etags = etags
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.days = days
+        self.seed = seed
+        self.requests = 0
+        self.failures = 0
+        self.not_modified = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._serving = False
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.standin = self
+        self.set_snapshot(snapshot if snapshot is not None else generate_snapshot(seed=seed))
+
+    @property
+    def url(self):
+        """The base url of the stand-in, such as 'http://127.0.0.1:8001'."""
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def set_snapshot(self, snapshot):
+        """
+        # Serve another snapshot, such as the data of the next refresh.
+
+        :param snapshot: The snapshot.
+        """
+        regions = {}
+        for region in snapshot['c_data'] + snapshot['w_data']:
+            if region.get('statisticsData'):
+                regions[urlsplit(region['statisticsData']).path] = region
+        page = render_page(snapshot)
+        pages = {
+            '/ncovh5/view/pneumonia': (page, 'text/html; charset=utf-8'),
+            '/ncovh5/view/en_pneumonia': (page, 'text/html; charset=utf-8'),
+            '/json': (json.dumps({'ip': '127.0.0.1', 'city': 'Shanghai', 'region': 'Shanghai', 'country': 'CN',
+                                  'loc': '31.2222,121.4581', 'timezone': 'Asia/Shanghai'}).encode('utf-8'),
+                      'application/json; charset=utf-8'),
+            '/pypi/pyeumonia/json': (json.dumps({'info': {'name': 'pyeumonia', 'version': '0.0.0'}}).encode('utf-8'),
+                                     'application/json; charset=utf-8'),
+        }
+        with self._lock:
+            self.snapshot = snapshot
+            self._regions = regions
+            self._pages = pages
+            self._timelines = {}
+
+    def response(self, path):
+        """
+        # Get the body and the content type of a path.
+
+        :param path: The path of the request.
+        :return: A tuple of the body and the content type, or None if the path is not found.
+        """
+        with self._lock:
+            pages, regions, timelines = self._pages, self._regions, self._timelines
+        if path in pages:
+            return pages[path]
+        if path not in regions:
+            return None
+        if path not in timelines:
+            timeline = generate_timeline(regions[path], self.days, self.seed)
+            timelines[path] = (json.dumps({'code': 'success', 'data': timeline}, ensure_ascii=False,
+                                          separators=(',', ':')).encode('utf-8'), 'application/json; charset=utf-8')
+        return timelines[path]
+
+    def handle(self, path, headers=None):
+        """
+        # Handle a request, the latency and the failures are injected.
+
+        :param path: The path of the request.
+        :param headers: The headers of the request, default is None.
+        :return: A tuple of the status code, the body and the headers.
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        if self._should_fail():
+            return 503, b'Service Unavailable', {'Content-Type': 'text/plain'}
+        response = self.response(path)
+        if response is None:
+            return 404, b'Not Found', {'Content-Type': 'text/plain'}
+        body, content_type = response
+        if not self.etags:
+            return 200, body, {'Content-Type': content_type}
+        etag = f'"{hashlib.sha1(body).hexdigest()[:16]}"'
+        if etag == {key.lower(): value for key, value in (headers or {}).items()}.get('if-none-match'):
+            with self._lock:
+                self.not_modified += 1
+            return 304, b'', {'ETag': etag}
+        return 200, body, {'Content-Type': content_type, 'ETag': etag}
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            failed = self._random.random() < self.failure_rate
+            self.failures += failed
+        return failed
+
+    def start(self):
+        """Start the stand-in in the background."""
+        self._serving = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def shutdown(self):
+        """Stop the stand-in."""
+        if self._serving:  # `shutdown()` of http.server waits forever if it's not serving.
+            self._serving = False
+            self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+class StandinTransport(Transport):
+    """
+    # Get the responses from a `StandinServer` in the same process, without sockets.
+
+    The latency and the failures of the stand-in are still injected, it's used to measure the code of `Covid19` only.
+    :param standin: The `StandinServer`, it doesn't need to be started.
+    """
+
+    def __init__(self, standin):
+        self.standin = standin
+
+    def get(self, url, headers=None, timeout=None):
+        status, body, response_headers = self.standin.handle(urlsplit(url).path, headers)
+        return Response(status, body, response_headers, url)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handle the requests of `StandinServer`."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        status, body, headers = self.server.standin.handle(urlsplit(self.path).path, dict(self.headers.items()))
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """Don't print every request."""
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='A local stand-in of DXY, ipinfo and PyPI.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--latency', type=float, default=0, help='delay every response for ** seconds')
+    parser.add_argument('--failure-rate', type=float, default=0, help='the rate of the responses which fail')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    server = StandinServer(host=args.host, port=args.port, latency=args.latency, failure_rate=args.failure_rate,
+                           seed=args.seed)
+    print(f'Serving on {server.url}')
+    try:
+        server._serving = True
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,276 @@
+import sqlite3  # Import sqlite3 module, which is used to save the snapshots in a local database
+import json  # Import json module, which is used to serialize the records
+import hashlib  # Import hashlib module, which is used to find the unchanged records
+import time  # Import time module, which is used to convert the fetch time to dateId
+
+
+def snapshot_records(snapshot):
+    """
+    # Split a snapshot into records, every province, city, danger areas of a city, country and news is a record.
+
+    :param snapshot: A snapshot returned by `Covid19.snapshot()`.
+    :return: A dict of (kind, parent, region) and the record, kind is 'province', 'city', 'dangerAreas', 'country' or
+    'news', parent is the province of a city, or the continent of a country.
+    """
+    records = {}
+    for province in snapshot['c_data']:
+        province_name = province['provinceShortName']
+        province_data = {key: value for key, value in province.items() if key not in ['cities', 'dangerAreas']}
+        records[('province', '', province_name)] = province_data
+        for city in province['cities']:
+            records[('city', province_name, city['cityName'])] = city
+        danger_areas = {}
+        for area in province.get('dangerAreas', []):
+            danger_areas.setdefault(area['cityName'], []).append(area)
+        for city_name, areas in danger_areas.items():
+            records[('dangerAreas', province_name, city_name)] = areas
+    for country in snapshot['w_data']:
+        country_name = country.get('countryFullName') or country['provinceName']
+        records[('country', country['continents'], country_name)] = country
+    for news in snapshot['n_data']:
+        records[('news', '', str(news['id']))] = news
+    return records
+
+
+class SnapshotStore:
+    """
+    # Save every snapshot fetched by `Covid19` into a local SQLite database.
+
+    Only the records which are changed since the last snapshot will be saved, so the database grows with the changes
+    of the data, not with the count of fetches. All the queries are served from the database, no internet connection
+    is required.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.store import SnapshotStore
+    store = SnapshotStore('covid.db')
+    covid = Covid19(store=store)
+    # Get the history of a city
+    history = store.city_history('杨浦区', start=20220401, end=20220430)
+    # Get the data as of a day, and query it like the latest data.
+    old_covid = Covid19.from_snapshot(store.snapshot_as_of(20220415))
+    ```
+    :param path: The path of the database, default is 'pyeumonia.db'.
+    """
+
+    def __init__(self, path='pyeumonia.db'):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id INTEGER PRIMARY KEY,
+                fetch_time INTEGER NOT NULL,
+                date_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS snapshots_date ON snapshots (date_id, fetch_time);
+            -- A record is saved only when it is different from the latest one, data is NULL if it was removed.
+            CREATE TABLE IF NOT EXISTS records (
+                kind TEXT NOT NULL,
+                parent TEXT NOT NULL,
+                region TEXT NOT NULL,
+                date_id INTEGER NOT NULL,
+                snapshot_id INTEGER NOT NULL,
+                data TEXT
+            );
+            CREATE INDEX IF NOT EXISTS records_region_date ON records (kind, region, date_id);
+            CREATE INDEX IF NOT EXISTS records_date ON records (date_id);
+            CREATE TABLE IF NOT EXISTS latest (
+                kind TEXT NOT NULL,
+                parent TEXT NOT NULL,
+                region TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                PRIMARY KEY (kind, parent, region)
+            );
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        """Close the database."""
+        self.conn.close()
+
+    def record(self, covid):
+        """
+        # Save the snapshot of a `Covid19` instance.
+
+        :param covid: The `Covid19` instance, or a snapshot returned by `Covid19.snapshot()`.
+        :return: The id of the snapshot.
+        """
+        snapshot = covid if isinstance(covid, dict) else covid.snapshot()
+        fetch_time = snapshot['fetch_time']
+        date_id = int(time.strftime('%Y%m%d', time.localtime(fetch_time)))
+        records = snapshot_records(snapshot)
+        with self.conn:
+            cursor = self.conn.execute('INSERT INTO snapshots (fetch_time, date_id) VALUES (?, ?)',
+                                       (fetch_time, date_id))
+            snapshot_id = cursor.lastrowid
+            latest = {(kind, parent, region): digest for kind, parent, region, digest in
+                      self.conn.execute('SELECT kind, parent, region, digest FROM latest')}
+            changed = []
+            for key, value in records.items():
+                data = json.dumps(value, ensure_ascii=False, sort_keys=True)
+                digest = hashlib.sha1(data.encode('utf-8')).hexdigest()
+                if latest.pop(key, None) != digest:
+                    changed.append((key, data, digest))
+            self.conn.executemany(
+                'INSERT INTO records (kind, parent, region, date_id, snapshot_id, data) VALUES (?, ?, ?, ?, ?, ?)',
+                [(*key, date_id, snapshot_id, data) for key, data, digest in changed])
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO latest (kind, parent, region, digest) VALUES (?, ?, ?, ?)',
+                [(*key, digest) for key, data, digest in changed])
+            # The records which are not in this snapshot any more have been removed.
+            self.conn.executemany(
+                'INSERT INTO records (kind, parent, region, date_id, snapshot_id, data) VALUES (?, ?, ?, ?, ?, NULL)',
+                [(*key, date_id, snapshot_id) for key in latest])
+            self.conn.executemany('DELETE FROM latest WHERE kind = ? AND parent = ? AND region = ?', list(latest))
+        return snapshot_id
+
+    def snapshots(self):
+        """
+        # Get all the snapshots saved in the database.
+
+        :return: A list of snapshots, with the id, fetch time and dateId.
+        """
+        return [{'id': snapshot_id, 'fetchTime': fetch_time, 'dateId': date_id} for snapshot_id, fetch_time, date_id
+                in self.conn.execute('SELECT id, fetch_time, date_id FROM snapshots ORDER BY id')]
+
+    def history(self, kind, region, start=None, end=None):
+        """
+        # Get the history of a region between two days.
+
+        :param kind: The kind of the region, 'province', 'city', 'country', 'dangerAreas' or 'news'.
+        :param region: The name of the region, the short name for provinces, the full name for countries.
+        :param start: The first day of the history, such as 20220401, default is None, from the first snapshot.
+        :param end: The last day of the history, default is None, until the latest snapshot.
+        :return: The data in json format, every version of the region which is changed between these days,
+        including the version which was valid on the first day. The data is None if the region was removed.
+        """
+        start = start or 0
+        end = end or 99991231
+        rows = self.conn.execute('''
+            SELECT parent, records.date_id, fetch_time, data FROM records JOIN snapshots ON snapshots.id = snapshot_id
+            WHERE records.rowid IN (
+                SELECT MAX(rowid) FROM records WHERE kind = ? AND region = ? AND date_id < ? GROUP BY parent
+            ) OR (kind = ? AND region = ? AND records.date_id BETWEEN ? AND ?)
+            ORDER BY records.rowid
+        ''', (kind, region, start, kind, region, start, end))
+        history = []
+        for parent, date_id, fetch_time, data in rows:
+            if data is None and not history:
+                continue
+            history.append({
+                'dateId': date_id,
+                'fetchTime': fetch_time,
+                'parent': parent,
+                'data': json.loads(data) if data is not None else None,
+            })
+        return history
+
+    def province_history(self, province_name, start=None, end=None):
+        """
+        # Get the history of a province between two days.
+
+        :param province_name: The short name of the province, such as '上海'.
+        :param start: The first day of the history, such as 20220401.
+        :param end: The last day of the history, such as 20220430.
+        :return: The data in json format.
+        """
+        return self.history('province', province_name, start, end)
+
+    def city_history(self, city_name, start=None, end=None):
+        """
+        # Get the history of a city between two days.
+
+        :param city_name: The city name used by DXY, such as '杨浦区'.
+        :param start: The first day of the history, such as 20220401.
+        :param end: The last day of the history, such as 20220430.
+        :return: The data in json format.
+        """
+        return self.history('city', city_name, start, end)
+
+    def country_history(self, country_name, start=None, end=None):
+        """
+        # Get the history of a country between two days.
+
+        :param country_name: The full name of the country, such as 'United States of America'.
+        :param start: The first day of the history, such as 20220401.
+        :param end: The last day of the history, such as 20220430.
+        :return: The data in json format.
+        """
+        return self.history('country', country_name, start, end)
+
+    def danger_areas_history(self, city_name, start=None, end=None):
+        """
+        # Get the history of the danger areas in a city between two days.
+
+        :param city_name: The city name used by DXY, such as '杨浦区'.
+        :param start: The first day of the history, such as 20220401.
+        :param end: The last day of the history, such as 20220430.
+        :return: The data in json format.
+        """
+        return self.history('dangerAreas', city_name, start, end)
+
+    def news(self, start=None, end=None):
+        """
+        # Get all the news which are first seen between two days.
+
+        :param start: The first day, such as 20220401.
+        :param end: The last day, such as 20220430.
+        :return: The news in json format.
+        """
+        rows = self.conn.execute('''
+            SELECT data FROM records WHERE kind = 'news' AND data IS NOT NULL AND date_id BETWEEN ? AND ?
+            AND rowid IN (SELECT MIN(rowid) FROM records WHERE kind = 'news' GROUP BY region)
+            ORDER BY rowid
+        ''', (start or 0, end or 99991231))
+        return [json.loads(data) for data, in rows]
+
+    def snapshot_as_of(self, date_id=None):
+        """
+        # Get the latest snapshot saved on or before a day.
+
+        :param date_id: The day, such as 20220415, default is None, get the latest snapshot.
+        :return: A snapshot which can be used by `Covid19.from_snapshot()`, None if there is no snapshot before the day.
+        """
+        date_id = date_id or 99991231
+        row = self.conn.execute('SELECT fetch_time FROM snapshots WHERE date_id <= ? ORDER BY id DESC LIMIT 1',
+                                (date_id,)).fetchone()
+        if row is None:
+            return None
+        rows = self.conn.execute('''
+            SELECT kind, parent, data FROM records JOIN (
+                SELECT MAX(rowid) AS last_id, MIN(rowid) AS first_id FROM records WHERE date_id <= ?
+                GROUP BY kind, parent, region
+            ) ON records.rowid = last_id
+            WHERE data IS NOT NULL ORDER BY first_id
+        ''', (date_id,))
+        provinces = {}
+        cities = []
+        danger_areas = []
+        w_data = []
+        n_data = []
+        for kind, parent, data in rows:
+            data = json.loads(data)
+            if kind == 'province':
+                data['cities'] = []
+                data['dangerAreas'] = []
+                provinces[data['provinceShortName']] = data
+            elif kind == 'city':
+                cities.append((parent, data))
+            elif kind == 'dangerAreas':
+                danger_areas.append((parent, data))
+            elif kind == 'country':
+                w_data.append(data)
+            elif kind == 'news':
+                n_data.append(data)
+        for parent, city in cities:
+            if parent in provinces:
+                provinces[parent]['cities'].append(city)
+        for parent, areas in danger_areas:
+            if parent in provinces:
+                provinces[parent]['dangerAreas'].extend(areas)
+        n_data.sort(key=lambda news: news['pubDate'], reverse=True)
+        return {
+            'fetch_time': row[0],
+            'c_data': list(provinces.values()),
+            'w_data': w_data,
+            'n_data': n_data,
+        }
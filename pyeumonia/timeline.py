@@ -0,0 +1,300 @@
+import numpy as np  # Import numpy module, which is used to store the timeline in columns
+
+from . import TIMELINE_FIELDS
+
+
+class Timeline:
+    """
+    # The timeline of a province or a country, every field is stored in a numpy array.
+
+    The daily increments, windows and reductions are computed by numpy instead of python loops.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    covid = Covid19(language='zh_CN')
+    timeline = covid.province_covid_data('上海', show_timeline=30, columnar=True)['data']
+    new_cases = timeline.increments('confirmedCount')
+    last_week = timeline.window(start=20220425)
+    ```
+    :param columns: A dict of the fields, every value will be converted to an int64 numpy array.
+    """
+
+    def __init__(self, columns):
+        self.columns = {field: np.asarray(columns[field], dtype=np.int64) for field in TIMELINE_FIELDS}
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        # Build the timeline from the data of every day.
+
+        :param records: A list of dicts, such as the result of `Covid19.fetch_timeline()`.
+        :return: The timeline.
+        """
+        return cls({field: [record[field] for record in records] for field in TIMELINE_FIELDS})
+
+    @classmethod
+    def from_file(cls, timeline_file, region_name, region_type=None):
+        """
+        # Build the timeline from a `pyeumonia.binary.TimelineFile`, the columns are not copied from the file.
+
+        :param timeline_file: The `TimelineFile`.
+        :param region_name: The short name of the province or the full name of the country.
+        :param region_type: 'province' or 'country', default is None, find the region in both of them.
+        :return: The timeline.
+        """
+        timeline = cls.__new__(cls)
+        timeline.columns = {}
+        for field in TIMELINE_FIELDS:
+            column = np.frombuffer(timeline_file.column(region_name, field, region_type),
+                                   dtype=np.int32 if field == 'dateId' else np.int64)
+            timeline.columns[field] = column
+        return timeline
+
+    def __len__(self):
+        return len(self.columns['dateId'])
+
+    def __getitem__(self, field):
+        return self.columns[field]
+
+    def increments(self, field='confirmedCount'):
+        """
+        # Get the daily increments of a field.
+
+        :param field: The field, default is 'confirmedCount'.
+        :return: A numpy array, the increment of the first day is 0.
+        """
+        return np.diff(self.columns[field], prepend=self.columns[field][:1])
+
+    def window(self, start=None, end=None):
+        """
+        # Get the timeline between two days.
+
+        :param start: The first day, such as 20220401, default is None, from the first day of the timeline.
+        :param end: The last day, such as 20220430, default is None, until the last day of the timeline.
+        :return: A new timeline, the arrays are views of this timeline.
+        """
+        date_ids = self.columns['dateId']
+        first = 0 if start is None else np.searchsorted(date_ids, start, side='left')
+        last = len(date_ids) if end is None else np.searchsorted(date_ids, end, side='right')
+        timeline = Timeline.__new__(Timeline)
+        timeline.columns = {field: column[first:last] for field, column in self.columns.items()}
+        return timeline
+
+    def sum(self, field):
+        """Get the sum of a field."""
+        return int(self.columns[field].sum())
+
+    def max(self, field):
+        """Get the maximum of a field."""
+        return int(self.columns[field].max())
+
+    def min(self, field):
+        """Get the minimum of a field."""
+        return int(self.columns[field].min())
+
+    def mean(self, field):
+        """Get the mean of a field."""
+        return float(self.columns[field].mean())
+
+    def to_list(self):
+        """
+        # Convert the timeline to the data of every day.
+
+        :return: A list of dicts, the same as the timeline returned without `columnar=True`.
+        """
+        columns = [(field, self.columns[field].tolist()) for field in TIMELINE_FIELDS]
+        return [{field: column[i] for field, column in columns} for i in range(len(self))]
+
+
+def date_ids_to_days(date_ids):
+    """Convert dateIds such as 20220401 to numpy dates."""
+    date_ids = np.asarray(date_ids, dtype=np.int64)
+    months = (date_ids // 10000 - 1970) * 12 + date_ids // 100 % 100 - 1
+    return months.astype('datetime64[M]').astype('datetime64[D]') + (date_ids % 100 - 1)
+
+
+def days_to_date_ids(days):
+    """Convert numpy dates to dateIds such as 20220401."""
+    months = days.astype('datetime64[M]')
+    years = months.astype('datetime64[Y]').astype(np.int64) + 1970
+    return years * 10000 + (months.astype(np.int64) % 12 + 1) * 100 + (days - months).astype(np.int64) + 1
+
+
+class TimelineMatrix:
+    """
+    # The timelines of several regions aligned on the same days, every field is a region × day numpy array.
+
+    The days are continuous, if there is no data in a day, the data of the day before will be used,
+    the days before the first data of a region are 0.
+    :param labels: The names of the regions, the rows of the arrays.
+    :param date_ids: The dateIds of the days, the columns of the arrays.
+    :param values: A dict of the fields, every value is a 2-D numpy array.
+    """
+
+    def __init__(self, labels, date_ids, values):
+        self.labels = list(labels)
+        self.date_ids = np.asarray(date_ids)
+        self.values = values
+
+    @classmethod
+    def stack(cls, timelines):
+        """
+        # Align the timelines of several regions on the same days.
+
+        :param timelines: A iterable of (region name, timeline), the timeline can be a list of dicts or a `Timeline`.
+        :return: The matrix.
+        """
+        labels = []
+        columns = []
+        for label, timeline in timelines:
+            if not isinstance(timeline, Timeline):
+                timeline = Timeline.from_records(timeline)
+            labels.append(label)
+            columns.append(timeline.columns)
+        all_days = [date_ids_to_days(column['dateId']) for column in columns if len(column['dateId'])]
+        if all_days:
+            first = min(days.min() for days in all_days)
+            last = max(days.max() for days in all_days)
+            axis = np.arange(first, last + 1, dtype='datetime64[D]')
+        else:
+            axis = np.array([], dtype='datetime64[D]')
+        # Every row is filled with the index of the last day which has data, -1 if there is no data yet.
+        filled = np.full((len(labels), len(axis)), -1, dtype=np.int64)
+        for row, column in enumerate(columns):
+            if len(column['dateId']):
+                positions = (date_ids_to_days(column['dateId']) - axis[0]).astype(np.int64)
+                filled[row, positions] = np.arange(len(positions))
+        filled = np.maximum.accumulate(filled, axis=1)
+        values = {}
+        for field in TIMELINE_FIELDS[1:]:
+            matrix = np.zeros((len(labels), len(axis)), dtype=np.int64)
+            for row, column in enumerate(columns):
+                mask = filled[row] >= 0
+                matrix[row, mask] = column[field][filled[row, mask]]
+            values[field] = matrix
+        return cls(labels, days_to_date_ids(axis), values)
+
+    def __getitem__(self, field):
+        return self.values[field]
+
+    def row(self, label):
+        """
+        # Get the timeline of a region from the matrix.
+
+        :param label: The name of the region.
+        :return: A `Timeline`.
+        """
+        index = self.labels.index(label)
+        columns = {field: matrix[index] for field, matrix in self.values.items()}
+        columns['dateId'] = self.date_ids
+        return Timeline(columns)
+
+
+def _periods(date_ids, level):
+    """Get the period of every day, the days in the same week, month or quarter have the same period."""
+    date_ids = np.asarray(date_ids, dtype=np.int64)
+    if level == 'day':
+        return date_ids
+    if level == 'week':  # 1970-01-01 is Thursday, so the weeks start from Monday.
+        return (date_ids_to_days(date_ids).astype(np.int64) + 3) // 7
+    months = date_ids // 10000 * 12 + date_ids // 100 % 100 - 1
+    if level == 'month':
+        return months
+    return months // 3
+
+
+class TimelinePyramid:
+    """
+    # The timelines of several regions aggregated by day, week, month and quarter.
+
+    For every period, the cumulative counts are the counts of the last day, and the increments (such as
+    `confirmedCountIncr`) are the sums of the daily increments, the dateId of a period is its last day.
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    covid = Covid19()
+    pyramid = covid.analytics().pyramid()
+    # Get no more than 100 points of a country for a chart.
+    series = pyramid.series('France', max_points=100)
+    ```
+    :param matrix: A `TimelineMatrix`.
+    """
+    LEVELS = ['day', 'week', 'month', 'quarter']
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.levels = {level: self._aggregate(level, 0) for level in self.LEVELS}
+
+    def _aggregate(self, level, first):
+        """Aggregate the days from `first` to the last day, `first` must be the first day of a period."""
+        date_ids = self.matrix.date_ids[first:]
+        periods = _periods(date_ids, level)
+        starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]]) if len(periods) else np.array([], int)
+        ends = np.r_[starts[1:], len(periods)] - 1
+        result = {'dateId': date_ids[ends], 'starts': starts + first}
+        for field, matrix in self.matrix.values.items():
+            values = matrix[:, first:]
+            before = matrix[:, first - 1:first] if first else values[:, :1]
+            increments = np.diff(values, axis=1, prepend=before)
+            result[field] = values[:, ends]
+            if len(starts):
+                result[f'{field}Incr'] = np.add.reduceat(increments, starts, axis=1)
+            else:
+                result[f'{field}Incr'] = np.zeros((len(self.matrix.labels), 0), dtype=np.int64)
+        return result
+
+    def extend(self, matrix):
+        """
+        # Add the new days to the pyramid, only the last period of every level is aggregated again.
+
+        :param matrix: A `TimelineMatrix` with the same regions, the days before the last day of the pyramid are ignored.
+        """
+        if matrix.labels != self.matrix.labels:
+            raise ValueError('The regions of the new days are different.')
+        new_days = matrix.date_ids > self.matrix.date_ids[-1] if len(self.matrix.date_ids) else slice(None)
+        self.matrix = TimelineMatrix(
+            self.matrix.labels,
+            np.concatenate([self.matrix.date_ids, matrix.date_ids[new_days]]),
+            {field: np.concatenate([values, matrix.values[field][:, new_days]], axis=1)
+             for field, values in self.matrix.values.items()}
+        )
+        for level in self.LEVELS:
+            old = self.levels[level]
+            if not len(old['starts']):
+                self.levels[level] = self._aggregate(level, 0)
+                continue
+            tail = self._aggregate(level, int(old['starts'][-1]))
+            self.levels[level] = {key: np.concatenate([old[key][..., :-1], tail[key]], axis=-1) for key in old}
+
+    def select(self, max_points, start=None, end=None):
+        """
+        # Choose the finest level which has no more than `max_points` periods between start and end.
+
+        :param max_points: The maximum count of points.
+        :param start: The first day, such as 20220401, default is None, from the first day.
+        :param end: The last day, such as 20220430, default is None, until the last day.
+        :return: The name of the level, and the aggregated data between start and end.
+        """
+        for level in self.LEVELS:
+            data = self.levels[level]
+            first = 0 if start is None else np.searchsorted(data['dateId'], start, side='left')
+            last = len(data['dateId']) if end is None else np.searchsorted(data['dateId'], end, side='right')
+            if last - first <= max_points or level == self.LEVELS[-1]:
+                return level, {key: values[..., first:last] for key, values in data.items() if key != 'starts'}
+
+    def series(self, label, max_points, start=None, end=None):
+        """
+        # Get the data of a region for a chart.
+
+        :param label: The name of the region.
+        :param max_points: The maximum count of points.
+        :param start: The first day, such as 20220401.
+        :param end: The last day, such as 20220430.
+        :return: The data in json format, with the level and a list for every field.
+        """
+        index = self.matrix.labels.index(label)
+        level, data = self.select(max_points, start, end)
+        series = {'level': level, 'dateId': data.pop('dateId').tolist()}
+        for field, values in data.items():
+            series[field] = values[index].tolist()
+        return series
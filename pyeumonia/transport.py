@@ -0,0 +1,145 @@
+import base64  # Import base64 module, which is used to save the binary responses
+import hashlib  # Import hashlib module, which is used to name the fixture files
+import json  # Import json module, which is used to save the fixture files
+import os  # Import os module, which is used to find the fixture files
+from urllib.parse import urlsplit, urlunsplit  # Import urllib.parse module, which is used to rewrite the urls
+
+from . import CovidException
+
+
+class Response:
+    """
+    # A response which is not from requests, it has the same attributes used by `Covid19`.
+
+    :param status_code: The status code.
+    :param content: The body in bytes.
+    :param headers: The headers, default is None.
+    :param url: The url of the request.
+    """
+
+    def __init__(self, status_code, content, headers=None, url=''):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.url = url
+        self.encoding = 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class Transport:
+    """
+    # Send the HTTP requests of `Covid19`, all the requests to DXY, ipinfo and PyPI go through it.
+
+    Subclass it and override `get()` to use another HTTP client, or to record, replay and rewrite the requests.
+    """
+
+    def get(self, url, headers=None, timeout=None):
+        """
+        # Send a GET request.
+
+        :param url: The url.
+        :param headers: The headers, default is None.
+        :param timeout: The timeout in seconds, default is None, wait forever.
+        :return: A response with `status_code`, `content`, `text`, `headers`, `encoding` and `json()`.
+        """
+        raise NotImplementedError
+
+
+class RequestsTransport(Transport):
+    """Send the requests by requests, it's the default transport."""
+
+    def __init__(self):
+        import requests  # Import requests module, which is used to send HTTP requests
+        self.session = requests.Session()
+
+    def get(self, url, headers=None, timeout=None):
+        return self.session.get(url, headers=headers, timeout=timeout)
+
+
+def _fixture_path(directory, url):
+    """The fixture of a url is named by the hash of the url."""
+    return os.path.join(directory, f'{hashlib.sha1(url.encode("utf-8")).hexdigest()}.json')
+
+
+class RecordingTransport(Transport):
+    """
+    # Send the requests by another transport, and save every response into a fixture file.
+
+    Usage:
+    ```python
+    from pyeumonia import Covid19
+    from pyeumonia.transport import RecordingTransport, ReplayTransport
+    # Record the responses with internet connection
+    covid = Covid19(transport=RecordingTransport('fixtures'))
+    covid.province_covid_data('上海', show_timeline=30)
+    # Replay them without internet connection
+    covid = Covid19(transport=ReplayTransport('fixtures'))
+    ```
+    :param directory: The directory of the fixture files.
+    :param transport: The transport which sends the requests, default is None, use `RequestsTransport`.
+    """
+
+    def __init__(self, directory, transport=None):
+        self.directory = directory
+        self.transport = transport or RequestsTransport()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, url, headers=None, timeout=None):
+        response = self.transport.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304:  # The body of a conditional request is empty, keep the fixture of the page.
+            return response
+        fixture = {
+            'url': url,
+            'status_code': response.status_code,
+            'headers': dict(response.headers),
+            'body': base64.b64encode(response.content).decode('ascii'),
+        }
+        path = _fixture_path(self.directory, url)
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(fixture, f, ensure_ascii=False, indent=2)
+        os.replace(f'{path}.tmp', path)
+        return response
+
+
+class ReplayTransport(Transport):
+    """
+    # Serve the responses from the fixture files saved by `RecordingTransport`, no internet connection is required.
+
+    :param directory: The directory of the fixture files.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get(self, url, headers=None, timeout=None):
+        try:
+            with open(_fixture_path(self.directory, url), encoding='utf-8') as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise CovidException(f'There is no fixture for {url}.')
+        return Response(fixture['status_code'], base64.b64decode(fixture['body']), fixture['headers'], url)
+
+
+class RewriteTransport(Transport):
+    """
+    # Send all the requests to another host, such as the local stand-in of DXY, ipinfo and PyPI.
+
+    Only the scheme and the host of the urls are changed, the paths and the queries are kept.
+    :param base_url: The new scheme and host, such as 'http://127.0.0.1:8001'.
+    :param transport: The transport which sends the requests, default is None, use `RequestsTransport`.
+    """
+
+    def __init__(self, base_url, transport=None):
+        self.base_url = urlsplit(base_url)
+        self.transport = transport or RequestsTransport()
+
+    def get(self, url, headers=None, timeout=None):
+        parts = urlsplit(url)
+        url = urlunsplit((self.base_url.scheme, self.base_url.netloc, parts.path, parts.query, parts.fragment))
+        return self.transport.get(url, headers=headers, timeout=timeout)
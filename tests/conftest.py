@@ -0,0 +1,27 @@
+import pytest
+
+from pyeumonia import Covid19
+from pyeumonia.standin import StandinServer, StandinTransport, generate_snapshot
+
+# 2022-04-15 12:00 in Shanghai, the snapshots of the tests are fetched at the same time.
+FETCH_TIME = 1650000000
+
+
+@pytest.fixture
+def snapshot():
+    """A small snapshot, with the same data in every test."""
+    return generate_snapshot(provinces=4, cities=3, countries=6, news=3, danger_areas=2, fetch_time=FETCH_TIME)
+
+
+@pytest.fixture
+def standin(snapshot):
+    """A stand-in of DXY which is used without sockets, by `StandinTransport`."""
+    server = StandinServer(snapshot, days=30)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def covid(standin):
+    """A `Covid19` instance which downloads the data from the stand-in."""
+    return Covid19('zh_CN', check_upgradable=False, transport=StandinTransport(standin))
@@ -0,0 +1,94 @@
+import pytest
+
+from pyeumonia.alerts import AlertEngine, Condition, Increase, Threshold
+
+
+def province(count, region='上海'):
+    return {'kind': 'province', 'parent': '', 'region': region, 'data': {'currentConfirmedCount': count}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1650000000
+
+    def __call__(self):
+        return self.now
+
+
+def test_threshold_is_sent_once_while_triggered():
+    engine = AlertEngine([Threshold('over-100', 'province', 'currentConfirmedCount', above=100)])
+    assert engine.process([province(50)]) == []
+    assert [alert.value for alert in engine.process([province(150)])] == [150]
+    assert engine.process([province(160)]) == []
+    assert engine.process([province(170)]) == []
+    # It's sent again after it was recovered.
+    assert engine.process([province(90)]) == []
+    assert [alert.message for alert in engine.process([province(120)])] == \
+        ['上海 currentConfirmedCount is 120, above 100.']
+
+
+def test_cooldown_does_not_swallow_alerts():
+    clock = Clock()
+    engine = AlertEngine([Threshold('over-100', 'province', 'currentConfirmedCount', above=100, cooldown=60)],
+                         clock=clock)
+    assert len(engine.process([province(150)])) == 1
+    engine.process([province(50)])
+    clock.now += 10
+    assert engine.process([province(150)]) == []
+    assert engine.suppressed == 1
+    clock.now += 60
+    # The rule is still triggered after the cooldown, the alert is sent now.
+    assert [alert.value for alert in engine.process([province(160)])] == [160]
+
+
+def test_every_increase_since_the_last_refresh_is_sent():
+    engine = AlertEngine([Increase('more', 'province', 'currentConfirmedCount', amount=0),
+                          Increase('more-today', 'province', 'currentConfirmedCount', amount=0, period='day')])
+    engine.process([province(0)], fetch_time=1650000000)
+    assert [alert.rule for alert in engine.process([province(1)], fetch_time=1650086400)] == ['more', 'more-today']
+    # Both are still triggered, but only the new increase since the last refresh is a new event.
+    assert [(alert.rule, alert.previous) for alert in engine.process([province(2)], fetch_time=1650086400)] == \
+        [('more', 1)]
+
+
+def test_rules_are_indexed_by_region_and_field():
+    engine = AlertEngine([
+        Increase('shanghai', 'province', 'currentConfirmedCount', amount=10, regions=['上海']),
+        Increase('asia-ratio', 'country', 'confirmedCount', ratio=0.5, regions=['亚洲']),
+        Condition('empty', 'province', ['currentConfirmedCount'], lambda record, previous, yesterday:
+                  record['currentConfirmedCount'] == 0),
+    ])
+    engine.process([province(10), province(10, '北京')])
+    assert [alert.rule for alert in engine.process([province(30), province(30, '北京')])] == ['shanghai']
+    changes = [{'kind': 'country', 'parent': '亚洲', 'region': 'Japan', 'data': {'confirmedCount': count}}
+               for count in [100, 200]]
+    engine.process(changes[:1])
+    assert [alert.previous for alert in engine.process(changes[1:])] == [100]
+    assert [alert.rule for alert in engine.process([province(0, '北京')])] == ['empty']
+    engine.remove_rule('shanghai')
+    assert engine.process([province(100)]) == []
+    with pytest.raises(ValueError):
+        Increase('invalid', 'province', 'currentConfirmedCount')
+
+
+def test_failed_callback_is_logged(caplog):
+    received = []
+
+    def broken(alert):
+        raise RuntimeError('The webhook is down.')
+    engine = AlertEngine([Threshold('over-100', 'province', 'currentConfirmedCount', above=100)])
+    engine.add_callback(broken)
+    engine.add_callback(received.append)
+    alerts = engine.process([province(150)])
+    assert received == alerts
+    assert engine.failed == 1
+    assert 'The webhook is down.' in caplog.text
+
+
+def test_refresh(covid, standin, snapshot):
+    engine = AlertEngine([Increase('more', 'province', 'confirmedCount', amount=0)])
+    engine.evaluate(None, covid.snapshot())
+    assert engine.refresh(covid) == []
+    snapshot['c_data'][1]['confirmedCount'] += 1
+    standin.set_snapshot(snapshot)
+    assert [alert.region for alert in engine.refresh(covid)] == ['省份1']
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from pyeumonia import CovidException
+from pyeumonia.analytics import Analytics
+from pyeumonia.timeline import TimelineMatrix
+
+
+def matrix(*confirmed):
+    """A matrix of the regions 'a', 'b'..., with the confirmed counts of every day from 2022-04-01."""
+    return TimelineMatrix.stack(
+        (chr(ord('a') + row), [{'dateId': 20220401 + day, 'confirmedCount': count, 'curedCount': 0,
+                                'deadCount': count // 10, 'currentConfirmedCount': count}
+                               for day, count in enumerate(counts)])
+        for row, counts in enumerate(confirmed))
+
+
+def test_metrics():
+    analytics = Analytics(matrix([10, 20, 40, 40, 50, 60, 70, 80, 100], [0, 0, 0, 0, 0, 0, 0, 0, 0]))
+    assert analytics.new_cases()[0].tolist() == [0, 10, 20, 0, 10, 10, 10, 10, 20]
+    assert analytics.moving_average(2)[0].tolist() == [0, 5, 15, 10, 5, 10, 10, 10, 15]
+    assert analytics.latest(analytics.moving_average(7)) == {'a': 80 / 7, 'b': 0}
+    assert analytics.latest(analytics.case_fatality_rate())['a'] == 0.1
+    assert np.isnan(analytics.latest(analytics.case_fatality_rate())['b'])
+    assert analytics.doubling_time()[0, -1] == pytest.approx(7 * np.log(2) / np.log(100 / 20))
+    # The results are computed once and can't be changed.
+    assert analytics.moving_average(2) is analytics.moving_average(2)
+    assert not analytics.moving_average(2).flags.writeable
+
+
+@pytest.mark.parametrize('window', [0, -1, 1.5, '7'])
+def test_invalid_window(window):
+    analytics = Analytics(matrix([1, 2, 3]))
+    with pytest.raises(CovidException):
+        analytics.moving_average(window)
+
+
+def test_cache(covid):
+    provinces = covid.analytics(countries=False)
+    countries = covid.analytics(provinces=False)
+    # The analytics of different regions don't evict each other.
+    assert covid.analytics(countries=False) is provinces
+    assert covid.analytics(provinces=False) is countries
+    assert provinces.labels == [province['provinceShortName'] for province in covid.c_data]
+    covid.version += 1
+    assert covid.analytics(countries=False) is not provinces
@@ -0,0 +1,24 @@
+import io
+
+from benchmarks.bench import compare, measure, run
+
+
+def test_measure():
+    calls = []
+    result = measure(lambda: calls.append(bytearray(1024)), min_time=0, min_runs=3)
+    # Warm up, 3 runs and 1 run with tracemalloc.
+    assert len(calls) == 5 and result['runs'] == 3
+    assert result['p50_ms'] <= result['max_ms']
+    assert result['peak_memory'] >= 1024
+
+
+def test_run_and_compare():
+    output = io.StringIO()
+    results = run(scales=[1], min_time=0, only=['world_covid_data', 'world_covid_data cold'], output=output)
+    assert sorted(results['1x']) == ['world_covid_data', 'world_covid_data cold']
+    assert len(output.getvalue().splitlines()) == 2
+    baseline = {'results': {'1x': {'world_covid_data': dict(results['1x']['world_covid_data'], p50_ms=1e-9)}}}
+    [(scale, name, time_ratio, memory_ratio, regressed)] = compare(results, baseline)
+    assert (scale, name, memory_ratio, regressed) == ('1x', 'world_covid_data', 1.0, True)
+    assert time_ratio > 1.2
+    assert not any(row[4] for row in compare(results, {'results': results}))
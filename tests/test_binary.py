@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+from pyeumonia.binary import HEADER, INDEX_ENTRY, TimelineFile, _align, dump_timelines, write_timelines
+
+
+def days(count, start=20220401):
+    return [{'dateId': start + i, 'confirmedCount': 100 + i, 'curedCount': i, 'deadCount': 0,
+             'currentConfirmedCount': 100, 'confirmedIncr': 1} for i in range(count)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'timelines.bin')
+    write_timelines(path, [('province', '上海', days(3)), ('country', 'France', days(5, 20220410))])
+    return path
+
+
+def test_roundtrip(path):
+    with TimelineFile(path) as timelines:
+        assert list(timelines.column('上海', 'confirmedCount')) == [100, 101, 102]
+        assert list(timelines.column('France', 'dateId', 'country')) == list(range(20220410, 20220415))
+        assert timelines.timeline('上海')[1]['curedCount'] == 1
+        assert timelines.timeline('上海')[1]['deadIncr'] == 0
+        with pytest.raises(KeyError):
+            timelines.column('北京', 'confirmedCount')
+
+
+def test_little_endian(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    # The first dateId is right after the header and the index of 2 regions.
+    offset = _align(HEADER.size + 2 * INDEX_ENTRY.size)
+    assert int.from_bytes(data[offset:offset + 4], 'little') == 20220401
+
+
+def test_close_with_columns_in_use(path):
+    timelines = TimelineFile(path)
+    confirmed = timelines.column('上海', 'confirmedCount')
+    timelines.close()
+    assert list(confirmed) == [100, 101, 102]
+    timelines.close()
+    confirmed.release()
+
+
+def test_failed_write_removes_temp_file(path, tmp_path, monkeypatch):
+    def replace(source, destination):
+        raise OSError('The disk is full.')
+    monkeypatch.setattr(os, 'replace', replace)
+    with pytest.raises(OSError):
+        write_timelines(path, [('province', '上海', days(1))])
+    monkeypatch.undo()
+    assert os.listdir(tmp_path) == ['timelines.bin']
+    with TimelineFile(path) as timelines:
+        assert len(timelines.regions) == 2
+
+
+def test_dump_timelines(covid, tmp_path):
+    path = str(tmp_path / 'timelines.bin')
+    assert dump_timelines(covid, path, countries=False) == len(covid.c_data)
+    with TimelineFile(path) as timelines:
+        assert len(timelines.timeline('上海', 'province')) == 30
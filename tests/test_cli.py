@@ -0,0 +1,48 @@
+import json
+import os
+
+import pytest
+
+from pyeumonia import Covid19
+from pyeumonia.cli import main, render
+from pyeumonia.standin import StandinTransport
+
+
+@pytest.fixture
+def cli(standin, tmp_path, monkeypatch):
+    """Run the command-line interface with the stand-in and a temporary cache directory."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path))
+    monkeypatch.setattr(Covid19, '_default_transport', staticmethod(lambda: StandinTransport(standin)))
+    return main
+
+
+def test_query(cli, standin, capsys):
+    assert cli(['-l', 'zh_CN', 'province', '上海']) == 0
+    data = json.loads(capsys.readouterr().out)
+    assert data['provinceShortName'] == '上海'
+    requests = standin.requests
+    # The output is cached for the snapshot.
+    assert cli(['-l', 'zh_CN', 'province', '上海']) == 0
+    assert json.loads(capsys.readouterr().out) == data
+    assert standin.requests == requests
+    assert len(os.listdir(os.path.join(os.environ['XDG_CACHE_HOME'], 'pyeumonia', 'output'))) == 1
+
+
+def test_formats(cli, capsys):
+    assert cli(['-l', 'en_US', '-f', 'csv', 'world']) == 0
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].startswith('currentConfirmedCount,') and len(lines) == 7
+    assert render({'provinceShortName': '上海', 'confirmedCount': 1}, 'table') == \
+        'provinceShortName  confirmedCount\n上海               1\n'
+
+
+def test_errors(cli, monkeypatch, capsys):
+    assert cli(['-l', 'en_US', 'province', 'Nowhere']) == 1
+    assert 'Nowhere' in capsys.readouterr().err
+
+    def unreachable():
+        raise ConnectionError('Connection refused')
+    monkeypatch.setattr(Covid19, 'refresh', lambda self: unreachable())
+    assert cli(['-l', 'en_US', '--refresh', 'world']) == 1
+    assert capsys.readouterr().err == \
+        'Failed to get the data, please check your network connection: Connection refused\n'
@@ -0,0 +1,65 @@
+import pytest
+
+from pyeumonia import Covid19, CovidException
+from pyeumonia.standin import StandinServer, StandinTransport
+
+
+def test_conditional_refresh(covid, standin):
+    c_data = covid.c_data
+    covid.refresh()
+    assert standin.not_modified == 1
+    assert covid.version == 1 and covid.c_data is c_data
+    assert covid.fetch_stats == {'fetches': 2, 'not_modified': 1, 'unchanged': 0, 'sections_decoded': 3,
+                                 'sections_reused': 0}
+
+
+def test_unchanged_sections_are_reused(covid, standin, snapshot):
+    w_data, n_data = covid.w_data, covid.n_data
+    snapshot['c_data'][0]['confirmedCount'] += 1
+    standin.set_snapshot(snapshot)
+    covid.refresh()
+    assert covid.version == 2
+    assert covid.c_data[0]['confirmedCount'] == snapshot['c_data'][0]['confirmedCount']
+    assert covid.w_data is w_data and covid.n_data is n_data
+    assert covid.fetch_stats['sections_reused'] == 2
+
+
+def test_same_page_without_etag(snapshot):
+    standin = StandinServer(snapshot, etags=False)
+    covid = Covid19('zh_CN', check_upgradable=False, transport=StandinTransport(standin))
+    covid.refresh()
+    assert covid.version == 1
+    assert covid.fetch_stats['unchanged'] == 1 and covid.fetch_stats['not_modified'] == 0
+
+
+def test_failed_refresh_keeps_the_data(covid, standin):
+    standin.failure_rate = 1
+    with pytest.raises(CovidException):
+        covid.refresh()
+    assert covid.stale and covid.version == 1
+    assert covid.province_covid_data('上海')['provinceShortName'] == '上海'
+
+
+def test_languages(covid):
+    english = covid.view('en_US')
+    assert english.language == 'en_US' and english.view('zh_CN').language == 'zh_CN'
+    world = english.world_covid_data()
+    assert [country['countryName'] for country in world][:2] == ['China', 'Country 1']
+    assert world[1]['continents'] == 'Europe'
+    assert [country['countryName'] for country in covid.world_covid_data()][:2] == ['中国', '国家1']
+    assert covid.world_covid_data(language='en_US') is world  # The results of both languages are memoized.
+    assert english.country_covid_data('Country 2')['countryName'] == 'Country 2'
+    assert covid.country_covid_data('国家2')['confirmedCount'] == english.country_covid_data('Country 2')[
+        'confirmedCount']
+    # The view shares the data of the instance.
+    assert english.c_data is covid.c_data and english.version == covid.version
+    # The other languages fall back to English, like the program language.
+    assert covid.view('fr_FR').language == 'en_US'
+
+
+def test_translations_are_cached_per_version(covid):
+    translations = covid.translations('en_US')
+    assert translations['index']['Country 3'] == 3
+    assert covid.translations('en_US') is translations
+    covid.version += 1
+    assert covid.translations('en_US') is not translations
@@ -0,0 +1,87 @@
+import gzip
+import json
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+from pyeumonia import CovidException
+from pyeumonia.export import snapshot_table, timelines_table, to_pandas, write_ndjson, write_parquet
+from pyeumonia.timeline import Timeline
+
+
+def test_snapshot_table(covid):
+    table = snapshot_table(covid, 'world')
+    assert table.column('countryName').to_pylist() == [country['provinceName'] for country in covid.w_data]
+    assert table.column('confirmedCount').to_pylist() == [country['confirmedCount'] for country in covid.w_data]
+    assert snapshot_table(covid, 'world', 'en_US').column('continents').to_pylist()[:2] == ['Asia', 'Europe']
+    assert snapshot_table(covid, 'provinces').num_rows == len(covid.c_data)
+    assert snapshot_table(covid, 'cities').num_rows == sum(len(province['cities']) for province in covid.c_data)
+    with pytest.raises(CovidException):
+        snapshot_table(covid, 'news')
+
+
+def test_timelines_table(covid):
+    timelines = list(covid.iter_timelines(countries=False))
+    table = timelines_table(timelines)
+    assert table.num_rows == sum(len(timeline) for region_type, region_name, timeline in timelines)
+    columnar = timelines_table((region_type, region_name, Timeline.from_records(timeline))
+                               for region_type, region_name, timeline in timelines)
+    assert columnar.equals(table)
+
+
+def test_to_pandas(covid):
+    table = snapshot_table(covid, 'provinces')
+    frame = to_pandas(table)
+    assert list(frame['provinceShortName']) == [province['provinceShortName'] for province in covid.c_data]
+    assert frame['confirmedCount'].dtype == 'int64'
+    # The table of the caller is still usable.
+    assert table.column('provinceShortName').to_pylist() == list(frame['provinceShortName'])
+    assert list(covid.to_pandas('provinces')['confirmedCount']) == list(frame['confirmedCount'])
+
+
+def test_write_parquet(covid, tmp_path):
+    paths = write_parquet(covid, str(tmp_path), datasets=['world', 'provinces'])
+    assert [os.path.basename(os.path.dirname(path)) for path in paths] == ['dataset=world', 'dataset=provinces']
+    assert pq.read_table(paths[1]).num_rows == len(covid.c_data)
+
+
+def read_ndjson(path):
+    with (gzip.open if path.endswith('.gz') else open)(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('name', ['timelines.ndjson', 'timelines.ndjson.gz'])
+def test_write_ndjson(covid, tmp_path, name):
+    path = str(tmp_path / name)
+    assert write_ndjson(covid, path) == len(covid.c_data) + len(covid.w_data)
+    records = read_ndjson(path)
+    assert records[0]['regionType'] == 'province' and records[0]['regionName'] == '上海'
+    assert len(records) == (len(covid.c_data) + len(covid.w_data)) * 30
+    assert not os.path.exists(f'{path}.progress')
+    # A `pathlib.Path` is a path too, not a file object.
+    assert write_ndjson(covid, tmp_path / name) == len(covid.c_data) + len(covid.w_data)
+    assert read_ndjson(path) == records
+
+
+def test_write_ndjson_resume(covid, tmp_path, monkeypatch):
+    path = str(tmp_path / 'timelines.ndjson.gz')
+    fetch_timeline = covid.fetch_timeline
+    calls = []
+
+    def interrupted(url, language='prog'):
+        calls.append(url)
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return fetch_timeline(url, language)
+    monkeypatch.setattr(covid, 'fetch_timeline', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        write_ndjson(covid, path)
+    assert len(read_ndjson(path)) == 2 * 30
+    monkeypatch.setattr(covid, 'fetch_timeline', fetch_timeline)
+    # The 2 finished regions are skipped.
+    assert write_ndjson(covid, path) == len(covid.c_data) + len(covid.w_data) - 2
+    records = read_ndjson(path)
+    assert len(records) == (len(covid.c_data) + len(covid.w_data)) * 30
+    assert [record['regionName'] for record in records[::30]] == \
+        [region_name for region_type, region_name, url in covid.timeline_urls()]
@@ -0,0 +1,94 @@
+import asyncio
+import copy
+import time
+
+from pyeumonia.feed import UpdateFeed, diff_snapshots
+
+
+def changed(snapshot, province=0, count=1):
+    """Get a copy of a snapshot with more confirmed cases in a province."""
+    snapshot = copy.deepcopy(snapshot)
+    snapshot['c_data'][province]['confirmedCount'] += count
+    return snapshot
+
+
+def test_diff_snapshots(snapshot):
+    assert diff_snapshots(snapshot, copy.deepcopy(snapshot)) == []
+    new = changed(snapshot)
+    del new['w_data'][-1]
+    changes = diff_snapshots(snapshot, new)
+    assert [(change['kind'], change['region']) for change in changes] == [('province', '上海'), ('country', 'Country 5')]
+    assert changes[0]['data']['confirmedCount'] == new['c_data'][0]['confirmedCount']
+    assert changes[1]['data'] is None
+
+
+def test_subscription_filters_and_merges(snapshot):
+    feed = UpdateFeed()
+    shanghai = feed.subscribe(kinds=['province'], regions=['上海'])
+    everything = feed.subscribe()
+    first = changed(snapshot)
+    second = changed(first, count=2)
+    feed.publish(snapshot, first)
+    feed.publish(first, changed(second, province=1))
+    changes = shanghai.get(timeout=0)
+    # The 2 changes of Shanghai are merged, the latest one is kept.
+    assert [change['data']['confirmedCount'] for change in changes] == [second['c_data'][0]['confirmedCount']]
+    assert shanghai.merged == 1
+    assert shanghai.version == 2
+    assert len(everything.get(timeout=0)) == 2
+    assert shanghai.get(timeout=0) == []
+    shanghai.close()
+    feed.publish(second, changed(second))
+    assert shanghai.get(timeout=0) == []
+
+
+def test_subscription_version_is_the_received_batch(snapshot):
+    feed = UpdateFeed()
+    subscription = feed.subscribe(regions=['上海'])
+    feed.publish(snapshot, changed(snapshot))
+    feed.publish(snapshot, changed(snapshot, province=1))  # Not wanted by the subscription.
+    assert feed.version == 2
+    assert len(subscription.get(timeout=0)) == 1
+    assert subscription.version == 1
+
+
+def test_changes_since(snapshot):
+    feed = UpdateFeed(history=2)
+    snapshots = [snapshot]
+    for province in range(3):
+        snapshots.append(changed(snapshots[-1], province))
+        feed.publish(snapshots[-2], snapshots[-1])
+    result = feed.changes_since(2)
+    assert result['version'] == 3 and not result['reset']
+    assert [change['region'] for change in result['changes']] == ['省份2']
+    assert feed.changes_since(0)['reset']
+    assert feed.changes_since(3, timeout=0)['changes'] == []
+
+
+def test_changes_since_a_version_before_restart(snapshot):
+    feed = UpdateFeed()
+    feed.publish(snapshot, changed(snapshot, 0))
+    # The client got version 10 from the server before it was restarted, it's not waited for.
+    started = time.monotonic()
+    result = feed.changes_since(10, timeout=5)
+    assert time.monotonic() - started < 1
+    assert result == {'version': 1, 'reset': True, 'changes': []}
+
+
+def test_async_iteration(snapshot):
+    feed = UpdateFeed()
+    subscription = feed.subscribe()
+
+    async def receive():
+        asyncio.get_running_loop().call_later(0.01, feed.publish, snapshot, changed(snapshot))
+        async for changes in subscription:
+            subscription.close()
+            return changes
+    assert len(asyncio.run(receive())) == 1
+
+
+def test_refresh(covid, standin, snapshot):
+    feed = UpdateFeed(covid)
+    assert feed.refresh() == []
+    standin.set_snapshot(changed(snapshot))
+    assert [change['region'] for change in feed.refresh()] == ['上海']
@@ -0,0 +1,29 @@
+import pytest
+
+from pyeumonia import Covid19, CovidException
+from pyeumonia.standin import StandinTransport
+
+
+def test_phases(standin):
+    spans = []
+    covid = Covid19('zh_CN', check_upgradable=False, transport=StandinTransport(standin), hooks=[spans.append])
+    assert [span.name for span in spans] == ['fetch', 'parse', 'decode']
+    assert spans[0].attributes['status_code'] == 200 and spans[0].attributes['bytes'] > 0
+    assert all(span.duration >= 0 and span.error is None for span in spans)
+    covid.province_covid_data('上海', start=20000101)
+    assert [span.name for span in spans[3:]] == ['timeline.fetch', 'timeline.decode', 'query.province_covid_data']
+    assert set(covid.timings) >= {'fetch', 'parse', 'decode', 'timeline.fetch', 'query.province_covid_data'}
+
+
+def test_errors_and_removed_hooks(covid):
+    spans = []
+    covid.add_hook(spans.append)
+    with pytest.raises(CovidException):
+        covid.province_covid_data('Nowhere')
+    assert spans[-1].name == 'query.province_covid_data'
+    assert isinstance(spans[-1].error, CovidException)
+    covid.remove_hook(spans.append)
+    covid.world_covid_data()
+    assert len(spans) == 1
+    # The durations are still saved without hooks.
+    assert 'query.world_covid_data' in covid.timings
@@ -0,0 +1,47 @@
+import copy
+import json
+
+import pytest
+
+from pyeumonia.memo import FrozenDict, FrozenList, freeze
+
+
+def test_freeze():
+    data = freeze({'a': [1, {'b': 2}], 'c': 3})
+    assert isinstance(data, FrozenDict) and isinstance(data['a'], FrozenList) and isinstance(data['a'][1], dict)
+    assert json.dumps(data) == '{"a": [1, {"b": 2}], "c": 3}'
+    for change in [lambda: data.update(c=4), lambda: data['a'].append(4), lambda: data['a'][1].pop('b')]:
+        with pytest.raises(TypeError):
+            change()
+    changeable = copy.deepcopy(data)
+    changeable['a'][1]['b'] = 5
+    assert type(changeable) is dict and data['a'][1]['b'] == 2
+
+
+def test_memoized_queries(covid):
+    result = covid.province_covid_data('上海')
+    assert covid.province_covid_data('上海') is result
+    assert covid.province_covid_data(province_name='上海') is not result  # The arguments are different.
+    assert covid.memo_stats == {'hits': 1, 'misses': 2}
+    with pytest.raises(TypeError):
+        result['confirmedCount'] = 0
+    covid.version += 1
+    assert covid.province_covid_data('上海') is not result
+    assert covid.province_covid_data('上海') == result
+
+
+def test_memo_size(covid):
+    covid.memo_size = 2
+    first = covid.province_covid_data('上海')
+    covid.province_covid_data('省份1')
+    covid.province_covid_data('上海')
+    covid.province_covid_data('省份2')
+    # The least recently used result is dropped.
+    assert covid.province_covid_data('上海') is first
+    assert len(covid._memo) == 2
+
+
+def test_bypass(covid):
+    columnar = covid.province_covid_data('上海', start=20000101, columnar=True)
+    assert covid.province_covid_data('上海', start=20000101, columnar=True) is not columnar
+    assert covid.memo_stats == {'hits': 0, 'misses': 0}
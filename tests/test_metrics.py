@@ -0,0 +1,55 @@
+import threading
+
+from pyeumonia.metrics import Counter, Histogram, Metrics
+
+
+def test_counter_of_threads():
+    counter = Counter('test_total', 'A test counter.', ['kind'])
+    threads = [threading.Thread(target=lambda: [counter.inc(kind='a') for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(5, kind='b')
+    assert counter.values() == {('a',): 4000, ('b',): 5}
+    assert counter.render() == '# HELP test_total A test counter.\n# TYPE test_total counter\n' \
+                               'test_total{kind="a"} 4000\ntest_total{kind="b"} 5\n'
+
+
+def test_finished_threads_are_merged_without_reading():
+    counter = Counter('test_total', 'A test counter.')
+    for _ in range(200):  # Like a server with a thread for every connection, and nobody reads the metrics.
+        thread = threading.Thread(target=counter.inc)
+        thread.start()
+        thread.join()
+    assert len(counter._shards) <= 1
+    assert counter.values() == {(): 200}
+
+
+def test_histogram():
+    histogram = Histogram('test_seconds', 'A test histogram.', buckets=(0.1, 1))
+    for value in [0.05, 0.5, 5]:
+        histogram.observe(value)
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="0.1"} 1', 'test_seconds_bucket{le="1"} 2', 'test_seconds_bucket{le="+Inf"} 3',
+        'test_seconds_sum 5.55', 'test_seconds_count 3']
+
+
+def test_covid_metrics(covid):
+    metrics = Metrics()
+    metrics.instrument(covid)
+    covid.refresh()  # 304, nothing is changed.
+    covid.world_covid_data()
+    covid.world_covid_data()
+    metrics.cache('server', False)
+    text = metrics.render()
+    assert 'pyeumonia_cache_requests_total{cache="memo",result="hit"} 1' in text
+    assert 'pyeumonia_cache_requests_total{cache="memo",result="miss"} 1' in text
+    assert 'pyeumonia_cache_requests_total{cache="server",result="miss"} 1' in text
+    assert 'pyeumonia_fetches_total 2' in text
+    assert 'pyeumonia_fetches_skipped_total{reason="not_modified"} 1' in text
+    assert 'pyeumonia_page_sections_total{result="decoded"} 3' in text
+    assert 'pyeumonia_phase_seconds_count{phase="fetch"} 1' in text
+    assert 'pyeumonia_records{kind="province"} 4' in text
+    assert 'pyeumonia_snapshot_stale 0' in text
+    assert Metrics().render().count('# TYPE') == len(Metrics().metrics)
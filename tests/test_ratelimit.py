@@ -0,0 +1,122 @@
+import os
+
+import pytest
+
+from pyeumonia import Covid19, CovidException, ratelimit
+from pyeumonia.ratelimit import RateLimitedTransport, RateLimiter
+from pyeumonia.standin import StandinTransport
+from pyeumonia.transport import Response, Transport
+
+HOST = 'ncov.dxy.cn'
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(params=['file', 'process'])
+def limiter(request, tmp_path):
+    path = str(tmp_path / 'buckets') if request.param == 'file' else None
+    limiter = RateLimiter({HOST: (2, 3)}, path=path, clock=Clock())
+    yield limiter
+    limiter.close()
+
+
+def test_tokens(limiter):
+    assert limiter.available(HOST) == 3 and limiter.available('example.com') == float('inf')
+    assert [limiter.try_acquire(HOST) for _ in range(4)] == [0, 0, 0, 0.5]
+    assert limiter.try_acquire('example.com') == 0
+    limiter.clock.now += 1
+    assert limiter.available(HOST) == 2
+    limiter.clock.now += 10
+    assert limiter.available(HOST) == 3  # The bucket never has more than the burst.
+    assert limiter.interval(HOST) == 0.5 and limiter.interval('example.com') == 0
+
+
+def test_acquire_timeout(limiter):
+    assert limiter.acquire(HOST, tokens=3) == pytest.approx(0, abs=0.1)
+    with pytest.raises(CovidException):
+        limiter.acquire(HOST, timeout=0.1)
+
+
+def test_pause(limiter):
+    limiter.pause(HOST, 5)
+    assert limiter.available(HOST) == 0 and limiter.try_acquire(HOST) == 5
+    limiter.clock.now += 5
+    assert limiter.try_acquire(HOST) == 0
+
+
+def test_limiters_share_the_file(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / 'buckets')
+    first, second = (RateLimiter({HOST: (1, 2)}, path=path, clock=clock) for _ in range(2))
+    try:
+        assert first.try_acquire(HOST) == 0 and second.try_acquire(HOST) == 0
+        assert first.try_acquire(HOST) == 1
+        second.pause(HOST, 30)
+        clock.now += 10
+        assert first.try_acquire(HOST) == 20
+    finally:
+        first.close()
+        second.close()
+
+
+def test_shared_file_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    path = os.path.join(ratelimit._state_dir(), 'ratelimit.json')
+    assert path == str(tmp_path / 'pyeumonia' / 'ratelimit.json')
+    limiter = RateLimiter({HOST: (1, 2)}, path=path)
+    assert limiter.try_acquire(HOST) == 0
+    limiter.close()
+    assert os.stat(os.path.dirname(path)).st_mode & 0o777 == 0o700
+    assert os.stat(path).st_mode & 0o777 == 0o600
+    # Another user may point the path to a file of this user, the link is never followed.
+    target = tmp_path / 'target'
+    target.write_bytes(b'important')
+    link = str(tmp_path / 'link')
+    os.symlink(target, link)
+    with pytest.raises(CovidException):
+        RateLimiter({HOST: (1, 2)}, path=link).try_acquire(HOST)
+    assert target.read_bytes() == b'important'
+
+
+def test_corrupted_file_is_reset(tmp_path):
+    path = tmp_path / 'buckets'
+    for data in [b'{"ncov.dxy.cn": [1, 2', b'[]', b'{"ncov.dxy.cn": 1}', b'\xff']:
+        path.write_bytes(data)
+        limiter = RateLimiter({HOST: (1, 2)}, path=str(path), clock=Clock())
+        assert limiter.try_acquire(HOST) == 0 and limiter.available(HOST) == 1
+        limiter.close()
+
+
+class TooManyRequests(Transport):
+    def __init__(self, headers):
+        self.headers = headers
+
+    def get(self, url, headers=None, timeout=None):
+        return Response(429, b'', self.headers, url)
+
+
+def test_transport_pauses_after_429():
+    limiter = RateLimiter({HOST: (1, 5)}, path=None, clock=Clock())
+    transport = RateLimitedTransport(TooManyRequests({'Retry-After': '12'}), limiter=limiter)
+    assert transport.get(f'https://{HOST}/').status_code == 429
+    assert limiter.try_acquire(HOST) == 12
+    limiter = RateLimiter({HOST: (1, 5)}, path=None, clock=Clock())
+    RateLimitedTransport(TooManyRequests({}), limiter=limiter, pause=7).get(f'https://{HOST}/')
+    assert limiter.try_acquire(HOST) == 7
+
+
+def test_fetch_timelines_with_limiter(standin):
+    limiter = RateLimiter({'file1.dxycdn.com': (1000, 2)}, path=None)
+    transport = RateLimitedTransport(StandinTransport(standin), limiter=limiter)
+    covid = Covid19('zh_CN', check_upgradable=False, transport=transport)
+    assert covid._rate_limiter() is limiter
+    timelines = covid.fetch_timelines(max_workers=4)
+    assert [region_name for region_type, region_name, timeline in timelines] == \
+        [region_name for region_type, region_name, url in covid.timeline_urls()]
+    assert all(timeline for region_type, region_name, timeline in timelines)
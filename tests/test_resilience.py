@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+from pyeumonia import CovidException
+from pyeumonia.resilience import CircuitBreaker, CircuitOpenError, ResilientTransport
+from pyeumonia.transport import Response, Transport
+
+URL = 'https://ncov.dxy.cn/ncovh5/view/pneumonia'
+
+
+class ScriptedTransport(Transport):
+    """Return or raise the results in order, a result can also be an event to wait for."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.requests = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests += 1
+        result = self.results.pop(0) if len(self.results) > 1 else self.results[0]
+        if isinstance(result, threading.Event):
+            result.wait()
+            return Response(200, b'late', url=url)
+        if isinstance(result, Exception):
+            raise result
+        return Response(result, b'', url=url)
+
+
+def transport(*results, **options):
+    options = {'backoff': 0, 'timeout': 1, 'deadline': 5, **options}
+    return ResilientTransport(ScriptedTransport(*results), **options)
+
+
+def test_retries():
+    resilient = transport(503, ConnectionError('reset'), 200)
+    assert resilient.get(URL).status_code == 200
+    assert resilient.transport.requests == 3
+    assert resilient.stats['retries'] == 2
+    assert transport(503, retries=1).get(URL).status_code == 503
+    with pytest.raises(ConnectionError):
+        transport(ConnectionError('reset'), retries=1).get(URL)
+
+
+def test_circuit_breaker():
+    now = [0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == 'open' and not breaker.allow() and breaker.retry_after() == 10
+    now[0] = 10
+    assert breaker.allow() and breaker.state == 'half_open'
+    assert not breaker.allow()  # Only one trial request.
+    breaker.failure()
+    assert breaker.state == 'open'
+    now[0] = 20
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_open_breaker_rejects_requests():
+    resilient = transport(503, retries=0, failure_threshold=2)
+    resilient.get(URL)
+    resilient.get(URL)
+    with pytest.raises(CircuitOpenError):
+        resilient.get(URL)
+    assert resilient.stats['rejected'] == 1 and resilient.transport.requests == 2
+
+
+def test_covid_exception_is_not_a_success():
+    resilient = transport(503, CovidException('No fixture.'), retries=0, failure_threshold=2)
+    resilient.get(URL)
+    with pytest.raises(CovidException):
+        resilient.get(URL)
+    breaker = resilient.breaker('ncov.dxy.cn')
+    assert breaker.failures == 1 and breaker.state == 'closed'
+
+
+def test_timeout_and_abandoned_attempts():
+    event = threading.Event()
+    resilient = transport(event, timeout=0.05, retries=1, max_abandoned=1)
+    with pytest.raises(TimeoutError):
+        resilient.get(URL)
+    # The first attempt is still running, so the retry is not sent.
+    assert resilient.stats['timeouts'] == 1 and resilient.abandoned == 1
+    assert resilient.transport.requests == 1
+    event.set()
+    for _ in range(100):
+        if not resilient.abandoned:
+            break
+        time.sleep(0.01)
+    assert resilient.abandoned == 0 and resilient.stats['abandoned'] == 1
+
+
+def test_hedged_request():
+    event = threading.Event()
+    resilient = transport(event, 200, hedge_after=0.01)
+    assert resilient.get(URL).content == b''
+    assert resilient.stats['hedges'] == 1 and resilient.stats['hedge_wins'] == 1
+    assert resilient.abandoned == 1
+    event.set()
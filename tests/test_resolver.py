@@ -0,0 +1,76 @@
+import json
+
+import pytest
+
+from pyeumonia import Covid19, CovidException, resolver as resolver_module
+from pyeumonia.resolver import normalize, pinyin, strip_suffix
+from pyeumonia.server import CovidServer
+
+
+@pytest.fixture
+def resolver(covid):
+    return covid.resolver()
+
+
+def test_names():
+    assert normalize('Ｓhàng Hǎi!') == 'shanghai'
+    assert pinyin('上海') == 'shanghai'
+    assert strip_suffix('大兴安岭地区') == '大兴安岭' and strip_suffix('北区') == '北区'
+
+
+def test_exact_names(covid, resolver):
+    assert covid.resolver() is resolver
+    for name in ['沪', 'shanghai', 'Shàng Hǎi', '上海']:
+        assert resolver.resolve(name).name == '上海市'
+    for name in ['CN', 'chn', 'PRC', 'China', 'zhongguo']:
+        assert resolver.resolve(name, 'country').name == '中国'
+    assert resolver.resolve('城市1-2', 'city').province == '省份1省'
+    assert resolver.lookup('Country 3')[0].english_name == 'Country 3'
+    assert covid.province_covid_data('沪')['provinceShortName'] == '上海'
+
+
+def test_typos(resolver):
+    assert resolver.resolve('Chnia').name == '中国'
+    assert resolver.resolve('Countyr 3').english_name == 'Country 3'
+    # All the countries are one character away.
+    assert resolver.resolve('Country 7') is None
+    assert len(resolver.search('Country 7', limit=10)) == 5
+
+
+def test_chinese_names_are_not_corrected(snapshot):
+    snapshot['c_data'][0]['cities'][:2] = [dict(snapshot['c_data'][0]['cities'][0], cityName=name)
+                                           for name in ['西城区', '朝阳区']]
+    covid = Covid19.from_snapshot(snapshot, 'zh_CN')
+    assert covid.resolver().resolve('xichengqu').name == '西城区'
+    for name, suggestion in [('东城区', '西城区'), ('海阳区', '朝阳区')]:
+        assert covid.resolver().resolve(name) is None
+        with pytest.raises(CovidException, match=f'你是不是要找：.*{suggestion}'):
+            covid.city_covid_data(name)
+    assert covid.resolver().resolve('xichenqu').name == '西城区'  # The typos of the pinyin are still corrected.
+
+
+def test_beginnings_are_only_completed(covid, resolver):
+    assert resolver.resolve('Coun') is None
+    assert [region.english_name for region in resolver.complete('coun', 'country', limit=3)] == \
+        [region.english_name for region in resolver.suggest('Coun', 'country')]
+    with pytest.raises(CovidException, match='Did you mean Country'):
+        covid.view('en_US').country_covid_data('Coun')
+    with pytest.raises(CovidException, match='找不到地区'):
+        covid.province_covid_data('省')
+
+
+def test_resolved_names_are_evicted_least_recently_used(resolver, monkeypatch):
+    monkeypatch.setattr(resolver_module, 'CACHE_SIZE', 2)
+    resolver._resolved.clear()
+    for name in ['沪', 'China', '沪', 'Chnia']:
+        resolver.resolve(name)
+    assert list(resolver._resolved) == [('沪', None), ('Chnia', None)]
+
+
+def test_complete_route(covid):
+    server = CovidServer(covid, port=0, refresh_interval=0)
+    try:
+        regions = json.loads(server.response('/complete', 'q=chengshi1&kind=city&limit=2').body)
+    finally:
+        server.httpd.server_close()
+    assert len(regions) == 2 and all(region['province'] == '省份1省' for region in regions)
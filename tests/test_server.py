@@ -0,0 +1,127 @@
+import copy
+import gzip
+import http.client
+import json
+import threading
+
+import pytest
+
+from pyeumonia.server import ROUTES, CovidServer
+
+
+@pytest.fixture
+def server(covid):
+    server = CovidServer(covid, port=0, refresh_interval=0)
+    yield server
+    server.httpd.server_close()
+
+
+@pytest.fixture
+def client(server):
+    threading.Thread(target=server.httpd.serve_forever, daemon=True).start()
+    client = http.client.HTTPConnection(*server.httpd.server_address[:2], timeout=10)
+    yield client
+    client.close()
+    server.shutdown()
+
+
+def test_response_is_cached(server):
+    response = server.response('/province', 'name=上海')
+    assert response.status == 200
+    assert json.loads(response.body)['provinceShortName'] == '上海'
+    assert server.response('/province', 'name=上海') is response
+    assert server.response('/nowhere') is None
+
+
+def test_languages(server):
+    english = json.loads(server.response('/world', 'lang=en_US').body)
+    chinese = json.loads(server.response('/world', 'lang=zh_CN').body)
+    assert english[1]['countryName'] == 'Country 1' and chinese[1]['countryName'] == '国家1'
+    assert english[1]['confirmedCount'] == chinese[1]['confirmedCount']
+
+
+def test_errors(server, monkeypatch):
+    assert server.response('/province', 'name=Nowhere').status == 400
+    monkeypatch.setitem(ROUTES, '/broken', lambda covid, params: 1 / 0)
+    response = server.response('/broken')
+    assert response.status == 500
+    assert 'ZeroDivisionError' in json.loads(response.body)['error']
+    assert 'pyeumonia_errors_total{phase="response",type="ZeroDivisionError"} 1' in server.metrics.render()
+
+
+def test_least_recently_used_responses_are_dropped(server):
+    server.max_responses = 2
+    first = server.response('/province', 'name=上海')
+    server.response('/province', 'name=省份1')
+    assert server.response('/province', 'name=上海') is first
+    server.response('/province', 'name=省份2')
+    assert server.response('/province', 'name=上海') is first
+    assert len(server._responses) == 2
+    assert [key[1] for key in server._responses] == [(('name', '省份2'),), (('name', '上海'),)]
+
+
+def test_refresh(server, standin, snapshot):
+    response = server.response('/world')
+    server.refresh()
+    assert server.response('/world') is response  # Nothing is changed.
+    snapshot['w_data'][0]['confirmedCount'] += 1
+    standin.set_snapshot(snapshot)
+    server.refresh()
+    assert server.response('/world') is not response
+
+
+def test_refresh_failure_is_counted(server, monkeypatch):
+    def refresh():
+        server._stopped.set()
+        raise ConnectionError('DXY is down.')
+    monkeypatch.setattr(server, 'refresh', refresh)
+    server.refresh_interval = 0.01
+    server._refresh_forever()
+    assert 'pyeumonia_errors_total{phase="refresh",type="ConnectionError"} 1' in server.metrics.render()
+
+
+def test_http(client):
+    client.request('GET', '/province?name=%E4%B8%8A%E6%B5%B7', headers={'Accept-Encoding': 'gzip'})
+    response = client.getresponse()
+    assert response.status == 200
+    assert response.getheader('Content-Encoding') == 'gzip'
+    etag = response.getheader('ETag')
+    assert json.loads(gzip.decompress(response.read()))['provinceShortName'] == '上海'
+    client.request('GET', '/province?name=%E4%B8%8A%E6%B5%B7', headers={'If-None-Match': etag})
+    response = client.getresponse()
+    response.read()
+    assert response.status == 304
+    client.request('GET', '/nowhere')
+    response = client.getresponse()
+    assert response.status == 404 and 'error' in json.loads(response.read())
+
+
+def read_event(response):
+    lines = []
+    while True:
+        line = response.fp.readline().decode('utf-8').rstrip('\n')
+        if not line:
+            return dict(line.split(': ', 1) for line in lines)
+        lines.append(line)
+
+
+def test_events_resume_from_last_event_id(client, server, standin, snapshot):
+    for count in [1, 2]:
+        snapshot = copy.deepcopy(snapshot)
+        snapshot['c_data'][count]['confirmedCount'] += 1
+        standin.set_snapshot(snapshot)
+        server.refresh()
+    client.request('GET', '/events?kinds=province', headers={'Last-Event-ID': '1'})
+    response = client.getresponse()
+    assert response.status == 200
+    event = read_event(response)
+    assert event['id'] == '2'
+    assert [change['region'] for change in json.loads(event['data'])] == ['省份2']
+    snapshot = copy.deepcopy(snapshot)
+    snapshot['c_data'][3]['confirmedCount'] += 1
+    standin.set_snapshot(snapshot)
+    server.refresh()
+    event = read_event(response)
+    assert event['id'] == '3'
+    assert [change['region'] for change in json.loads(event['data'])] == ['省份3']
+    response.close()
@@ -0,0 +1,73 @@
+import multiprocessing
+
+import pytest
+
+from pyeumonia import CovidException
+from pyeumonia.shared import SharedSnapshot, read_header, read_snapshot, write_snapshot
+from pyeumonia.standin import StandinTransport
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'pyeumonia.snapshot')
+
+
+def test_write_and_read(path, snapshot):
+    assert read_header(path) is None
+    write_snapshot(path, snapshot, 3)
+    assert read_header(path) == (3, snapshot['fetch_time'])
+    assert read_snapshot(path) == (3, snapshot)
+    with open(path, 'r+b') as f:
+        f.write(b'NOTMAGIC')
+    with pytest.raises(CovidException):
+        read_snapshot(path)
+
+
+def test_fetched_once(path, standin):
+    first = SharedSnapshot(path, 'zh_CN', transport=StandinTransport(standin))
+    second = SharedSnapshot(path, 'zh_CN', transport=StandinTransport(standin))
+    assert first.covid().province_covid_data('上海')['provinceShortName'] == '上海'
+    assert second.covid().c_data == first.covid().c_data
+    assert (first.fetches, second.fetches) == (1, 0)
+    assert first.version == second.version == 1
+
+
+def _worker(path, standin, results):
+    shared = SharedSnapshot(path, 'zh_CN', transport=StandinTransport(standin))
+    results.put((shared.covid().version, shared.fetches))
+
+
+def test_fetched_once_by_processes(path, standin):
+    context = multiprocessing.get_context('fork')
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(path, standin, results)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    received = [results.get(timeout=1) for _ in processes]
+    assert [version for version, fetches in received] == [1] * 4
+    assert sum(fetches for version, fetches in received) == 1
+
+
+def test_refresh(path, standin, snapshot, monkeypatch):
+    shared = SharedSnapshot(path, 'zh_CN', refresh_interval=600, check_interval=0,
+                            transport=StandinTransport(standin))
+    covid = shared.covid()
+    monkeypatch.setattr('time.time', lambda: snapshot['fetch_time'] + 10 ** 9)
+    # Nothing is changed, the version and the instance are kept.
+    assert shared.covid() is covid and shared.version == 1 and shared.fetches == 2
+    snapshot['c_data'][0]['confirmedCount'] += 1
+    standin.set_snapshot(snapshot)
+    monkeypatch.setattr('time.time', lambda: snapshot['fetch_time'] + 2 * 10 ** 9)
+    assert shared.covid().province_covid_data('上海')['confirmedCount'] == snapshot['c_data'][0]['confirmedCount']
+    assert shared.version == 2
+
+
+def test_stale_snapshot_is_served(path, standin, snapshot, monkeypatch, caplog):
+    shared = SharedSnapshot(path, 'zh_CN', check_interval=0, transport=StandinTransport(standin))
+    covid = shared.covid()
+    standin.failure_rate = 1
+    monkeypatch.setattr('time.time', lambda: snapshot['fetch_time'] + 10 ** 9)
+    assert shared.covid() is covid
+    assert 'the stale snapshot' in caplog.text
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from pyeumonia import Covid19, CovidException
+from pyeumonia.sources import DXY_URL, FileSource, PageSource, Source, SourcePool
+from pyeumonia.standin import StandinTransport, render_page
+
+
+class BrokenSource(Source):
+    def fetch(self, transport, headers):
+        raise ConnectionError(f'{self.name} is down.')
+
+
+def test_failover(standin):
+    pool = SourcePool([BrokenSource('broken'), DXY_URL], cooldown=60)
+    source, response = pool.fetch(StandinTransport(standin), {})
+    assert source.name == DXY_URL and response.status_code == 200
+    health = pool.health()
+    assert health['broken']['failures'] == 1 and health['broken']['error_rate'] == 1
+    assert health[DXY_URL]['requests'] == 1 and health[DXY_URL]['latency'] is not None
+    # The unhealthy source is tried after the healthy one.
+    assert [source.name for source in pool.ranked()] == [DXY_URL, 'broken']
+    with pytest.raises(ConnectionError):
+        SourcePool([BrokenSource('broken')]).fetch(StandinTransport(standin), {})
+    with pytest.raises(CovidException):
+        SourcePool([])
+
+
+def test_unhealthy_source_is_ranked_again_after_cooldown(standin):
+    pool = SourcePool([BrokenSource('broken'), PageSource(DXY_URL, priority=1)], cooldown=0)
+    pool.fetch(StandinTransport(standin), {})
+    assert pool.ranked()[0].name == 'broken'
+
+
+def test_fast_fallback_does_not_take_over(snapshot, standin, tmp_path):
+    path = str(tmp_path / 'snapshot.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False)
+    mirror = PageSource('https://mirror.example.com/ncovh5/view/pneumonia', name='mirror')
+    pool = SourcePool([DXY_URL, mirror, FileSource(path)])
+    covid = Covid19('zh_CN', check_upgradable=False, transport=StandinTransport(standin), sources=pool)
+    pool._health[path].record(True, 0.0)  # The local file is much faster than the pages.
+    for _ in range(3):
+        covid.refresh()
+    health = pool.health()
+    # The mirror which is never used is not probed either, while the primary page is healthy.
+    assert health[DXY_URL]['requests'] == 4 and health['mirror']['requests'] == 0 and health[path]['requests'] == 1
+    assert [source.name for source in pool.ranked()] == [DXY_URL, 'mirror', path]
+
+
+def test_failed_status_is_returned(standin):
+    pool = SourcePool([PageSource('https://ncov.dxy.cn/nowhere', name='missing')])
+    source, response = pool.fetch(StandinTransport(standin), {})
+    assert source.name == 'missing' and response.status_code == 404
+    assert pool.health()['missing']['failures'] == 1
+
+
+def test_file_sources(snapshot, tmp_path):
+    snapshot_path = tmp_path / 'snapshot.json'
+    snapshot_path.write_text(json.dumps(snapshot, ensure_ascii=False), encoding='utf-8')
+    page_path = tmp_path / 'page.html'
+    page_path.write_bytes(render_page(snapshot))
+    for path in [snapshot_path, page_path]:
+        covid = Covid19('zh_CN', check_upgradable=False, sources=[FileSource(str(path))])
+        assert covid.c_data == snapshot['c_data'] and covid.w_data == snapshot['w_data']
+
+
+def test_validators_belong_to_their_source(standin):
+    mirror = PageSource('https://mirror.example.com/ncovh5/view/pneumonia', name='mirror')
+    pool = SourcePool([DXY_URL, mirror])
+    covid = Covid19('zh_CN', check_upgradable=False, transport=StandinTransport(standin), sources=pool)
+    assert list(covid._validators) == [DXY_URL]
+    covid.refresh()
+    assert covid.fetch_stats['not_modified'] == 1
+    # The mirror is faster now, it's asked without the ETag of the DXY page.
+    pool._health[DXY_URL].latency = 1.0
+    pool._health['mirror'].latency = 0.0
+    covid.refresh()
+    assert list(covid._validators) == ['mirror']
+    assert covid.fetch_stats['not_modified'] == 1 and covid.fetch_stats['unchanged'] == 1
+    covid.refresh()
+    assert covid.fetch_stats['not_modified'] == 2
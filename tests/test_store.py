@@ -0,0 +1,81 @@
+import copy
+
+from pyeumonia import Covid19
+from pyeumonia.store import SnapshotStore, snapshot_records
+
+DAY = 24 * 3600
+
+
+def next_day(snapshot, days=1):
+    """Get a copy of a snapshot fetched some days later."""
+    snapshot = copy.deepcopy(snapshot)
+    snapshot['fetch_time'] += days * DAY
+    return snapshot
+
+
+def test_snapshot_records(snapshot):
+    records = snapshot_records(snapshot)
+    assert ('province', '', '上海') in records
+    assert ('city', '省份1', '城市1-0') in records
+    assert ('country', '欧洲', 'Country 1') in records
+    assert 'cities' not in records[('province', '', '上海')]
+
+
+def test_only_changed_records_are_saved(snapshot):
+    store = SnapshotStore(':memory:')
+    store.record(snapshot)
+    count = store.conn.execute('SELECT COUNT(*) FROM records').fetchone()[0]
+    changed = next_day(snapshot)
+    changed['c_data'][1]['cities'][0]['confirmedCount'] += 1
+    store.record(changed)
+    assert store.conn.execute('SELECT COUNT(*) FROM records').fetchone()[0] == count + 1
+    assert len(store.snapshots()) == 2
+
+
+def test_history_between_days(snapshot):
+    store = SnapshotStore(':memory:')
+    store.record(snapshot)
+    for days in [1, 2, 3]:
+        changed = next_day(snapshot, days)
+        changed['c_data'][1]['cities'][0]['confirmedCount'] += days
+        store.record(changed)
+    first_day = store.snapshots()[0]['dateId']
+    history = store.city_history('城市1-0', start=first_day + 2)
+    # The version which was valid on the first day is included.
+    assert [day['data']['confirmedCount'] for day in history] == [
+        snapshot['c_data'][1]['cities'][0]['confirmedCount'] + days for days in [1, 2, 3]]
+
+
+def test_removed_region(snapshot):
+    store = SnapshotStore(':memory:')
+    store.record(snapshot)
+    removed = next_day(snapshot)
+    del removed['w_data'][-1]
+    store.record(removed)
+    history = store.country_history('Country 5')
+    assert history[-1]['data'] is None
+    assert len(store.snapshot_as_of()['w_data']) == len(snapshot['w_data']) - 1
+
+
+def test_snapshot_as_of(snapshot):
+    store = SnapshotStore(':memory:')
+    store.record(snapshot)
+    changed = next_day(snapshot)
+    changed['c_data'][0]['confirmedCount'] += 100
+    store.record(changed)
+    old = store.snapshot_as_of(store.snapshots()[0]['dateId'])
+    assert old['fetch_time'] == snapshot['fetch_time']
+    assert old['c_data'][0]['confirmedCount'] == snapshot['c_data'][0]['confirmedCount']
+    assert [city['cityName'] for city in old['c_data'][1]['cities']] == ['城市1-0', '城市1-1', '城市1-2']
+    covid = Covid19.from_snapshot(old, 'zh_CN')
+    assert covid.province_covid_data('上海')['confirmedCount'] == snapshot['c_data'][0]['confirmedCount']
+    assert store.snapshot_as_of(10000101) is None
+
+
+def test_record_covid(covid, snapshot):
+    store = SnapshotStore(':memory:')
+    covid.store = store
+    covid.refresh()
+    assert store.snapshots() == []  # Nothing is changed, the snapshot is not recorded again.
+    store.record(covid)
+    assert store.snapshot_as_of()['c_data'][0]['provinceName'] == snapshot['c_data'][0]['provinceName']
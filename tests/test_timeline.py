@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from pyeumonia import CovidException
+from pyeumonia.binary import TimelineFile, write_timelines
+from pyeumonia.timeline import Timeline, TimelineMatrix, TimelinePyramid, date_ids_to_days, days_to_date_ids
+
+
+def records(date_ids, confirmed):
+    return [{'dateId': date_id, 'confirmedCount': count, 'curedCount': 0, 'deadCount': 0,
+             'currentConfirmedCount': count} for date_id, count in zip(date_ids, confirmed)]
+
+
+def test_timeline_from_records():
+    timeline = Timeline.from_records(records([20220401, 20220402, 20220403], [10, 15, 30]))
+    assert len(timeline) == 3
+    assert timeline['confirmedCount'].dtype == np.int64
+    assert timeline.increments().tolist() == [0, 5, 15]
+    assert timeline.window(start=20220402).to_list() == records([20220402, 20220403], [15, 30])
+    assert (timeline.sum('confirmedCount'), timeline.max('confirmedCount'), timeline.min('confirmedCount')) == \
+        (55, 30, 10)
+
+
+def test_date_ids():
+    date_ids = [20220131, 20220201, 20220301, 20241231]
+    assert days_to_date_ids(date_ids_to_days(date_ids)).tolist() == date_ids
+
+
+def test_timeline_from_file(tmp_path):
+    path = str(tmp_path / 'timelines.bin')
+    write_timelines(path, [('province', '上海', records([20220401, 20220402], [10, 15]))])
+    timeline_file = TimelineFile(path)
+    timeline = Timeline.from_file(timeline_file, '上海')
+    timeline_file.close()
+    # The arrays are views of the file, they are still valid after closing.
+    assert timeline['dateId'].tolist() == [20220401, 20220402]
+    assert timeline.increments().tolist() == [0, 5]
+
+
+def test_columnar_query(covid):
+    data = covid.province_covid_data('上海', start=20000101, columnar=True)['data']
+    assert isinstance(data, Timeline)
+    assert data.to_list() == covid.province_covid_data('上海', start=20000101)['data']
+
+
+def test_timeline_range(covid):
+    timeline = covid.province_covid_data('上海', start=20000101, end=30000101)['data']
+    date_ids = [day['dateId'] for day in timeline]
+    assert date_ids == sorted(date_ids)
+    selected = covid.province_covid_data('上海', start=date_ids[3], end=date_ids[10])['data']
+    assert [day['dateId'] for day in selected] == date_ids[3:11]
+
+
+def test_timeline_step(covid):
+    timeline = covid.province_covid_data('上海', start=20000101, end=30000101)['data']
+    stepped = covid.province_covid_data('上海', start=20000101, end=30000101, step=7)['data']
+    # The last day is always kept.
+    assert stepped == timeline[(len(timeline) - 1) % 7::7]
+    monthly = covid.province_covid_data('上海', start=20000101, end=30000101, step='month')['data']
+    assert [day['dateId'] // 100 for day in monthly] == sorted({day['dateId'] // 100 for day in timeline})
+    assert monthly[-1] == timeline[-1]
+
+
+@pytest.mark.parametrize('step', [0, -7, 'year', 1.5])
+def test_invalid_step(covid, step):
+    with pytest.raises(CovidException):
+        covid.province_covid_data('上海', start=20000101, step=step)
+
+
+def test_matrix_stack():
+    matrix = TimelineMatrix.stack([('a', records([20220401, 20220403], [10, 30])),
+                                   ('b', records([20220402], [5]))])
+    assert matrix.date_ids.tolist() == [20220401, 20220402, 20220403]
+    # The missing days are filled with the day before, the days before the first data are 0.
+    assert matrix['confirmedCount'].tolist() == [[10, 10, 30], [0, 5, 5]]
+    assert matrix.row('b')['confirmedCount'].tolist() == [0, 5, 5]
+
+
+def test_province_and_country_matrix(covid):
+    provinces = covid.province_matrix(max_workers=2)
+    assert provinces.labels == [province['provinceShortName'] for province in covid.c_data]
+    assert provinces['confirmedCount'].shape == (len(covid.c_data), len(provinces.date_ids))
+    continents = covid.country_matrix(language='en_US')
+    assert sorted(continents) == sorted({'Asia', 'Europe', 'Africa', 'North America', 'South America', 'Oceania'})
+    assert continents['Europe'].labels == ['Country 1']
+    assert covid.country_matrix()['欧洲'].labels == ['国家1']
+
+
+def test_pyramid():
+    date_ids = days_to_date_ids(date_ids_to_days([20220101]) + np.arange(120)).tolist()
+    matrix = TimelineMatrix.stack([('a', records(date_ids, range(120)))])
+    pyramid = TimelinePyramid(matrix)
+    months = pyramid.levels['month']
+    assert months['dateId'].tolist() == [20220131, 20220228, 20220331, 20220430]
+    assert months['confirmedCount'][0].tolist() == [30, 58, 89, 119]
+    assert months['confirmedCountIncr'][0].tolist() == [30, 28, 31, 30]
+    assert pyramid.select(200)[0] == 'day'
+    assert pyramid.select(10)[0] == 'month'
+    assert pyramid.series('a', 10, start=20220201)['dateId'] == [20220228, 20220331, 20220430]
+
+
+def test_pyramid_extend():
+    date_ids = days_to_date_ids(date_ids_to_days([20220101]) + np.arange(120)).tolist()
+    pyramid = TimelinePyramid(TimelineMatrix.stack([('a', records(date_ids[:50], range(50)))]))
+    pyramid.extend(TimelineMatrix.stack([('a', records(date_ids[40:], range(40, 120)))]))
+    full = TimelinePyramid(TimelineMatrix.stack([('a', records(date_ids, range(120)))]))
+    for level in TimelinePyramid.LEVELS:
+        for key, values in full.levels[level].items():
+            assert pyramid.levels[level][key].tolist() == values.tolist()
@@ -0,0 +1,39 @@
+import pytest
+
+from pyeumonia import Covid19, CovidException
+from pyeumonia.standin import StandinServer, StandinTransport, render_page
+from pyeumonia.transport import RecordingTransport, ReplayTransport, RewriteTransport
+
+DXY_URL = 'https://ncov.dxy.cn/ncovh5/view/pneumonia'
+
+
+def test_standin(standin, snapshot):
+    status, body, headers = standin.handle('/ncovh5/view/pneumonia')
+    assert status == 200 and body == render_page(snapshot)
+    assert standin.handle('/ncovh5/view/pneumonia', {'If-None-Match': headers['ETag']})[0] == 304
+    assert standin.not_modified == 1
+    assert standin.handle('/nowhere')[0] == 404
+    failing = StandinServer(snapshot, failure_rate=1)
+    assert failing.handle('/ncovh5/view/pneumonia')[0] == 503
+    assert failing.failures == 1
+
+
+def test_record_and_replay(standin, tmp_path):
+    directory = str(tmp_path / 'fixtures')
+    recorded = Covid19('zh_CN', check_upgradable=False,
+                       transport=RecordingTransport(directory, StandinTransport(standin)))
+    timeline = recorded.province_covid_data('上海', start=20000101)
+    replayed = Covid19('zh_CN', check_upgradable=False, transport=ReplayTransport(directory))
+    assert replayed.snapshot() == recorded.snapshot()
+    assert replayed.province_covid_data('上海', start=20000101) == timeline
+    with pytest.raises(CovidException):
+        replayed.province_covid_data('省份1', start=20000101)
+
+
+def test_rewrite(snapshot):
+    with StandinServer(snapshot) as standin:
+        response = RewriteTransport(standin.url).get(f'{DXY_URL}?from=test')
+        assert response.status_code == 200
+        assert response.content == render_page(snapshot)
+        covid = Covid19('zh_CN', check_upgradable=False, transport=RewriteTransport(standin.url))
+        assert covid.c_data == snapshot['c_data']